@@ -0,0 +1,69 @@
+"""
+Concurrency benchmark for /process against a stub Gemini model.
+
+Sends N parallel text-only requests through the ASGI app in-process and compares the
+wall-clock time with a single request. While the burst is in flight it also times a
+GET / to show the event loop stays responsive. With a non-blocking request path the
+burst finishes in roughly the time of one request.
+
+Usage:
+    python -m benchmarks.concurrency_benchmark --requests 20 --latency 1.0
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+import main
+from benchmarks.fake_gemini import FakeGeminiClient
+from helpers.gemini_helper import GeminiHelper
+
+
+FORM_DATA = {
+    "companyDescription": "Acme Corp builds rockets for roadrunner enthusiasts.",
+    "roleDescription": "Senior Python engineer working on FastAPI services.",
+    "resumeText": "Ten years of Python, FastAPI, and async programming experience.",
+    "coverLetterText": "Dear Hiring Manager, I am excited to apply to Initech...",
+}
+
+
+async def post_process(client, candidate):
+    # Vary the resume per request so /process doesn't coalesce them into one generation
+    form_data = {**FORM_DATA, "resumeText": f"{FORM_DATA['resumeText']} (candidate {candidate})"}
+    start = time.perf_counter()
+    response = await client.post("/process", data=form_data)
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def run(num_requests, latency):
+    fake_client = FakeGeminiClient(latency=latency)
+    main.app.dependency_overrides[main.get_gemini_helper] = lambda: GeminiHelper(client=fake_client)
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        single = await post_process(client, -1)
+
+        start = time.perf_counter()
+        burst = asyncio.gather(*(post_process(client, i) for i in range(num_requests)))
+        await asyncio.sleep(latency / 2)
+        home_start = time.perf_counter()
+        (await client.get("/")).raise_for_status()
+        home_latency = time.perf_counter() - home_start
+        await burst
+        total = time.perf_counter() - start
+
+    print(f"{'Stub model latency:':<28}{latency:.2f}s")
+    print(f"{'Single request:':<28}{single:.2f}s")
+    print(f"{f'{num_requests} parallel requests:':<28}{total:.2f}s ({total / single:.2f}x single)")
+    print(f"{'GET / during burst:':<28}{home_latency * 1000:.1f}ms")
+    print(f"{'Model calls made:':<28}{fake_client.aio.models.calls}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=1.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.latency))
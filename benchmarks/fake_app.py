@@ -0,0 +1,63 @@
+"""
+The app from main.py with Gemini replaced by a FakeGeminiClient, for benchmarks that run
+it under uvicorn in a separate process.
+
+Everything else (limiter, caches, document workers, middleware) is the real thing. The
+fake model is configured through environment variables:
+
+    BENCH_GEMINI_LATENCY        Seconds per model call (default 0.5)
+    BENCH_GEMINI_CPU_SECONDS    CPU seconds each call spends in the event loop (default 0)
+    BENCH_GEMINI_ERROR_RATE     Fraction of calls failing with BENCH_GEMINI_ERROR_CODE (default 0)
+    BENCH_GEMINI_ERROR_CODE     HTTP status of injected failures (default 503)
+    BENCH_GEMINI_SLOW_RATE      Fraction of calls taking BENCH_GEMINI_SLOW_LATENCY instead (default 0)
+    BENCH_GEMINI_SLOW_LATENCY   Seconds for a slow call (default 10)
+    BENCH_SEED                  Seed for the fault injector, for repeatable runs
+
+Usage:
+    BENCH_GEMINI_LATENCY=1.0 uvicorn benchmarks.fake_app:app
+    BENCH_GEMINI_LATENCY=1.0 uvicorn benchmarks.fake_app:app --workers 4
+"""
+import os
+
+import main
+from benchmarks.fake_gemini import FakeGeminiClient, FaultInjector
+from config import Config
+from helpers.context_cache_helper import ContextCacheHelper
+from helpers.gemini_helper import GeminiHelper
+
+
+seed = os.environ.get("BENCH_SEED")
+fake_client = FakeGeminiClient(
+    latency=float(os.environ.get("BENCH_GEMINI_LATENCY", "0.5")),
+    cpu_seconds=float(os.environ.get("BENCH_GEMINI_CPU_SECONDS", "0")),
+    faults=FaultInjector(
+        error_rate=float(os.environ.get("BENCH_GEMINI_ERROR_RATE", "0")),
+        error_code=int(os.environ.get("BENCH_GEMINI_ERROR_CODE", "503")),
+        slow_rate=float(os.environ.get("BENCH_GEMINI_SLOW_RATE", "0")),
+        slow_latency=float(os.environ.get("BENCH_GEMINI_SLOW_LATENCY", "10")),
+        seed=int(seed) if seed else None,
+    ),
+)
+fake_context_cache = ContextCacheHelper(fake_client) if Config.CONTEXT_CACHE_ENABLED else None
+
+
+def fake_gemini_helper_for(state) -> GeminiHelper:
+    """Same as main.gemini_helper_for, but bound to the fake client"""
+    return GeminiHelper(
+        client=fake_client,
+        job_cache=state.job_cache,
+        context_cache=fake_context_cache,
+        limiter=state.gemini_limiter,
+        document_executor=state.document_executor,
+        job_fetcher=state.job_fetcher,
+    )
+
+
+def get_fake_gemini_helper(request: main.Request) -> GeminiHelper:
+    return fake_gemini_helper_for(request.app.state)
+
+
+app = main.app
+app.dependency_overrides[main.get_gemini_helper] = get_fake_gemini_helper
+# Background jobs build their helper outside any request, so swap the factory they use too
+main.gemini_helper_for = fake_gemini_helper_for
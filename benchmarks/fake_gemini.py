@@ -0,0 +1,198 @@
+import asyncio
+import random
+import re
+import time
+from types import SimpleNamespace
+
+from google.genai import errors as genai_errors
+
+
+DEFAULT_FAKE_LETTER = (
+    "Dear Hiring Manager,\n\n"
+    "This is a stubbed cover letter produced by the fake Gemini client.\n\n"
+    "Sincerely,\nA Candidate"
+)
+
+
+# The paragraph markers a refinement prompt asks for, e.g. "Rewrite ONLY the paragraphs [P1], [P3]."
+REFINE_REQUEST = re.compile(r"Rewrite ONLY the paragraphs ((?:\[P\d+\](?:, )?)+)")
+
+
+def fake_answer(contents, text):
+    """The stub letter, or for refinement prompts a stub paragraph under each requested marker"""
+    if isinstance(contents, str):
+        return text
+    prompt = " ".join(part.text or "" for content in contents for part in content.parts)
+    request = REFINE_REQUEST.search(prompt)
+    if request is None:
+        return text
+    markers = re.findall(r"\[P\d+\]", request.group(1))
+    return "\n\n".join(
+        f"{marker}\nA refined paragraph from the fake Gemini client." for marker in markers
+    )
+
+
+class FakeResponse:
+    def __init__(self, text, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+def fake_usage(contents, text):
+    """Rough token counts (~4 characters per token) in the shape of Gemini's usage_metadata"""
+    return SimpleNamespace(
+        prompt_token_count=len(str(contents)) // 4,
+        cached_content_token_count=None,
+        candidates_token_count=len(text) // 4,
+        thoughts_token_count=None,
+    )
+
+
+class FakeAsyncCaches:
+    """In-memory cached-content store; expire() simulates Gemini dropping a cache early"""
+
+    def __init__(self):
+        self.live = {}
+        self.created = 0
+
+    async def create(self, model, config=None):
+        self.created += 1
+        name = f"cachedContents/fake-{self.created}"
+        self.live[name] = config
+        return SimpleNamespace(name=name, model=model)
+
+    def expire(self, name=None):
+        if name is None:
+            self.live.clear()
+        else:
+            self.live.pop(name, None)
+
+
+class FaultInjector:
+    """
+    Decides which fake calls fail or stall.
+
+    Scripted failures queued with fail_next() and slow calls queued with slow_next() are
+    used first, in order; after that each call fails with probability error_rate and,
+    independently, takes slow_latency instead of the normal latency with probability
+    slow_rate (a latency tail for hedging to cut).
+    """
+
+    def __init__(self, error_rate=0.0, error_code=503, slow_rate=0.0, slow_latency=10.0, seed=None):
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.scripted = []
+        self.scripted_slow = 0
+        self.random = random.Random(seed)
+        self.injected = 0
+
+    def fail_next(self, count=1, code=503):
+        self.scripted.extend([code] * count)
+
+    def slow_next(self, count=1):
+        self.scripted_slow += count
+
+    @staticmethod
+    def error_for(code):
+        error_class = genai_errors.ServerError if code >= 500 else genai_errors.ClientError
+        return error_class(code, {"error": {"message": f"Injected fault (HTTP {code})"}})
+
+    def maybe_fail(self):
+        if self.scripted:
+            code = self.scripted.pop(0)
+        elif self.random.random() < self.error_rate:
+            code = self.error_code
+        else:
+            return
+        self.injected += 1
+        raise self.error_for(code)
+
+    def latency(self, normal):
+        if self.scripted_slow:
+            self.scripted_slow -= 1
+            return self.slow_latency
+        return self.slow_latency if self.random.random() < self.slow_rate else normal
+
+
+class FakeAsyncModels:
+    def __init__(self, latency, text, caches, faults, cpu_seconds=0.0):
+        self.latency = latency
+        self.text = text
+        self.caches = caches
+        self.faults = faults
+        self.cpu_seconds = cpu_seconds
+        self.calls = 0
+        self.cancelled = 0
+
+    def _burn_cpu(self):
+        # Stands in for the CPU the real SDK spends building requests and parsing responses,
+        # which blocks the event loop just as this does
+        deadline = time.process_time() + self.cpu_seconds
+        while time.process_time() < deadline:
+            pass
+
+    def _check_cached_content(self, config):
+        cached_content = getattr(config, "cached_content", None)
+        if cached_content and cached_content not in self.caches.live:
+            raise genai_errors.ClientError(
+                404, {"error": {"message": f"CachedContent not found: {cached_content}"}}
+            )
+
+    async def generate_content(self, model, contents, config=None):
+        self.calls += 1
+        self._check_cached_content(config)
+        self._burn_cpu()
+        try:
+            await asyncio.sleep(self.faults.latency(self.latency))
+        except asyncio.CancelledError:
+            # e.g. the slower of two hedged requests
+            self.cancelled += 1
+            raise
+        self.faults.maybe_fail()
+        text = fake_answer(contents, self.text)
+        return FakeResponse(text, fake_usage(contents, text))
+
+    async def generate_content_stream(self, model, contents, config=None):
+        self.calls += 1
+        self._check_cached_content(config)
+        self._burn_cpu()
+        self.faults.maybe_fail()
+        return self._stream(contents)
+
+    async def _stream(self, contents):
+        # Spread the model latency over word-sized chunks, like a real token stream; the
+        # last chunk carries the usage totals
+        chunks = re.findall(r"\S+\s*", self.text)
+        for index, chunk in enumerate(chunks, start=1):
+            await asyncio.sleep(self.latency / len(chunks))
+            usage = fake_usage(contents, self.text) if index == len(chunks) else None
+            yield FakeResponse(chunk, usage)
+
+
+class FakeGeminiClient:
+    """
+    Stand-in for genai.Client exposing the async surface GeminiHelper uses.
+
+    Pass a FaultInjector (also reachable as client.faults) to simulate 429/503s and slow calls,
+    and one FakeAsyncCaches to several clients for workers sharing an API key's caches.
+    """
+
+    def __init__(
+        self, latency=1.0, text=DEFAULT_FAKE_LETTER, faults=None, cpu_seconds=0.0, caches=None
+    ):
+        caches = caches if caches is not None else FakeAsyncCaches()
+        self.faults = faults if faults is not None else FaultInjector()
+        self.aio = SimpleNamespace(
+            models=FakeAsyncModels(latency, text, caches, self.faults, cpu_seconds),
+            caches=caches,
+            aclose=self.aclose,
+        )
+        self.closed = False
+
+    async def aclose(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
@@ -0,0 +1,100 @@
+"""
+Local stand-in for the job boards fetch_job_details downloads postings from.
+
+Serves the recorded pages in benchmarks/fixtures/job_pages as an HTTP forward proxy, so
+the app fetches ordinary-looking URLs such as http://jobs.bench.test/greenhouse/17 (which
+pass validate_url_safety) when it runs with JOB_FETCH_PROXY pointing at this server. The
+number at the end of the URL is written into the page as its posting ID, so every
+distinct URL has distinct content and misses the job cache. Like most job boards, pages
+are gzipped when the client accepts it and carry an ETag, and a matching If-None-Match
+gets a 304. A path starting with /go/ redirects to the rest of the path, like the
+tracking links job boards put in front of postings.
+"""
+import gzip
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse
+
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "job_pages"
+JOB_SITE_HOST = "jobs.bench.test"
+
+
+def load_pages():
+    return {path.stem: path.read_text(encoding="utf-8") for path in FIXTURES_DIR.glob("*.html")}
+
+
+class FakeJobSite:
+    """
+    Threaded HTTP server answering proxied GETs for http://jobs.bench.test/<page>/<id>.
+
+    latency is added to every response to mimic a remote site; requests counts requests
+    answered and not_modified the 304s among them.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.pages = load_pages()
+        self.requests = 0
+        self.not_modified = 0
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                site.requests += 1
+                # Proxied requests carry the absolute URL in the request line
+                parts = urlparse(self.path).path.strip("/").split("/")
+                if parts[0] == "go":
+                    self.send_response(302)
+                    self.send_header("Location", "/" + "/".join(parts[1:]))
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                page = site.pages.get(parts[0]) if parts else None
+                if page is None:
+                    self.send_error(404)
+                    return
+                posting_id = parts[1] if len(parts) > 1 else "0"
+                body = page.replace("{posting_id}", posting_id).encode("utf-8")
+                etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+                if site.latency:
+                    time.sleep(site.latency)
+                if self.headers.get("If-None-Match") == etag:
+                    site.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("ETag", etag)
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def proxy_url(self):
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def url(self, page, posting_id):
+        return f"http://{JOB_SITE_HOST}/{page}/{posting_id}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,106 @@
+"""
+Accuracy and speed of the local job page parser on the recorded pages in benchmarks/fixtures/job_pages.
+
+Each page's expected results are in job_pages/expected.json:
+
+- `local`: whether the parsed details should be used as they are, skipping the Gemini summary
+  (i.e. reach Config.JOB_PARSER_MIN_CONFIDENCE); the other checks apply either way
+- `source`: the parser expected to read it ("json_ld", "greenhouse", "lever", "workday", "headings")
+- `title`, `company`: expected exactly
+- `includes`: phrases from the posting the details must keep
+- `excludes`: benefits, legal boilerplate and page furniture they must leave out
+
+Extraction (trafilatura plus the parser, as the app runs it) is timed over --runs runs per
+page. Exits with 1 if any check fails, so it can guard changes to the parser; add a page
+and its expectations whenever a real posting is read wrongly.
+
+Usage:
+    python -m benchmarks.job_parser_benchmark --runs 20 --show greenhouse
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from benchmarks.fake_job_site import FIXTURES_DIR, load_pages
+from config import Config
+from helpers.job_posting_helper import extract_job_page
+
+
+def check_page(posting, expected):
+    """
+    Compare a parse result with a page's expectations.
+
+    Returns:
+        list: Descriptions of the checks that failed
+    """
+    local = posting is not None and posting.confidence >= Config.JOB_PARSER_MIN_CONFIDENCE
+    failures = []
+    if local != expected["local"]:
+        failures.append(f"expected local={expected['local']}, got local={local}")
+    if posting is None:
+        return failures
+
+    if "source" in expected and posting.source != expected["source"]:
+        failures.append(f"source {posting.source!r}, expected {expected['source']!r}")
+    for field in ("title", "company"):
+        if field in expected and getattr(posting, field) != expected[field]:
+            failures.append(f"{field} {getattr(posting, field)!r}, expected {expected[field]!r}")
+    details = posting.job_details()
+    for phrase in expected.get("includes", []):
+        if phrase not in details:
+            failures.append(f"missing {phrase!r}")
+    for phrase in expected.get("excludes", []):
+        if phrase.casefold() in details.casefold():
+            failures.append(f"kept {phrase!r}")
+    return failures
+
+
+def run(args):
+    pages = load_pages()
+    expectations = json.loads((FIXTURES_DIR / "expected.json").read_text(encoding="utf-8"))
+    missing = sorted(set(pages) - set(expectations))
+    if missing:
+        print(f"No expectations in expected.json for: {', '.join(missing)}")
+        return 1
+
+    print(f"Pages need confidence >= {Config.JOB_PARSER_MIN_CONFIDENCE} to skip the Gemini summary\n")
+    print(f"{'Page':<16}{'Source':<12}{'Confidence':>11}{'Local':>7}{'Extract p50':>13}  Result")
+    failed = 0
+    local_pages = 0
+    for name in sorted(pages):
+        html = pages[name].replace("{posting_id}", "1").encode("utf-8")
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            _, posting = extract_job_page(html)
+            timings.append(time.perf_counter() - start)
+
+        failures = check_page(posting, expectations[name])
+        failed += bool(failures)
+        local = posting is not None and posting.confidence >= Config.JOB_PARSER_MIN_CONFIDENCE
+        local_pages += local
+        print(
+            f"{name:<16}{posting.source if posting else '-':<12}"
+            f"{posting.confidence if posting else 0:>11.2f}{'yes' if local else 'no':>7}"
+            f"{statistics.median(timings) * 1000:>11.1f}ms  {'ok' if not failures else 'FAIL'}"
+        )
+        for failure in failures:
+            print(f"    {failure}")
+        if name in args.show and posting is not None:
+            print("\n" + "\n".join("    " + line for line in posting.job_details().splitlines()) + "\n")
+
+    print(
+        f"\n{len(pages) - failed}/{len(pages)} pages as expected; "
+        f"{local_pages} of {len(pages)} would skip the Gemini summary"
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=10, help="timed extractions per page")
+    parser.add_argument("--show", type=lambda value: value.split(","), default=[],
+                        help="comma-separated pages whose parsed details to print")
+    sys.exit(run(parser.parse_args()))
@@ -0,0 +1,316 @@
+"""
+Load benchmark for /process with a fake Gemini model and fake job sites.
+
+Runs benchmarks.fake_app under uvicorn in a subprocess for each scenario (so each gets a
+fresh process and its own peak-memory reading), then drives /process, or /process/stream
+with --stream, from a fixed number of concurrent clients. Each request uses a distinct
+resume so nothing is coalesced or served from a cache. With --job-source link the job
+details come from recorded postings served by a local fake job site (see
+benchmarks.fake_job_site) and go through the real download, extraction and summary path.
+
+Scenarios:
+    text    Resume and cover letter pasted as text
+    docx    Resume uploaded as a DOCX file
+    pdf     Resume uploaded as a text PDF
+
+For each scenario it reports throughput, latency percentiles, errors, the server's peak
+RSS (plus its document workers'), and the mean time per stage from /metrics. Results can
+be saved as JSON, tagged with the git commit, and compared with an earlier run; the
+comparison flags throughput drops and latency increases beyond --tolerance and exits
+with status 1, so it can gate a CI job.
+
+Usage:
+    python -m benchmarks.load_benchmark --concurrency 16 --requests 200 --output before.json
+    python -m benchmarks.load_benchmark --job-source link --compare before.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+from docx import Document
+
+from benchmarks.fake_job_site import FakeJobSite
+from benchmarks.pdf_payload_benchmark import RESUME_LINES, build_pdf
+from benchmarks.upload_memory_benchmark import free_port, memory_kb, wait_until_ready
+
+
+SCENARIOS = ["text", "docx", "pdf"]
+JOB_FIELDS = {
+    "companyDescription": "Acme Corp builds rockets for roadrunner enthusiasts.",
+    "roleDescription": "Senior Python engineer working on FastAPI services.",
+}
+COVER_LETTER = "Dear Hiring Manager, I am excited to apply to Initech as a software engineer..."
+STAGE_SUM = re.compile(r'^cover_letter_stage_seconds_(sum|count)\{stage="([^"]+)",outcome="ok"\} (\S+)$')
+
+
+def build_docx(lines):
+    document = Document()
+    for line in lines:
+        document.add_paragraph(line)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def build_payload(scenario, index, job_site, job_pages):
+    """Form fields and files for request number index; every index gets a distinct resume"""
+    resume_lines = [*RESUME_LINES, f"Candidate reference {index}"]
+    if job_site is not None:
+        page = job_pages[index % len(job_pages)]
+        data = {"jobLink": job_site.url(page, index)}
+    else:
+        data = dict(JOB_FIELDS)
+    data["coverLetterText"] = COVER_LETTER
+    files = None
+    if scenario == "text":
+        data["resumeText"] = "\n".join(resume_lines)
+    elif scenario == "docx":
+        files = {"resumeFile": ("resume.docx", build_docx(resume_lines))}
+    else:
+        files = {"resumeFile": ("resume.pdf", build_pdf(resume_lines))}
+    return data, files
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def child_pids(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as children:
+            return [int(child) for child in children.read().split()]
+    except OSError:
+        return []
+
+
+def stage_totals(metrics_text):
+    """{stage: [seconds, count]} for successful stages in a /metrics scrape"""
+    totals = {}
+    for line in metrics_text.splitlines():
+        match = STAGE_SUM.match(line)
+        if match:
+            kind, stage, value = match.groups()
+            totals.setdefault(stage, [0.0, 0])[kind == "count"] += float(value)
+    return totals
+
+
+def stage_means(before, after):
+    means = {}
+    for stage, (seconds, count) in after.items():
+        seconds -= before.get(stage, [0.0, 0])[0]
+        count -= before.get(stage, [0.0, 0])[1]
+        if count:
+            means[stage] = round(seconds / count * 1000, 1)
+    return means
+
+
+async def send(client, endpoint, data, files):
+    """POST one request; returns (status, seconds). Streams count as done at their last event."""
+    start = time.perf_counter()
+    try:
+        async with client.stream("POST", endpoint, data=data, files=files) as response:
+            body = await response.aread()
+        status = response.status_code
+        if status == 200 and endpoint.endswith("/stream") and b"event: error" in body:
+            status = "stream-error"
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    return status, time.perf_counter() - start
+
+
+async def run_scenario(scenario, args, job_site):
+    total = args.warmup + args.requests
+    job_pages = sorted(job_site.pages) if job_site is not None else None
+    payloads = [build_payload(scenario, index, job_site, job_pages) for index in range(total)]
+
+    port = free_port()
+    env = {
+        **os.environ,
+        "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY") or "benchmark",
+        "BENCH_GEMINI_LATENCY": str(args.latency),
+        "BENCH_GEMINI_ERROR_RATE": str(args.error_rate),
+        "BENCH_GEMINI_ERROR_CODE": str(args.error_code),
+        "BENCH_SEED": str(args.seed),
+    }
+    if job_site is not None:
+        env["JOB_FETCH_PROXY"] = job_site.proxy_url
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "benchmarks.fake_app:app",
+            "--port", str(port), "--log-level", "warning",
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    endpoint = "/process/stream" if args.stream else "/process"
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", timeout=300, limits=limits, trust_env=False
+        ) as client:
+            await wait_until_ready(client, process)
+            for data, files in payloads[: args.warmup]:
+                await send(client, endpoint, data, files)
+            stages_before = stage_totals((await client.get("/metrics")).text)
+
+            queue = iter(payloads[args.warmup :])
+            results = []
+
+            async def worker():
+                for data, files in queue:
+                    results.append(await send(client, endpoint, data, files))
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - start
+            stages_after = stage_totals((await client.get("/metrics")).text)
+        peak_kb = memory_kb(process.pid, "VmHWM")
+        workers_peak_kb = sum(memory_kb(child, "VmHWM") for child in child_pids(process.pid))
+    finally:
+        process.terminate()
+        process.wait()
+
+    latencies = sorted(seconds for status, seconds in results if status == 200)
+    errors = {}
+    for status, _ in results:
+        if status != 200:
+            errors[str(status)] = errors.get(str(status), 0) + 1
+    return {
+        "requests": len(results),
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1) if latencies else None,
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1) if latencies else None,
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+        "workers_peak_rss_mb": round(workers_peak_kb / 1024, 1),
+        "stage_mean_ms": stage_means(stages_before, stages_after),
+    }
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout
+        return commit + ("-dirty" if dirty.strip() else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_results(results):
+    print(
+        f"{'Scenario':<10}{'Requests':>9}{'Errors':>8}{'RPS':>9}{'p50':>10}{'p95':>10}{'p99':>10}"
+        f"{'Peak RSS':>11}{'Workers':>10}"
+    )
+    for scenario, result in results.items():
+        print(
+            f"{scenario:<10}{result['requests']:>9}{sum(result['errors'].values()):>8}"
+            f"{result['rps']:>9.2f}"
+            + "".join(
+                f"{result[key]:>8.0f}ms" if result[key] is not None else f"{'-':>10}"
+                for key in ("p50_ms", "p95_ms", "p99_ms")
+            )
+            + f"{result['peak_rss_mb']:>9.1f}MB{result['workers_peak_rss_mb']:>8.1f}MB"
+        )
+    for scenario, result in results.items():
+        stages = ", ".join(f"{stage} {ms:.1f}ms" for stage, ms in sorted(result["stage_mean_ms"].items()))
+        print(f"  {scenario} stage means: {stages or '-'}")
+
+
+def compare(results, baseline, tolerance):
+    """Print changes against a baseline run; returns True if anything regressed"""
+    print(f"\nCompared with {baseline['commit']} ({baseline['timestamp']}):")
+    if baseline["settings"] != results["settings"]:
+        print("  warning: the baseline was run with different settings; deltas may not be meaningful")
+    regressed = False
+    for scenario, result in results["results"].items():
+        old = baseline["results"].get(scenario)
+        if old is None:
+            continue
+        changes = []
+        # (key, True when higher is better)
+        for key, higher_is_better in [("rps", True), ("p50_ms", False), ("p95_ms", False), ("p99_ms", False), ("peak_rss_mb", False)]:
+            if not old.get(key) or result.get(key) is None:
+                continue
+            change = (result[key] - old[key]) / old[key]
+            worse = -change if higher_is_better else change
+            flag = " REGRESSION" if worse > tolerance else ""
+            regressed = regressed or bool(flag)
+            changes.append(f"{key} {old[key]} -> {result[key]} ({change:+.0%}){flag}")
+        print(f"  {scenario}: " + "; ".join(changes))
+    return regressed
+
+
+async def run(args):
+    job_site = FakeJobSite(latency=args.site_latency).start() if args.job_source == "link" else None
+    try:
+        results = {}
+        for scenario in args.scenarios:
+            results[scenario] = await run_scenario(scenario, args, job_site)
+    finally:
+        if job_site is not None:
+            job_site.stop()
+
+    settings = {
+        key: getattr(args, key)
+        for key in (
+            "concurrency", "requests", "warmup", "latency", "error_rate", "error_code",
+            "stream", "job_source", "site_latency",
+        )
+    }
+    report = {
+        "commit": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "settings": settings,
+        "results": results,
+    }
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+        print(f"\nSaved results to {args.output}")
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        if compare(report, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scenarios", type=lambda value: value.split(","), default=SCENARIOS,
+                        help=f"comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=10, help="unmeasured requests sent first")
+    parser.add_argument("--latency", type=float, default=0.5, help="fake Gemini seconds per call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of Gemini calls that fail")
+    parser.add_argument("--error-code", type=int, default=503)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--stream", action="store_true", help="drive /process/stream instead of /process")
+    parser.add_argument("--job-source", choices=["text", "link"], default="text",
+                        help="job descriptions as text, or links served by the fake job site")
+    parser.add_argument("--site-latency", type=float, default=0.05, help="fake job site seconds per page")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="relative change counted as a regression (default 10%%)")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    asyncio.run(run(args))
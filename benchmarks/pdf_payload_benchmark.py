@@ -0,0 +1,163 @@
+"""
+Payload benchmark for sending PDF resumes to Gemini as extracted text vs. the raw file.
+
+Builds synthetic one-page resume PDFs (optionally with a large embedded photo, like a
+designer resume, or with no text at all, like a scan), runs them through the upload
+validation used by /process, and compares the rewrite request each path produces:
+serialized request size, time spent extracting, and estimated upload time at the given
+uplink speed. With --live and GEMINI_API_KEY set it also times a real generate_content
+call for both paths and reports Gemini's prompt token counts.
+
+Usage:
+    python -m benchmarks.pdf_payload_benchmark --image-mb 5 --uplink-mbps 20
+    python -m benchmarks.pdf_payload_benchmark --image-mb 5 --live
+"""
+import argparse
+import asyncio
+import io
+import os
+import time
+
+from fastapi import UploadFile
+
+from benchmarks.fake_gemini import FakeGeminiClient
+from config import Config
+from helpers.form_validation_helper import FileValidationHelper
+from helpers.gemini_helper import GeminiHelper
+
+
+RESUME_LINES = [
+    "Jane Doe - Senior Software Engineer",
+    "jane@example.com | Portland, OR",
+    "",
+    "EXPERIENCE",
+    *[
+        f"- Led project {i}: built Python and FastAPI services handling {i * 1000:,} requests a day,"
+        f" cut p95 latency by {10 + i}% and mentored {i % 4 + 1} engineers."
+        for i in range(1, 25)
+    ],
+    "",
+    "SKILLS",
+    "Python, FastAPI, asyncio, PostgreSQL, Redis, Docker, Kubernetes, AWS, GCP, Terraform",
+]
+JOB_DETAILS = "Acme Corp is hiring a Senior Python engineer to build FastAPI services."
+COVER_LETTER = "Dear Hiring Manager, I am excited to apply to Initech as a software engineer..."
+
+
+def pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def build_pdf(lines, image_bytes=0):
+    """Minimal single-page PDF with Helvetica text lines and an optional incompressible image"""
+    text_ops = " ".join(f"({pdf_escape(line)}) '" for line in lines)
+    content = f"BT /F1 9 Tf 40 770 Td 11 TL {text_ops} ET".encode("latin-1")
+    resources = "/Font << /F1 4 0 R >>"
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        None,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content),
+    ]
+    if image_bytes:
+        side = int((image_bytes / 3) ** 0.5)
+        pixels = os.urandom(side * side * 3)
+        objects.append(
+            b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB "
+            b"/BitsPerComponent 8 /Length %d >>\nstream\n%s\nendstream"
+            % (side, side, len(pixels), pixels)
+        )
+        resources += " /XObject << /Im1 6 0 R >>"
+    objects[2] = (
+        f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        f"/Resources << {resources} >> /Contents 5 0 R >>"
+    ).encode()
+
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    return bytes(pdf)
+
+
+async def validated_upload(pdf):
+    """Run a PDF through the same validation /process uses; returns (data, mime, seconds)"""
+    upload = UploadFile(file=io.BytesIO(pdf), size=len(pdf), filename="resume.pdf")
+    helper = FileValidationHelper(upload)
+    start = time.perf_counter()
+    success, error = await helper.validate_file()
+    elapsed = time.perf_counter() - start
+    if not success:
+        raise RuntimeError(error)
+    return helper.content, helper.mime_type, elapsed
+
+
+def rewrite_request(data, mime_type):
+    parts = GeminiHelper(client=FakeGeminiClient()).build_rewrite_parts(
+        job_details=JOB_DETAILS,
+        existing_letter=COVER_LETTER,
+        resume_file_data=data,
+        resume_file_mime_type=mime_type,
+    )
+    contents, config = GeminiHelper.build_inline_rewrite_request(*parts)
+    size = sum(len(content.model_dump_json(exclude_none=True)) for content in contents)
+    return contents, config, size
+
+
+async def live_call(client, contents, config):
+    start = time.perf_counter()
+    response = await client.aio.models.generate_content(
+        model=Config.GEMINI_MODEL, contents=contents, config=config
+    )
+    return time.perf_counter() - start, response.usage_metadata.prompt_token_count
+
+
+async def run(image_mb, uplink_mbps, live):
+    client = GeminiHelper.create_client() if live else None
+    scenarios = {
+        "text-only PDF": build_pdf(RESUME_LINES),
+        f"PDF + {image_mb}MB photo": build_pdf(RESUME_LINES, int(image_mb * 1024 * 1024)),
+        "scanned (no text)": build_pdf([], int(image_mb * 1024 * 1024)),
+    }
+
+    header = f"{'Scenario':<22}{'Path':<10}{'File':>10}{'Request':>11}{'Extract':>10}{'Upload':>9}"
+    print(header + ("  Gemini latency / prompt tokens" if live else ""))
+    for name, pdf in scenarios.items():
+        data, mime_type, extract_seconds = await validated_upload(pdf)
+        paths = {"raw blob": (pdf, "application/pdf", 0.0)}
+        if mime_type == "text/plain":
+            paths["text"] = (data, mime_type, extract_seconds)
+        for path, (path_data, path_mime_type, seconds) in paths.items():
+            contents, config, size = rewrite_request(path_data, path_mime_type)
+            upload_seconds = size * 8 / (uplink_mbps * 1_000_000)
+            line = (
+                f"{name:<22}{path:<10}{len(pdf) / 1024:>8.0f}KB{size / 1024:>9.0f}KB"
+                f"{seconds * 1000:>8.1f}ms{upload_seconds:>8.2f}s"
+            )
+            if live:
+                latency, tokens = await live_call(client, contents, config)
+                line += f"  {latency:.2f}s / {tokens:,}"
+            print(line)
+        if mime_type != "text/plain":
+            print(f"{'':<22}(extraction yielded too little text; /process sends the raw blob)")
+
+    if client is not None:
+        await GeminiHelper.close_client(client)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--image-mb", type=float, default=5)
+    parser.add_argument("--uplink-mbps", type=float, default=20)
+    parser.add_argument("--live", action="store_true", help="also call Gemini (needs GEMINI_API_KEY)")
+    args = parser.parse_args()
+    asyncio.run(run(args.image_mb, args.uplink_mbps, args.live))
@@ -0,0 +1,153 @@
+"""
+Page-load benchmark for the saved form: how long the page takes to restore uploaded files
+and text from browser storage, and how much main-thread time autosave costs while typing.
+
+Runs benchmarks.fake_app under uvicorn and drives headless Chromium with Playwright. For
+each file size, a fresh browser profile uploads a resume and a cover letter of that size
+plus some text, waits for them to be saved, then reloads the page --runs times, reading the
+`form-restore` measure script.js records once the form has been restored (and checking the
+files came back intact). It then types into a text field with the files selected and adds
+up the long tasks (>50ms of main-thread work) seen meanwhile.
+
+Needs Playwright and its Chromium build:
+
+    pip install playwright && playwright install chromium
+
+Usage:
+    python -m benchmarks.restore_benchmark --file-mb 0.5,2,8 --runs 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+
+import httpx
+
+from benchmarks.upload_memory_benchmark import free_port, wait_until_ready
+
+
+TYPED_TEXT = "Experienced Python engineer. " * 4
+
+FILES_SAVED = """
+() => new Promise(resolve => {
+    const request = indexedDB.open('coverLetterTweaker');
+    request.onsuccess = () => {
+        const count = request.result.transaction('files').objectStore('files').count();
+        count.onsuccess = () => resolve(count.result);
+    };
+    request.onerror = () => resolve(0);
+})
+"""
+
+RESTORE_MS = """
+() => {
+    const entry = performance.getEntriesByName('form-restore')[0];
+    return entry ? entry.duration : null;
+}
+"""
+
+RESTORED_SIZES = """
+() => ['resumeFile', 'coverLetterFile'].map(id => {
+    const file = document.getElementById(id).files[0];
+    return file ? file.size : null;
+})
+"""
+
+OBSERVE_LONG_TASKS = """
+() => {
+    window.longTaskMs = 0;
+    new PerformanceObserver(list => {
+        list.getEntries().forEach(entry => { window.longTaskMs += entry.duration; });
+    }).observe({ type: 'longtask' });
+}
+"""
+
+
+def pdf_of_size(size):
+    """Bytes that pass the server's and the page's .pdf checks, padded to size"""
+    head = b"%PDF-1.4\n"
+    return head + b"0" * max(0, size - len(head))
+
+
+async def measure_size(browser, base_url, size, runs):
+    context = await browser.new_context()
+    page = await context.new_page()
+    try:
+        await page.goto(base_url)
+        await page.wait_for_function(RESTORE_MS)
+        await page.set_input_files(
+            "#resumeFile",
+            {"name": "resume.pdf", "mimeType": "application/pdf", "buffer": pdf_of_size(size)},
+        )
+        await page.set_input_files(
+            "#coverLetterFile",
+            {"name": "cover_letter.pdf", "mimeType": "application/pdf", "buffer": pdf_of_size(size)},
+        )
+        await page.click('.toggle-btn[data-target="job"][data-mode="text"]')
+        await page.fill("#companyDescription", "Acme Corp builds rockets.")
+        await page.wait_for_function(f"async () => (await ({FILES_SAVED})()) === 2")
+        # Let the debounced text save finish
+        await page.wait_for_timeout(1000)
+
+        restore_ms = []
+        for _ in range(runs):
+            await page.reload()
+            await page.wait_for_function(RESTORE_MS)
+            restore_ms.append(await page.evaluate(RESTORE_MS))
+            sizes = await page.evaluate(RESTORED_SIZES)
+            if sizes != [size, size]:
+                raise RuntimeError(f"Restored files have sizes {sizes}, expected {size}")
+
+        await page.evaluate(OBSERVE_LONG_TASKS)
+        await page.type("#roleDescription", TYPED_TEXT, delay=20)
+        await page.wait_for_timeout(1000)
+        long_task_ms = await page.evaluate("() => window.longTaskMs")
+    finally:
+        await context.close()
+    return statistics.median(restore_ms), max(restore_ms), long_task_ms
+
+
+async def run(args):
+    try:
+        from playwright.async_api import async_playwright
+    except ImportError:
+        print("Playwright is not installed: pip install playwright && playwright install chromium")
+        return 2
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "benchmarks.fake_app:app",
+            "--port", str(port), "--log-level", "warning",
+        ],
+        env={**os.environ, "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY") or "benchmark"},
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        async with httpx.AsyncClient(base_url=base_url, trust_env=False) as client:
+            await wait_until_ready(client, process)
+        async with async_playwright() as playwright:
+            browser = await playwright.chromium.launch()
+            try:
+                print(f"{'File size':>10}{'Restore p50':>14}{'Restore max':>14}{'Long tasks typing':>20}")
+                for megabytes in args.file_mb:
+                    size = int(megabytes * 1024 * 1024)
+                    median, worst, long_task_ms = await measure_size(browser, base_url, size, args.runs)
+                    print(f"{megabytes:>8}MB{median:>12.1f}ms{worst:>12.1f}ms{long_task_ms:>18.0f}ms")
+            finally:
+                await browser.close()
+    finally:
+        process.terminate()
+        process.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--file-mb", type=lambda value: [float(size) for size in value.split(",")],
+                        default=[0.5, 2, 8], help="comma-separated sizes of each uploaded file")
+    parser.add_argument("--runs", type=int, default=5, help="page reloads per file size")
+    sys.exit(asyncio.run(run(parser.parse_args())))
@@ -0,0 +1,158 @@
+"""
+Cold-start benchmark: import time of the app and time until it serves its first page.
+
+Each run starts a fresh interpreter, as a scale-to-zero machine does:
+
+    imports     `python -X importtime -c "import main"`; reports the total and the
+                heaviest modules main imports directly (median over runs)
+    lazy        Which of the heavy modules (google.genai, trafilatura, the document
+                parsers, ...) `import main` pulls in; they should all be deferred to the
+                warm-up, and the benchmark exits 1 if any is imported eagerly
+    startup     Starts `uvicorn main:app` and polls it, recording when `/` first returns
+                200 and when `/healthz/ready` does (the client and workers are warm)
+
+A dummy API key is enough; no Gemini calls are made.
+
+Usage:
+    python -m benchmarks.startup_benchmark --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.upload_memory_benchmark import free_port
+
+
+# Imported lazily by the app; none of them should be loaded by `import main`
+HEAVY_MODULES = ["google.genai", "google.api_core", "trafilatura", "docx", "pypdf", "magic"]
+
+
+def benchmark_env():
+    return {**os.environ, "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY") or "benchmark"}
+
+
+def parse_importtime(stderr, module):
+    """
+    Total microseconds of `module` and the cumulative microseconds of each module it imports
+    directly, from -X importtime output.
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # Header line
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((depth, int(cumulative), name.strip()))
+
+    # Children are printed before their parent, one level deeper
+    for index, (depth, cumulative, name) in enumerate(entries):
+        if name == module and depth == 0:
+            children = {}
+            for child_depth, child_cumulative, child_name in reversed(entries[:index]):
+                if child_depth == 0:
+                    break
+                if child_depth == 1:
+                    children[child_name] = child_cumulative
+            return cumulative, children
+    raise RuntimeError(f"{module} not found in the -X importtime output")
+
+
+def measure_imports(runs):
+    totals = []
+    children = {}
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import main"],
+            env=benchmark_env(),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        total, run_children = parse_importtime(result.stderr, "main")
+        totals.append(total)
+        for name, cumulative in run_children.items():
+            children.setdefault(name, []).append(cumulative)
+    return statistics.median(totals), {
+        name: statistics.median(values) for name, values in children.items()
+    }
+
+
+def eagerly_imported():
+    """HEAVY_MODULES that `import main` loads"""
+    script = (
+        "import sys, main\n"
+        f"print('\\n'.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script], env=benchmark_env(), capture_output=True, text=True, check=True
+    )
+    return result.stdout.split()
+
+
+def measure_startup(timeout=60):
+    """Seconds from launching uvicorn until `/` returns 200, and until /healthz/ready does"""
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=benchmark_env(),
+        stdout=subprocess.DEVNULL,
+    )
+    first_page = ready = None
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=5, trust_env=False) as client:
+            while ready is None:
+                if process.poll() is not None:
+                    raise RuntimeError("uvicorn exited during startup")
+                if time.perf_counter() - started > timeout:
+                    raise RuntimeError("uvicorn did not become ready")
+                try:
+                    if first_page is None:
+                        if client.get("/").status_code == 200:
+                            first_page = time.perf_counter() - started
+                            continue
+                    elif client.get("/healthz/ready").status_code == 200:
+                        ready = time.perf_counter() - started
+                        continue
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.01)
+    finally:
+        process.terminate()
+        process.wait()
+    return first_page, ready
+
+
+def main(args):
+    total, children = measure_imports(args.runs)
+    print(f"import main: {total / 1000:.0f}ms (median of {args.runs})")
+    for name, cumulative in sorted(children.items(), key=lambda item: -item[1])[: args.top]:
+        print(f"  {name:<40}{cumulative / 1000:>8.1f}ms")
+
+    eager = eagerly_imported()
+    print(f"\nHeavy modules imported by main: {', '.join(eager) or 'none'}")
+
+    first_pages, readies = [], []
+    for _ in range(args.runs):
+        first_page, ready = measure_startup()
+        first_pages.append(first_page)
+        readies.append(ready)
+    print(
+        f"\nFirst / served after {statistics.median(first_pages) * 1000:.0f}ms, "
+        f"ready after {statistics.median(readies) * 1000:.0f}ms (medians of {args.runs})"
+    )
+    return 1 if eager else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="how many of main's imports to list")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,152 @@
+"""
+Peak-memory regression benchmark for file uploads.
+
+Starts the app under uvicorn in a subprocess for each scenario, streams multipart uploads
+at it, and reports the server's resident memory before the scenario and at its peak
+(VmHWM from /proc, so Linux only). The uploads use text descriptions and a cover letter
+that make validation fail after the files are read, so no Gemini calls are made; a dummy
+API key is enough.
+
+Scenarios:
+    declared-oversize   One upload whose Content-Length is over MAX_REQUEST_BYTES
+    chunked-oversize    The same body sent with chunked encoding (no Content-Length)
+    oversized-file      One file just over MAX_FILE_SIZE_BYTES inside an allowed request
+    concurrent          N concurrent uploads of a file just under MAX_FILE_SIZE_BYTES
+
+With bounded-memory upload handling the peak stays within a few multiples of the file
+size limit however large the request body is.
+
+Usage:
+    python -m benchmarks.upload_memory_benchmark --oversize-mb 500 --concurrent 8
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+
+from config import Config
+
+
+FORM_FIELDS = {
+    "companyDescription": "Acme Corp builds rockets for roadrunner enthusiasts.",
+    "roleDescription": "Senior Python engineer working on FastAPI services.",
+    "coverLetterText": "Dear Hiring Manager, I am excited to apply to Initech...",
+}
+CHUNK = b"a" * (1024 * 1024)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def memory_kb(pid, field):
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+def multipart_parts(file_size, boundary):
+    """Opening bytes, file size and closing bytes of a multipart body with one text file"""
+    head = b"".join(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        for name, value in FORM_FIELDS.items()
+    )
+    head += (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="resumeFile"; filename="resume.txt"\r\n'
+        "Content-Type: text/plain\r\n\r\n"
+    ).encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+    return head, tail
+
+
+async def multipart_body(file_size, head, tail):
+    yield head
+    remaining = file_size
+    while remaining:
+        chunk = CHUNK[: min(remaining, len(CHUNK))]
+        remaining -= len(chunk)
+        yield chunk
+    yield tail
+
+
+async def upload(client, file_size, declare_length=True):
+    boundary = uuid.uuid4().hex
+    head, tail = multipart_parts(file_size, boundary)
+    headers = {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+    if declare_length:
+        headers["Content-Length"] = str(len(head) + file_size + len(tail))
+    try:
+        response = await client.post(
+            "/process", content=multipart_body(file_size, head, tail), headers=headers
+        )
+        return response.status_code
+    except httpx.HTTPError as e:
+        # The server may close the connection as soon as it has rejected the body
+        return type(e).__name__
+
+
+async def wait_until_ready(client, process):
+    for _ in range(100):
+        if process.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            (await client.get("/")).raise_for_status()
+            return
+        except httpx.HTTPError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("uvicorn did not start")
+
+
+async def run_scenario(name, uploads):
+    port = free_port()
+    env = {**os.environ, "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY") or "benchmark"}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=300) as client:
+            await wait_until_ready(client, process)
+            baseline = memory_kb(process.pid, "VmRSS")
+            start = time.perf_counter()
+            statuses = await asyncio.gather(*(upload(client, *args) for args in uploads))
+            elapsed = time.perf_counter() - start
+        peak = memory_kb(process.pid, "VmHWM")
+    finally:
+        process.terminate()
+        process.wait()
+
+    print(
+        f"{name:<20}{baseline / 1024:>10.1f}MB{peak / 1024:>10.1f}MB{elapsed:>9.2f}s  "
+        f"{', '.join(sorted({str(status) for status in statuses}))}"
+    )
+
+
+async def run(oversize_mb, concurrent):
+    file_limit = Config.MAX_FILE_SIZE_BYTES
+    oversize = oversize_mb * 1024 * 1024
+    print(f"{'Scenario':<20}{'Baseline':>12}{'Peak RSS':>12}{'Time':>10}  Statuses")
+    await run_scenario("declared-oversize", [(oversize, True)])
+    await run_scenario("chunked-oversize", [(oversize, False)])
+    await run_scenario("oversized-file", [(file_limit + 1024 * 1024, True)])
+    await run_scenario("concurrent", [(file_limit - 1024 * 1024, True)] * concurrent)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--oversize-mb", type=int, default=500)
+    parser.add_argument("--concurrent", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(run(args.oversize_mb, args.concurrent))
@@ -0,0 +1,167 @@
+"""
+Throughput of /process as the number of uvicorn worker processes grows, against a fake model.
+
+For each worker count, runs benchmarks.fake_app under `uvicorn --workers N` with the workers
+sharing state through one SQLite file (as `python main.py` does), and drives /process from
+a fixed number of concurrent clients. Every model call spends --cpu seconds of CPU in the
+event loop as well as --latency seconds waiting, so one process saturates a CPU and extra
+workers can only help when there are CPUs to run them on.
+
+Before measuring, it checks the state really is shared: a document uploaded once is used
+by requests sent on fresh connections, which the kernel spreads over the workers, and any
+worker that can't find it fails the check.
+
+Reports requests per second, latency percentiles and the speedup over the first worker
+count, plus how many distinct workers answered. The Gemini concurrency limit is shared too,
+so it is raised (--gemini-limit) to keep it from capping throughput.
+
+Usage:
+    python -m benchmarks.worker_scaling_benchmark --workers 1,2,4 --concurrency 32 --requests 300
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.load_benchmark import build_payload, percentile, send
+from benchmarks.upload_memory_benchmark import free_port, wait_until_ready
+from helpers.server_helper import available_cpus
+
+
+async def check_sharing(base_url, requests):
+    """
+    Upload a resume once, then use its ID from `requests` fresh connections.
+
+    Returns:
+        tuple: (requests that could not find the document, distinct worker PIDs seen)
+    """
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, trust_env=False) as client:
+        response = await client.post(
+            "/documents", files={"file": ("resume.txt", b"Shared resume\nPython, FastAPI", "text/plain")}
+        )
+        response.raise_for_status()
+        document_id = response.json()["document_id"]
+
+    missing = 0
+    pids = set()
+    for index in range(requests):
+        # A new connection each time, so requests aren't pinned to one worker
+        async with httpx.AsyncClient(base_url=base_url, timeout=60, trust_env=False) as client:
+            data, _ = build_payload("text", index, None, None)
+            data.pop("resumeText")
+            data["resumeId"] = document_id
+            response = await client.post("/process", data=data)
+            missing += response.status_code == 404
+            pids.add((await client.get("/stats")).json()["worker_pid"])
+    return missing, pids
+
+
+async def run_workers(workers, args):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as state_dir:
+        env = {
+            **os.environ,
+            "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY") or "benchmark",
+            "BENCH_GEMINI_LATENCY": str(args.latency),
+            "BENCH_GEMINI_CPU_SECONDS": str(args.cpu),
+            "WEB_CONCURRENCY": str(workers),
+            "SHARED_STATE_DB_PATH": os.path.join(state_dir, "state.db"),
+            "GEMINI_CONCURRENCY_INITIAL": str(args.gemini_limit),
+            "GEMINI_CONCURRENCY_MAX": str(args.gemini_limit),
+            "GEMINI_MAX_QUEUE": str(args.concurrency * 2),
+        }
+        process = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "benchmarks.fake_app:app",
+                "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+            ],
+            env=env,
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            limits = httpx.Limits(
+                max_connections=args.concurrency, max_keepalive_connections=args.concurrency
+            )
+            async with httpx.AsyncClient(
+                base_url=base_url, timeout=300, limits=limits, trust_env=False
+            ) as client:
+                await wait_until_ready(client, process)
+                missing, pids = await check_sharing(base_url, max(8, 4 * workers))
+
+                total = args.warmup + args.requests
+                payloads = [build_payload("text", index, None, None) for index in range(total)]
+                for data, files in payloads[: args.warmup]:
+                    await send(client, "/process", data, files)
+
+                queue = iter(payloads[args.warmup :])
+                results = []
+
+                async def worker():
+                    for data, files in queue:
+                        results.append(await send(client, "/process", data, files))
+
+                start = time.perf_counter()
+                await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+                elapsed = time.perf_counter() - start
+        finally:
+            process.terminate()
+            process.wait()
+
+    latencies = sorted(seconds for status, seconds in results if status == 200)
+    return {
+        "workers": workers,
+        "workers_seen": len(pids),
+        "shared_document_misses": missing,
+        "errors": len(results) - len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000 if latencies else None,
+        "p95_ms": percentile(latencies, 0.95) * 1000 if latencies else None,
+    }
+
+
+async def run(args):
+    print(
+        f"{available_cpus()} CPU(s) available; fake model: {args.latency}s per call, "
+        f"{args.cpu * 1000:.0f}ms of CPU per call\n"
+    )
+    print(f"{'Workers':>8}{'Seen':>6}{'Errors':>8}{'RPS':>9}{'Speedup':>9}{'p50':>10}{'p95':>10}")
+    baseline = None
+    failed = False
+    for workers in args.workers:
+        result = await run_workers(workers, args)
+        baseline = baseline or result["rps"]
+        print(
+            f"{workers:>8}{result['workers_seen']:>6}{result['errors']:>8}{result['rps']:>9.2f}"
+            f"{result['rps'] / baseline:>8.2f}x"
+            + "".join(
+                f"{result[key]:>8.0f}ms" if result[key] is not None else f"{'-':>10}"
+                for key in ("p50_ms", "p95_ms")
+            )
+        )
+        if result["shared_document_misses"]:
+            failed = True
+            print(
+                f"  {result['shared_document_misses']} request(s) could not find a document "
+                "stored through another worker"
+            )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=lambda value: [int(count) for count in value.split(",")],
+                        default=[1, 2, 4], help="comma-separated worker counts")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=300, help="measured requests per worker count")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests sent first")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake Gemini seconds per call")
+    parser.add_argument("--cpu", type=float, default=0.02, help="fake Gemini CPU seconds per call")
+    parser.add_argument("--gemini-limit", type=int, default=256,
+                        help="shared Gemini concurrency limit for the run")
+    sys.exit(asyncio.run(run(parser.parse_args())))
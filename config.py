@@ -7,7 +7,128 @@ class Config:
     if DEBUG:
         load_dotenv()
     GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
+    # "json" for one JSON object per log line (with the request's trace ID), "text" for plain lines
+    LOG_FORMAT = os.environ.get("LOG_FORMAT", "json").lower()
+    # `python main.py` serves on HOST:PORT with WEB_CONCURRENCY uvicorn workers (0 = one per CPU)
+    HOST = os.environ.get("HOST", "127.0.0.1")
+    PORT = int(os.environ.get("PORT", "8000"))
+    WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", "0"))
+    # Seconds a stopped or replaced worker gets to finish its in-flight requests
+    GRACEFUL_SHUTDOWN_SECONDS = float(os.environ.get("GRACEFUL_SHUTDOWN_SECONDS", "30"))
+    # SQLite file (WAL mode) through which workers share the job cache, stored documents,
+    # background jobs and the Gemini concurrency limit; `python main.py` sets it for >1 worker
+    SHARED_STATE_DB_PATH = os.environ.get("SHARED_STATE_DB_PATH")
+    # With shared state, each worker publishes its metrics there every few seconds so /metrics
+    # reports the totals of all workers; snapshots of stopped workers are kept for a day
+    METRICS_DB_PATH = os.environ.get("METRICS_DB_PATH") or SHARED_STATE_DB_PATH
+    METRICS_PUBLISH_SECONDS = float(os.environ.get("METRICS_PUBLISH_SECONDS", "5"))
+    METRICS_RETENTION_SECONDS = float(os.environ.get("METRICS_RETENTION_SECONDS", str(24 * 60 * 60)))
+    SQLITE_BUSY_TIMEOUT_SECONDS = float(os.environ.get("SQLITE_BUSY_TIMEOUT_SECONDS", "5"))
     MAX_FILE_SIZE_BYTES = 10 * 1024 * 1024  # 10MB
+    # Whole request body: two uploads plus room for the text fields and multipart overhead
+    MAX_REQUEST_BYTES = int(os.environ.get("MAX_REQUEST_BYTES", str(2 * MAX_FILE_SIZE_BYTES + 1024 * 1024)))
+    UPLOAD_CHUNK_BYTES = 64 * 1024
+    # libmagic only needs the start of a file; 8KB covers the DOCX zip entries it looks for
+    MIME_SNIFF_BYTES = 8 * 1024
+    # PDFs are sent to Gemini as extracted text unless it yields fewer characters than this
+    PDF_MIN_TEXT_CHARS = int(os.environ.get("PDF_MIN_TEXT_CHARS", "200"))
+    PDF_MAX_PAGES = 20
     MAX_TEXT_LENGTH = 50000
     GEMINI_MODEL = "gemini-2.5-flash"
+    # Connection pool for the shared Gemini client
+    GEMINI_MAX_CONNECTIONS = int(os.environ.get("GEMINI_MAX_CONNECTIONS", "20"))
+    GEMINI_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("GEMINI_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    GEMINI_KEEPALIVE_EXPIRY_SECONDS = float(os.environ.get("GEMINI_KEEPALIVE_EXPIRY_SECONDS", "60"))
+    # Adaptive (AIMD) concurrency limit shared by all Gemini calls, and its wait queue
+    GEMINI_CONCURRENCY_INITIAL = int(os.environ.get("GEMINI_CONCURRENCY_INITIAL", "8"))
+    GEMINI_CONCURRENCY_MIN = int(os.environ.get("GEMINI_CONCURRENCY_MIN", "1"))
+    GEMINI_CONCURRENCY_MAX = int(os.environ.get("GEMINI_CONCURRENCY_MAX", "32"))
+    GEMINI_MAX_QUEUE = int(os.environ.get("GEMINI_MAX_QUEUE", "100"))
+    GEMINI_QUEUE_TIMEOUT_SECONDS = float(os.environ.get("GEMINI_QUEUE_TIMEOUT_SECONDS", "30"))
+    # With shared state: how often a waiting call checks for a slot freed by another worker, and
+    # how long a worker's slot is held for it at most if it dies mid-call
+    GEMINI_SHARED_POLL_SECONDS = float(os.environ.get("GEMINI_SHARED_POLL_SECONDS", "0.05"))
+    GEMINI_SHARED_LEASE_SECONDS = float(os.environ.get("GEMINI_SHARED_LEASE_SECONDS", "300"))
+    # Process pool per server worker for CPU-bound document work, splitting the CPUs between
+    # server workers (0 runs it in threads instead)
+    DOCUMENT_WORKERS = int(
+        os.environ.get("DOCUMENT_WORKERS", str(max(1, min(4, (os.cpu_count() or 1) // max(1, WEB_CONCURRENCY)))))
+    )
+    DOCUMENT_JOB_TIMEOUT_SECONDS = float(os.environ.get("DOCUMENT_JOB_TIMEOUT_SECONDS", "20"))
+    DOCUMENT_WORKER_MEMORY_BYTES = int(os.environ.get("DOCUMENT_WORKER_MEMORY_MB", "1024")) * 1024 * 1024
+    # Retries and the per-request latency budget shared by the job-fetch and rewrite steps
+    REQUEST_LATENCY_BUDGET_SECONDS = float(os.environ.get("REQUEST_LATENCY_BUDGET_SECONDS", "120"))
+    GEMINI_RETRY_MAX_ATTEMPTS = int(os.environ.get("GEMINI_RETRY_MAX_ATTEMPTS", "3"))
+    GEMINI_RETRY_INITIAL_BACKOFF_SECONDS = float(os.environ.get("GEMINI_RETRY_INITIAL_BACKOFF_SECONDS", "1"))
+    GEMINI_RETRY_MAX_BACKOFF_SECONDS = float(os.environ.get("GEMINI_RETRY_MAX_BACKOFF_SECONDS", "8"))
+    GEMINI_RETRY_AFTER_SECONDS = int(os.environ.get("GEMINI_RETRY_AFTER_SECONDS", "10"))
+    # Hedging sends a duplicate call once one runs past the observed p95 latency (costs tokens)
+    GEMINI_HEDGE_ENABLED = os.environ.get("GEMINI_HEDGE_ENABLED", "False").lower() == "true"
+    GEMINI_HEDGE_MIN_SAMPLES = int(os.environ.get("GEMINI_HEDGE_MIN_SAMPLES", "20"))
+    # Job page downloads: overall deadline per attempt, plus connect/read timeouts and a size cap
+    JOB_FETCH_TIMEOUT_SECONDS = float(os.environ.get("JOB_FETCH_TIMEOUT_SECONDS", "30"))
+    JOB_FETCH_CONNECT_TIMEOUT_SECONDS = float(os.environ.get("JOB_FETCH_CONNECT_TIMEOUT_SECONDS", "5"))
+    JOB_FETCH_READ_TIMEOUT_SECONDS = float(os.environ.get("JOB_FETCH_READ_TIMEOUT_SECONDS", "10"))
+    JOB_FETCH_MAX_BYTES = int(os.environ.get("JOB_FETCH_MAX_MB", "5")) * 1024 * 1024
+    JOB_FETCH_MAX_REDIRECTS = int(os.environ.get("JOB_FETCH_MAX_REDIRECTS", "5"))
+    JOB_FETCH_HTTP2 = os.environ.get("JOB_FETCH_HTTP2", "True").lower() == "true"
+    JOB_FETCH_MAX_CONNECTIONS = int(os.environ.get("JOB_FETCH_MAX_CONNECTIONS", "20"))
+    JOB_FETCH_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("JOB_FETCH_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    JOB_FETCH_KEEPALIVE_EXPIRY_SECONDS = float(os.environ.get("JOB_FETCH_KEEPALIVE_EXPIRY_SECONDS", "60"))
+    # Optional proxy for job page downloads (the proxy then resolves names, so addresses aren't checked)
+    JOB_FETCH_PROXY = os.environ.get("JOB_FETCH_PROXY")
+    # Pages with an ETag/Last-Modified kept for conditional GETs
+    JOB_FETCH_CACHE_MAX_ENTRIES = int(os.environ.get("JOB_FETCH_CACHE_MAX_ENTRIES", "256"))
+    JOB_FETCH_CACHE_MAX_BYTES = int(os.environ.get("JOB_FETCH_CACHE_MAX_MB", "32")) * 1024 * 1024
+    JOB_FETCH_CACHE_TTL_SECONDS = float(os.environ.get("JOB_FETCH_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+    # Job-posting cache (in-memory LRU, optionally backed by SQLite when a path is set). With
+    # shared state the workers read the shared file instead of keeping private in-memory copies
+    JOB_CACHE_MAX_ENTRIES = int(os.environ.get("JOB_CACHE_MAX_ENTRIES", "0" if SHARED_STATE_DB_PATH else "256"))
+    JOB_CACHE_TTL_SECONDS = float(os.environ.get("JOB_CACHE_TTL_SECONDS", str(6 * 60 * 60)))
+    JOB_CACHE_DB_PATH = os.environ.get("JOB_CACHE_DB_PATH") or SHARED_STATE_DB_PATH
+    JOB_CACHE_DB_MAX_ENTRIES = int(os.environ.get("JOB_CACHE_DB_MAX_ENTRIES", "5000"))
+    # Uploaded documents kept by content hash so clients can send resumeId/coverLetterId instead
+    DOCUMENT_STORE_TTL_SECONDS = float(os.environ.get("DOCUMENT_STORE_TTL_SECONDS", str(7 * 24 * 60 * 60)))
+    DOCUMENT_STORE_MAX_ENTRIES = int(os.environ.get("DOCUMENT_STORE_MAX_ENTRIES", "0" if SHARED_STATE_DB_PATH else "1000"))
+    DOCUMENT_STORE_MAX_BYTES = int(os.environ.get("DOCUMENT_STORE_MAX_MB", "64")) * 1024 * 1024
+    DOCUMENT_STORE_DB_PATH = os.environ.get("DOCUMENT_STORE_DB_PATH") or SHARED_STATE_DB_PATH
+    DOCUMENT_STORE_DB_MAX_ENTRIES = int(os.environ.get("DOCUMENT_STORE_DB_MAX_ENTRIES", "5000"))
+    # Finished letters kept with their job details and resume so /refine can redo some paragraphs
+    GENERATION_STORE_TTL_SECONDS = float(os.environ.get("GENERATION_STORE_TTL_SECONDS", str(24 * 60 * 60)))
+    GENERATION_STORE_MAX_ENTRIES = int(os.environ.get("GENERATION_STORE_MAX_ENTRIES", "0" if SHARED_STATE_DB_PATH else "1000"))
+    GENERATION_STORE_MAX_BYTES = int(os.environ.get("GENERATION_STORE_MAX_MB", "32")) * 1024 * 1024
+    GENERATION_STORE_DB_PATH = os.environ.get("GENERATION_STORE_DB_PATH") or SHARED_STATE_DB_PATH
+    GENERATION_STORE_DB_MAX_ENTRIES = int(os.environ.get("GENERATION_STORE_DB_MAX_ENTRIES", "5000"))
+    REFINE_MAX_GUIDANCE_CHARS = int(os.environ.get("REFINE_MAX_GUIDANCE_CHARS", "2000"))
+    # How long identical /process requests are answered from a just-finished generation
+    SINGLE_FLIGHT_RESULT_TTL_SECONDS = float(os.environ.get("SINGLE_FLIGHT_RESULT_TTL_SECONDS", "30"))
+    SINGLE_FLIGHT_MAX_RESULTS = int(os.environ.get("SINGLE_FLIGHT_MAX_RESULTS", "128"))
+    # Gemini cached contexts for the rewrite instructions plus a user's documents. With shared
+    # state the handles live in the shared file, so workers reuse each other's cached contexts
+    CONTEXT_CACHE_ENABLED = os.environ.get("CONTEXT_CACHE_ENABLED", "True").lower() == "true"
+    CONTEXT_CACHE_TTL_SECONDS = int(os.environ.get("CONTEXT_CACHE_TTL_SECONDS", "900"))
+    CONTEXT_CACHE_REFRESH_MARGIN_SECONDS = 30
+    CONTEXT_CACHE_MIN_TOKENS = int(os.environ.get("CONTEXT_CACHE_MIN_TOKENS", "1024"))
+    CONTEXT_CACHE_MAX_ENTRIES = int(os.environ.get("CONTEXT_CACHE_MAX_ENTRIES", "0" if SHARED_STATE_DB_PATH else "256"))
+    CONTEXT_CACHE_DB_PATH = os.environ.get("CONTEXT_CACHE_DB_PATH") or SHARED_STATE_DB_PATH
+    CONTEXT_CACHE_DB_MAX_ENTRIES = int(os.environ.get("CONTEXT_CACHE_DB_MAX_ENTRIES", "5000"))
+    # Background jobs (POST /jobs): worker count caps concurrent generations; results kept for polling
+    JOB_QUEUE_WORKERS = int(os.environ.get("JOB_QUEUE_WORKERS", "4"))
+    JOB_QUEUE_MAX_SIZE = int(os.environ.get("JOB_QUEUE_MAX_SIZE", "100"))
+    JOB_QUEUE_RESULT_TTL_SECONDS = float(os.environ.get("JOB_QUEUE_RESULT_TTL_SECONDS", "3600"))
+    JOB_QUEUE_DB_PATH = os.environ.get("JOB_QUEUE_DB_PATH") or SHARED_STATE_DB_PATH
+    # Workers that haven't refreshed their heartbeat for 3 intervals have their unfinished jobs taken over
+    JOB_QUEUE_HEARTBEAT_SECONDS = float(os.environ.get("JOB_QUEUE_HEARTBEAT_SECONDS", "10"))
+    # Longest GET /jobs/{id}?wait= long poll
+    JOB_QUEUE_MAX_WAIT_SECONDS = float(os.environ.get("JOB_QUEUE_MAX_WAIT_SECONDS", "30"))
+    # Job pages are read locally (JobPosting JSON-LD, Greenhouse/Lever/Workday layouts, headings)
+    # and only summarised by Gemini when the result's confidence (0-1) is below this; 2 = always Gemini
+    JOB_PARSER_MIN_CONFIDENCE = float(os.environ.get("JOB_PARSER_MIN_CONFIDENCE", "0.85"))
+    # Prompt token budgets, estimated locally at PROMPT_CHARS_PER_TOKEN characters per token
+    PROMPT_CHARS_PER_TOKEN = float(os.environ.get("PROMPT_CHARS_PER_TOKEN", "4"))
+    JOB_PAGE_TOKEN_BUDGET = int(os.environ.get("JOB_PAGE_TOKEN_BUDGET", "4000"))
+    REWRITE_INPUT_TOKEN_BUDGET = int(os.environ.get("REWRITE_INPUT_TOKEN_BUDGET", "12000"))
+    # /process/batch limits
+    BATCH_MAX_JOBS = int(os.environ.get("BATCH_MAX_JOBS", "25"))
+    BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "4"))
 
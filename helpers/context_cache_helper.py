@@ -0,0 +1,179 @@
+import asyncio
+import hashlib
+import json
+import time
+
+from config import Config
+from helpers.job_cache_helper import SQLiteCacheStore, TTLCache
+from helpers.lazy_import_helper import lazy_import
+from helpers.metrics_helper import record_cache_lookup
+from helpers.trace_helper import log
+
+genai_errors = lazy_import("google.genai.errors")
+types = lazy_import("google.genai.types")
+
+# Values of the candidates layer
+SEEN = "seen"
+UNCACHEABLE = "uncacheable"
+
+
+class ContextCacheHelper:
+    """
+    Reuses Gemini cached-content handles for the fixed rewrite prompt plus a user's documents.
+
+    Handles are keyed by a hash of the model, system instruction and prompt parts, so the
+    same resume and cover letter map to the same handle whatever job they are tailored to.
+    A handle is only created the second time a key is seen within the TTL, so one-off
+    generations don't pay for a cache they never reuse, and prompts too small for Gemini's
+    minimum cache size are never cached.
+
+    Handles and sightings are kept in an in-memory LRU, optionally backed by SQLite when
+    Config.CONTEXT_CACHE_DB_PATH is set (it defaults to the file worker processes share,
+    Config.SHARED_STATE_DB_PATH), so every worker reuses the cached contexts the others
+    created instead of paying for its own copy.
+    """
+
+    def __init__(
+        self,
+        client,
+        ttl_seconds=Config.CONTEXT_CACHE_TTL_SECONDS,
+        min_tokens=Config.CONTEXT_CACHE_MIN_TOKENS,
+        max_entries=Config.CONTEXT_CACHE_MAX_ENTRIES,
+        db_path=Config.CONTEXT_CACHE_DB_PATH,
+        db_max_entries=Config.CONTEXT_CACHE_DB_MAX_ENTRIES,
+    ):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.min_tokens = min_tokens
+        # key -> (cache name, wall-clock expiry), comparable between processes
+        self.handles = TTLCache(max_entries, ttl_seconds)
+        # key -> SEEN once or UNCACHEABLE
+        self.candidates = TTLCache(max_entries, ttl_seconds)
+        self.handle_store = None
+        self.candidate_store = None
+        if db_path:
+            self.handle_store = SQLiteCacheStore(
+                db_path, "context_cache_handles", db_max_entries, ttl_seconds
+            )
+            self.candidate_store = SQLiteCacheStore(
+                db_path, "context_cache_candidates", db_max_entries, ttl_seconds
+            )
+        self.hits = 0
+        self.creates = 0
+
+    @staticmethod
+    def cache_key(model, system_instruction, parts):
+        digest = hashlib.sha256()
+        for value in [model, system_instruction]:
+            digest.update(value.encode("utf-8"))
+        for part in parts:
+            if part.inline_data is not None:
+                digest.update(part.inline_data.mime_type.encode("utf-8"))
+                digest.update(part.inline_data.data)
+            else:
+                digest.update(part.text.encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def estimate_tokens(parts):
+        """Rough token count (~4 characters per token); attached files always count as large"""
+        tokens = 0
+        for part in parts:
+            if part.inline_data is not None:
+                return float("inf")
+            tokens += len(part.text) // 4
+        return tokens
+
+    @staticmethod
+    def is_cache_missing_error(error):
+        """True when Gemini rejects a request because its cached content has gone away"""
+        return (
+            isinstance(error, genai_errors.ClientError)
+            and error.code in (400, 403, 404)
+            and "cache" in str(error).lower()
+        )
+
+    async def _get_handle(self, key):
+        handle = self.handles.get(key)
+        if handle is None and self.handle_store is not None:
+            value = await asyncio.to_thread(self.handle_store.get, key)
+            if value is not None:
+                handle = tuple(json.loads(value))
+                self.handles.set(key, handle)
+        return handle
+
+    async def _set_handle(self, key, handle):
+        self.handles.set(key, handle)
+        if self.handle_store is not None:
+            await asyncio.to_thread(self.handle_store.set, key, json.dumps(handle))
+
+    async def _get_candidate(self, key):
+        seen = self.candidates.get(key)
+        if seen is None and self.candidate_store is not None:
+            seen = await asyncio.to_thread(self.candidate_store.get, key)
+            if seen is not None:
+                self.candidates.set(key, seen)
+        return seen
+
+    async def _set_candidate(self, key, seen):
+        self.candidates.set(key, seen)
+        if self.candidate_store is not None:
+            await asyncio.to_thread(self.candidate_store.set, key, seen)
+
+    async def get_or_create(self, model, system_instruction, parts):
+        """
+        Returns:
+            tuple: (cache name or None, cache key); a None name means send the parts inline
+        """
+        key = self.cache_key(model, system_instruction, parts)
+
+        handle = await self._get_handle(key)
+        if handle is not None:
+            name, expires_at = handle
+            # Leave headroom so the handle can't expire between here and the model call
+            if expires_at - time.time() > Config.CONTEXT_CACHE_REFRESH_MARGIN_SECONDS:
+                self.hits += 1
+                record_cache_lookup("gemini_context", True)
+                return name, key
+        record_cache_lookup("gemini_context", False)
+
+        seen = await self._get_candidate(key)
+        if seen == UNCACHEABLE:
+            return None, key
+        if seen is None and handle is None:
+            await self._set_candidate(key, SEEN)
+            return None, key
+        if self.estimate_tokens(parts) < self.min_tokens:
+            await self._set_candidate(key, UNCACHEABLE)
+            return None, key
+
+        try:
+            cached_content = await self.client.aio.caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    contents=[types.Content(role="user", parts=parts)],
+                    system_instruction=system_instruction,
+                    ttl=f"{int(self.ttl_seconds)}s",
+                    display_name=f"cover-letter-{key[:16]}",
+                ),
+            )
+        except Exception as e:
+            log(f"-> Could not create cached context, sending content inline: {e}", level="warning")
+            await self._set_candidate(key, UNCACHEABLE)
+            return None, key
+
+        self.creates += 1
+        await self._set_handle(key, (cached_content.name, time.time() + self.ttl_seconds))
+        log(f"-> Created cached context {cached_content.name}")
+        return cached_content.name, key
+
+    async def invalidate(self, key):
+        """Forget a handle that Gemini no longer recognises, in every worker"""
+        self.handles.delete(key)
+        if self.handle_store is not None:
+            await asyncio.to_thread(self.handle_store.delete, key)
+
+    def close(self):
+        if self.handle_store is not None:
+            self.handle_store.close()
+            self.candidate_store.close()
@@ -0,0 +1,211 @@
+import asyncio
+import concurrent.futures
+import multiprocessing
+import os
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+from config import Config
+from helpers.lazy_import_helper import lazy_import, preload_modules
+from helpers.trace_helper import log
+
+magic = lazy_import("magic")
+trafilatura = lazy_import("trafilatura")
+
+# Imported by each worker when it starts (or by the app's warm-up when there are no workers)
+DOCUMENT_MODULES = ("magic", "trafilatura", "docx", "pypdf")
+
+try:
+    import resource
+except ImportError:  # No rlimits on Windows; workers run without a memory cap there
+    resource = None
+
+
+class DocumentProcessingError(Exception):
+    """A document job timed out, ran out of memory or took its worker down"""
+
+
+# libmagic handles aren't thread-safe, so each thread (or worker process) opens its own
+_local = threading.local()
+
+
+def magic_handle():
+    handle = getattr(_local, "magic", None)
+    if handle is None:
+        handle = _local.magic = magic.Magic(mime=True)
+    return handle
+
+
+def sniff_mime_type(head):
+    """MIME type of a file, detected from its first few KB"""
+    return magic_handle().from_buffer(head)
+
+
+def extract_page_text(downloaded):
+    """Main content of a job posting page, without navigation, footers, ads, etc."""
+    return trafilatura.extract(
+        downloaded,
+        include_comments=False,
+        include_tables=True,
+        no_fallback=False
+    )
+
+
+def preload_document_modules():
+    """Import the document parsers and open libmagic, so the first file doesn't wait for them
+
+    Failures are logged rather than raised: a worker whose initializer raises breaks the
+    whole pool, while a missing parser should only fail the files that need it.
+    """
+    preload_modules(*DOCUMENT_MODULES)
+    try:
+        magic_handle()
+    except Exception as e:
+        log(f"-> Could not open libmagic: {e}", level="warning")
+
+
+def _init_worker(memory_limit_bytes):
+    if resource is not None and memory_limit_bytes:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit_bytes, memory_limit_bytes))
+    # Once per worker rather than once per file
+    preload_document_modules()
+
+
+def _ping():
+    return os.getpid()
+
+
+async def run_document_job(executor, fn, *args):
+    """Run fn(*args) on a DocumentExecutor, or in a worker thread when there isn't one"""
+    if executor is None:
+        return await asyncio.to_thread(fn, *args)
+    return await executor.run(fn, *args)
+
+
+class DocumentExecutor:
+    """
+    Process pool for CPU-bound document work: MIME sniffing, text extraction and HTML extraction.
+
+    Workers are started once and stay warm, each with its own libmagic handle and the
+    parsers already imported, and run with an address-space cap. A job that runs past
+    its timeout gets its pool killed and replaced, so a hostile file can't wedge a worker
+    forever; jobs caught up in the restart are resubmitted to the new pool once. With
+    max_workers=0 jobs run in threads instead (timeouts are then reported but can't stop
+    the work).
+    """
+
+    def __init__(
+        self,
+        max_workers=Config.DOCUMENT_WORKERS,
+        timeout_seconds=Config.DOCUMENT_JOB_TIMEOUT_SECONDS,
+        memory_limit_bytes=Config.DOCUMENT_WORKER_MEMORY_BYTES,
+    ):
+        self.max_workers = max_workers
+        self.timeout_seconds = timeout_seconds
+        self.memory_limit_bytes = memory_limit_bytes
+        self.pool = self._create_pool()
+        self.timeouts = 0
+        self.restarts = 0
+
+    def _create_pool(self):
+        if not self.max_workers:
+            return None
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            # Forking a process that already runs an event loop and threads isn't safe
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.memory_limit_bytes,),
+        )
+
+    async def warm_up(self):
+        """Start every worker now so the first uploads don't pay for spawning and imports"""
+        if self.pool is None:
+            # Jobs run in threads of this process, so import the parsers here instead
+            await asyncio.to_thread(preload_document_modules)
+            return
+        loop = asyncio.get_running_loop()
+        pool = self.pool
+        try:
+            await asyncio.gather(*(loop.run_in_executor(pool, _ping) for _ in range(self.max_workers)))
+        except BrokenProcessPool:
+            # Start over with a fresh pool rather than failing the first jobs on this one
+            self._restart(pool)
+            raise
+
+    async def run(self, fn, *args):
+        """
+        Await fn(*args) in a worker; fn must be a picklable module-level function.
+
+        Raises:
+            DocumentProcessingError: The job timed out, hit the memory cap or crashed its worker
+        """
+        if self.pool is None:
+            try:
+                return await asyncio.wait_for(asyncio.to_thread(fn, *args), self.timeout_seconds)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise DocumentProcessingError(f"{fn.__name__} timed out") from None
+
+        loop = asyncio.get_running_loop()
+        for _ in range(2):
+            pool = self.pool
+            try:
+                return await asyncio.wait_for(
+                    loop.run_in_executor(pool, fn, *args), self.timeout_seconds
+                )
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                self._restart(pool)
+                raise DocumentProcessingError(f"{fn.__name__} timed out") from None
+            except MemoryError:
+                raise DocumentProcessingError(f"{fn.__name__} exceeded the worker memory cap") from None
+            except BrokenProcessPool:
+                if pool is self.pool:
+                    # This job took its worker down (e.g. a native crash); replace the pool
+                    self._restart(pool)
+                    raise DocumentProcessingError(f"{fn.__name__} crashed its worker") from None
+                # Another job's timeout restarted the pool under this one; run it again
+        raise DocumentProcessingError(f"{fn.__name__} failed after a pool restart")
+
+    def _restart(self, pool):
+        if pool is not self.pool:
+            return
+        log("-> Restarting the document worker pool", level="warning")
+        self.restarts += 1
+        self.pool = self._create_pool()
+        self._kill(pool)
+
+    @staticmethod
+    def _kill(pool):
+        # shutdown() alone would wait for a wedged job, so kill the workers first
+        for process in list(pool._processes.values()):
+            process.kill()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        """
+        Shut the pool down cleanly, so the workers exit and release their queues, giving
+        running jobs up to timeout_seconds before killing a worker that is still busy.
+        """
+        if self.pool is None:
+            return
+        pool = self.pool
+        processes = list(pool._processes.values())
+        shutdown = threading.Thread(
+            target=pool.shutdown, kwargs={"wait": True, "cancel_futures": True}, daemon=True
+        )
+        shutdown.start()
+        shutdown.join(self.timeout_seconds)
+        if shutdown.is_alive():
+            log("-> Document workers didn't stop in time; killing them", level="warning")
+            for process in processes:
+                process.kill()
+            shutdown.join(self.timeout_seconds)
+
+    def stats(self):
+        return {
+            "workers": self.max_workers,
+            "timeouts": self.timeouts,
+            "restarts": self.restarts,
+        }
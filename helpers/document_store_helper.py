@@ -0,0 +1,90 @@
+import asyncio
+import hashlib
+
+from config import Config
+from helpers.job_cache_helper import SQLiteCacheStore, TTLCache
+from helpers.metrics_helper import record_cache_lookup
+
+
+def pack_document(data, mime_type):
+    """Store a document's MIME type and bytes as one value (MIME types never contain a newline)"""
+    return mime_type.encode("ascii") + b"\n" + data
+
+
+def unpack_document(value):
+    mime_type, data = bytes(value).split(b"\n", 1)
+    return data, mime_type.decode("ascii")
+
+
+class DocumentStoreHelper:
+    """
+    Content-addressed store for validated uploads, so a resume or cover letter is uploaded
+    and parsed once and then referred to by its document ID.
+
+    Documents are kept as /process uses them: normalised text, or the original PDF when
+    its text isn't usable. The ID is the SHA-256 of the stored document, so uploading the
+    same file again returns the same ID and renews its TTL. Like JobCacheHelper, this is
+    an in-memory LRU (bounded by size as well as count), optionally backed by a SQLite
+    store when Config.DOCUMENT_STORE_DB_PATH (or Config.SHARED_STATE_DB_PATH) is set.
+    """
+
+    def __init__(
+        self,
+        max_entries=Config.DOCUMENT_STORE_MAX_ENTRIES,
+        max_bytes=Config.DOCUMENT_STORE_MAX_BYTES,
+        ttl_seconds=Config.DOCUMENT_STORE_TTL_SECONDS,
+        db_path=Config.DOCUMENT_STORE_DB_PATH,
+        db_max_entries=Config.DOCUMENT_STORE_DB_MAX_ENTRIES,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.cache = TTLCache(max_entries, ttl_seconds, max_bytes=max_bytes)
+        self.store = None
+        if db_path:
+            self.store = SQLiteCacheStore(db_path, "documents", db_max_entries, ttl_seconds)
+
+    @staticmethod
+    def document_id(value):
+        return hashlib.sha256(value).hexdigest()
+
+    async def put(self, data, mime_type):
+        """Store a validated document and return its ID"""
+        value = pack_document(data, mime_type)
+        document_id = self.document_id(value)
+        self.cache.set(document_id, value)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.set, document_id, value)
+        return document_id
+
+    async def get(self, document_id):
+        """
+        Look up a stored document.
+
+        Returns:
+            tuple: (data, mime_type), or None if the ID is unknown or has expired
+        """
+        value = self.cache.get(document_id)
+        if value is None and self.store is not None:
+            value = await asyncio.to_thread(self.store.get, document_id)
+            if value is not None:
+                self.cache.set(document_id, value)
+        record_cache_lookup("document", value is not None)
+        if value is None:
+            return None
+        return unpack_document(value)
+
+    def stats(self):
+        stats = {
+            "memory": {
+                "hits": self.cache.hits,
+                "misses": self.cache.misses,
+                "size": len(self.cache),
+                "bytes": self.cache.total_bytes,
+            },
+        }
+        if self.store is not None:
+            stats["disk"] = {"hits": self.store.hits, "misses": self.store.misses}
+        return stats
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
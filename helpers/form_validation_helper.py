@@ -1,12 +1,21 @@
+import asyncio
+import base64
+import hashlib
+import time
 from urllib.parse import urlparse
 from ipaddress import ip_address
 from typing import Optional
 from fastapi import Form, File, UploadFile
 from config import Config
-
-from io import BytesIO
-from docx import Document
-import magic
+from helpers.document_executor_helper import (
+    DocumentProcessingError,
+    run_document_job,
+    sniff_mime_type,
+)
+from helpers.job_cache_helper import normalize_job_url
+from helpers.metrics_helper import record_stage, time_stage
+from helpers.text_extraction_helper import BLOB_FALLBACK_MIME_TYPES, extract_document_text
+from helpers.trace_helper import log
 
 class FormValidationHelper:
     def __init__(self,
@@ -17,6 +26,10 @@ class FormValidationHelper:
     coverLetterText: Optional[str] = Form(None),
     resumeFile: Optional[UploadFile] = File(None),
     coverLetterFile: Optional[UploadFile] = File(None),
+    document_executor=None,
+    resumeId: Optional[str] = Form(None),
+    coverLetterId: Optional[str] = Form(None),
+    document_store=None,
     ):
         self.jobLink = jobLink
         self.companyDescription = companyDescription
@@ -25,6 +38,13 @@ class FormValidationHelper:
         self.coverLetterText = coverLetterText
         self.resumeFile = resumeFile
         self.coverLetterFile = coverLetterFile
+        # Optional DocumentExecutor for MIME sniffing and DOCX parsing (threads otherwise)
+        self.document_executor = document_executor
+        # IDs of previously uploaded documents, resolved through the optional DocumentStoreHelper;
+        # after read_documents() they also hold the IDs of newly uploaded files
+        self.resumeId = resumeId
+        self.coverLetterId = coverLetterId
+        self.document_store = document_store
         self.resumeFileData = None
         self.resumeFileMimeType = None
         self.coverLetterFileData = None
@@ -32,6 +52,20 @@ class FormValidationHelper:
         self.job_link_provided = False
 
     async def validate_form(self):
+        success, error = self.validate_job()
+        if not success:
+            return False, error
+        return await self.validate_documents()
+
+    def validate_fields(self):
+        """Everything validate_form checks except the uploaded files, which aren't read yet"""
+        success, error = self.validate_job()
+        if not success:
+            return False, error
+        return self.validate_document_fields()
+
+    def validate_job(self):
+        """Validate the job link or the company/role descriptions"""
         # Validate that we have either a job link OR both company and role descriptions
         job_link_provided = self.jobLink and self.jobLink.strip()
         manual_descriptions_provided = (
@@ -44,14 +78,10 @@ class FormValidationHelper:
         
         if not job_link_provided and not manual_descriptions_provided:
             return False, "Please provide either a job link OR both company and role descriptions."
-        if not self.resumeText and not self.resumeFile:
-            return False, "Please provide either resume text or upload a resume file."
-        if not self.coverLetterText and not self.coverLetterFile:
-            return False, "Please provide either cover letter text or upload a cover letter file."
         if self.jobLink:
             success, error = self.validate_url_safety(self.jobLink)
             if not success:
-                print(f"-> something screwy with the job link: {error}")
+                log(f"-> something screwy with the job link: {error}", level="warning")
                 return False, "Invalid job link. Please provide a valid URL."
         if self.companyDescription:
             success, error = self.validate_text_length(self.companyDescription)
@@ -61,6 +91,21 @@ class FormValidationHelper:
             success, error = self.validate_text_length(self.roleDescription)
             if not success:
                 return False, f"Role description exceeds maximum length of {Config.MAX_TEXT_LENGTH:,} characters."
+        return True, "Job information is valid."
+
+    async def validate_documents(self):
+        """Validate the resume and cover letter, reading and parsing any uploaded files"""
+        success, error = self.validate_document_fields()
+        if not success:
+            return False, error
+        return await self.read_documents()
+
+    def validate_document_fields(self):
+        """Cheap checks on the resume and cover letter that don't need the uploads to be read"""
+        if not self.resumeText and not self.resumeFile and not self.resumeId:
+            return False, "Please provide either resume text or upload a resume file."
+        if not self.coverLetterText and not self.coverLetterFile and not self.coverLetterId:
+            return False, "Please provide either cover letter text or upload a cover letter file."
         if self.resumeText:
             success, error = self.validate_text_length(self.resumeText)
             if not success:
@@ -69,22 +114,171 @@ class FormValidationHelper:
             success, error = self.validate_text_length(self.coverLetterText)
             if not success:
                 return False, f"Cover letter text exceeds maximum length of {Config.MAX_TEXT_LENGTH:,} characters."
-        if self.resumeFile:
-            resume_file_validation_helper = FileValidationHelper(self.resumeFile)
-            success, error = await resume_file_validation_helper.validate_file()
+        return True, "Document fields are valid."
+
+    async def read_documents(self):
+        """
+        Read, MIME-sniff and parse the uploaded files; call validate_document_fields() first.
+
+        Documents sent by ID are loaded from the document store instead (text fields and
+        uploads take precedence over IDs), and new uploads are added to it.
+        """
+        for field in ["resume", "coverLetter"]:
+            document_id = getattr(self, f"{field}Id")
+            if not document_id:
+                continue
+            if getattr(self, f"{field}Text") or getattr(self, f"{field}File"):
+                setattr(self, f"{field}Id", None)
+                continue
+            document = await self.document_store.get(document_id) if self.document_store else None
+            if document is None:
+                return False, DOCUMENT_NOT_FOUND_ERROR
+            data, mime_type = document
+            setattr(self, f"{field}FileData", data)
+            setattr(self, f"{field}FileMimeType", mime_type)
+
+        resume_file_validation_helper = (
+            FileValidationHelper(self.resumeFile, self.document_executor)
+            if self.resumeFile
+            else None
+        )
+        cover_letter_file_validation_helper = (
+            FileValidationHelper(self.coverLetterFile, self.document_executor)
+            if self.coverLetterFile
+            else None
+        )
+        # The two uploads are independent, so read and parse them side by side
+        file_helpers = [
+            helper
+            for helper in [resume_file_validation_helper, cover_letter_file_validation_helper]
+            if helper is not None
+        ]
+        results = await asyncio.gather(*(helper.validate_file() for helper in file_helpers))
+        for success, error in results:
             if not success:
                 return False, error
+
+        if resume_file_validation_helper is not None:
             self.resumeFileData = resume_file_validation_helper.content
             self.resumeFileMimeType = resume_file_validation_helper.mime_type
-        if self.coverLetterFile:
-            cover_letter_file_validation_helper = FileValidationHelper(self.coverLetterFile)
-            success, error = await cover_letter_file_validation_helper.validate_file()
-            if not success:
-                return False, error
+        if cover_letter_file_validation_helper is not None:
             self.coverLetterFileData = cover_letter_file_validation_helper.content
             self.coverLetterFileMimeType = cover_letter_file_validation_helper.mime_type
+        if self.document_store is not None:
+            if resume_file_validation_helper is not None:
+                self.resumeId = await self.document_store.put(
+                    self.resumeFileData, self.resumeFileMimeType
+                )
+            if cover_letter_file_validation_helper is not None:
+                self.coverLetterId = await self.document_store.put(
+                    self.coverLetterFileData, self.coverLetterFileMimeType
+                )
         return True, "Form is valid."
 
+    def document_ids(self):
+        """IDs the client can send next time instead of the documents it sent with this form"""
+        document_ids = {}
+        if self.resumeId:
+            document_ids["resume_id"] = self.resumeId
+        if self.coverLetterId:
+            document_ids["cover_letter_id"] = self.coverLetterId
+        return document_ids
+
+    def for_job(self, jobLink=None, companyDescription=None, roleDescription=None):
+        """
+        Copy of this helper's already-validated documents paired with different job details.
+
+        Lets a batch validate and parse the resume and cover letter once and reuse them for
+        every job, along with their document store IDs so they are stored only once; call
+        validate_job() on the result before using it.
+        """
+        job_helper = FormValidationHelper(
+            jobLink,
+            companyDescription,
+            roleDescription,
+            self.resumeText,
+            self.coverLetterText,
+            resumeId=self.resumeId,
+            coverLetterId=self.coverLetterId,
+        )
+        job_helper.resumeFileData = self.resumeFileData
+        job_helper.resumeFileMimeType = self.resumeFileMimeType
+        job_helper.coverLetterFileData = self.coverLetterFileData
+        job_helper.coverLetterFileMimeType = self.coverLetterFileMimeType
+        return job_helper
+
+    def to_payload(self):
+        """
+        JSON-serialisable copy of a validated form whose documents have been read.
+
+        Background jobs are queued (and optionally written to SQLite) as payloads, then
+        turned back into a helper with from_payload() when a worker picks them up.
+        """
+        def encode(data):
+            return base64.b64encode(data).decode("ascii") if data is not None else None
+
+        return {
+            "jobLink": self.jobLink,
+            "companyDescription": self.companyDescription,
+            "roleDescription": self.roleDescription,
+            "resumeText": self.resumeText,
+            "coverLetterText": self.coverLetterText,
+            "resumeFileData": encode(self.resumeFileData),
+            "resumeFileMimeType": self.resumeFileMimeType,
+            "coverLetterFileData": encode(self.coverLetterFileData),
+            "coverLetterFileMimeType": self.coverLetterFileMimeType,
+            "resumeId": self.resumeId,
+            "coverLetterId": self.coverLetterId,
+        }
+
+    @classmethod
+    def from_payload(cls, payload):
+        """Rebuild a helper from to_payload(); call validate_job() on the result before using it"""
+        def decode(data):
+            return base64.b64decode(data) if data is not None else None
+
+        helper = cls(
+            payload["jobLink"],
+            payload["companyDescription"],
+            payload["roleDescription"],
+            payload["resumeText"],
+            payload["coverLetterText"],
+            # Jobs queued before the IDs were part of the payload have none
+            resumeId=payload.get("resumeId"),
+            coverLetterId=payload.get("coverLetterId"),
+        )
+        helper.resumeFileData = decode(payload["resumeFileData"])
+        helper.resumeFileMimeType = payload["resumeFileMimeType"]
+        helper.coverLetterFileData = decode(payload["coverLetterFileData"])
+        helper.coverLetterFileMimeType = payload["coverLetterFileMimeType"]
+        return helper
+
+    def fingerprint(self):
+        """
+        Hash of the normalised inputs of a validated form.
+
+        Two submissions with the same job (normalised link, or the same descriptions),
+        resume and cover letter produce the same fingerprint, whether the documents were
+        pasted as text or uploaded as files.
+        """
+        if self.job_link_provided:
+            job_parts = ["link", normalize_job_url(self.jobLink)]
+        else:
+            job_parts = ["text", self.companyDescription.strip(), self.roleDescription.strip()]
+
+        digest = hashlib.sha256()
+        for part in [
+            *job_parts,
+            self.resumeFileData or (self.resumeText or "").strip(),
+            self.resumeFileMimeType or "",
+            self.coverLetterFileData or (self.coverLetterText or "").strip(),
+            self.coverLetterFileMimeType or "",
+        ]:
+            data = part if isinstance(part, bytes) else part.encode("utf-8")
+            digest.update(len(data).to_bytes(8, "big"))
+            digest.update(data)
+        return digest.hexdigest()
+
     @staticmethod
     def validate_url_safety(url):
         """Validate that URL is safe to fetch"""
@@ -106,9 +300,9 @@ class FormValidationHelper:
             
             # Block private IP ranges (RFC 1918)
             try:
-                ip = ip_address(hostname)
-                if ip.is_private or ip.is_loopback or ip.is_link_local:
-                    return False, "Cannot fetch from private IP addresses"
+                success, error = FormValidationHelper.validate_ip_safety(hostname)
+                if not success:
+                    return False, error
             except ValueError:
                 # Not an IP address, that's fine (it's a domain name)
                 pass
@@ -119,6 +313,25 @@ class FormValidationHelper:
             return True, "URL is valid"
         except Exception:
             return False, "Invalid URL format"
+
+    @staticmethod
+    def validate_ip_safety(address):
+        """
+        Validate that an IP address is safe to fetch from.
+
+        Used for IP literals in job links and for the addresses a job site's name
+        resolves to when its page is downloaded.
+
+        Raises:
+            ValueError: address is not an IP address
+        """
+        ip = ip_address(address)
+        if ip.version == 6 and ip.ipv4_mapped is not None:
+            # ::ffff:127.0.0.1 reaches the same host as 127.0.0.1
+            ip = ip.ipv4_mapped
+        if ip.is_private or ip.is_loopback or ip.is_link_local:
+            return False, "Cannot fetch from private IP addresses"
+        return True, "IP address is valid"
     @staticmethod
     def validate_text_length(text: str):
         """Validate that extracted text doesn't exceed maximum length"""
@@ -130,61 +343,113 @@ class FormValidationHelper:
         return True, "Text length is valid."
 
 
+# Map of supported MIME types
+SUPPORTED_MIME_TYPES = {
+    "text/plain": "txt",
+    "application/pdf": "pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "docx",
+}
+
+DOCUMENT_NOT_FOUND_ERROR = "Your saved document has expired. Please upload the file again."
+FILE_TOO_LARGE_ERROR = "File size exceeds 10MB limit. Please use a smaller file."
+UNSUPPORTED_FILE_TYPE_ERROR = "Unsupported file type. Please upload a .txt, .pdf, or .docx file."
+
+
 class FileValidationHelper:
-    def __init__(self, file):
+    def __init__(self, file, document_executor=None):
         self.file = file
+        self.document_executor = document_executor
         self.content = None
         self.mime_type = None
 
     async def validate_file(self):
-        self.content = await self.file.read()
-        if not self.validate_file_size():
-            return False, "File size exceeds 10MB limit. Please use a smaller file."
-        success, error = self.validate_file_type()
+        """
+        Read and validate an upload without ever holding more than the size limit in memory.
+
+        The type is sniffed from the first few KB, so unsupported files are rejected
+        before the rest is read, and reading stops as soon as the limit is crossed.
+        """
+        if self.file.size is not None and not self.validate_file_size(self.file.size):
+            return False, FILE_TOO_LARGE_ERROR
+
+        start = time.perf_counter()
+        head = await self.file.read(Config.MIME_SNIFF_BYTES)
+        read_seconds = time.perf_counter() - start
+        try:
+            with time_stage("mime_sniff"):
+                detected_mime_type = await run_document_job(
+                    self.document_executor, sniff_mime_type, head
+                )
+        except DocumentProcessingError as e:
+            log(f"Failed to detect the file type: {e}", level="warning")
+            return False, UNSUPPORTED_FILE_TYPE_ERROR
+        if detected_mime_type not in SUPPORTED_MIME_TYPES:
+            return False, UNSUPPORTED_FILE_TYPE_ERROR
+        self.mime_type = detected_mime_type
+
+        start = time.perf_counter()
+        content_read = await self.read_content(head)
+        record_stage("upload_read", read_seconds + time.perf_counter() - start)
+        if not content_read:
+            return False, FILE_TOO_LARGE_ERROR
+        success, error = await self.validate_file_type()
         return success, error
 
-    def validate_file_size(self):
-        if len(self.content) > Config.MAX_FILE_SIZE_BYTES:
+    async def read_content(self, head):
+        """Read the rest of the upload in chunks; False as soon as it passes the size limit"""
+        content = bytearray(head)
+        while chunk := await self.file.read(Config.UPLOAD_CHUNK_BYTES):
+            content += chunk
+            if not self.validate_file_size(len(content)):
+                return False
+        self.content = bytes(content)
+        return True
+
+    @staticmethod
+    def validate_file_size(size):
+        if size > Config.MAX_FILE_SIZE_BYTES:
             return False
         return True
 
-    def validate_file_type(self):
-        # Use python-magic to detect MIME type from file content
-        mime = magic.Magic(mime=True)
-        detected_mime_type = mime.from_buffer(self.content)
+    async def validate_file_type(self):
+        """
+        Replace the file with its normalised text, whatever its format, so Gemini gets a small
+        text part instead of the original document.
 
-        # Map of supported MIME types
-        supported_types = {
-            "text/plain": "txt",
-            "application/pdf": "pdf",
-            "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "docx",
-        }
+        A PDF whose extraction fails or yields too little (or too much) text is kept as
+        is and sent to Gemini as a blob, e.g. a scanned resume that is really a picture.
+        """
+        file_type = SUPPORTED_MIME_TYPES[self.mime_type]
+        try:
+            with time_stage(f"extract_{file_type}"):
+                extracted_text = await run_document_job(
+                    self.document_executor, extract_document_text, self.content, self.mime_type
+                )
+        except Exception as e:
+            log(f"Failed to extract text from {file_type.upper()} file: {e}", level="warning")
+            extracted_text = None
 
-        if detected_mime_type not in supported_types:
-            return False, "Unsupported file type. Please upload a .txt, .pdf, or .docx file."
+        if self.mime_type in BLOB_FALLBACK_MIME_TYPES and (
+            extracted_text is None
+            or len(extracted_text) < Config.PDF_MIN_TEXT_CHARS
+            or not FormValidationHelper.validate_text_length(extracted_text)[0]
+        ):
+            log(f"-> Sending the {file_type.upper()} file as is; its extracted text isn't usable")
+            return True, "Successfully validated file."
 
-        self.mime_type = detected_mime_type
+        if extracted_text is None:
+            if file_type == "txt":
+                # Only the first few KB were sniffed; the rest turned out not to be UTF-8 text
+                return False, UNSUPPORTED_FILE_TYPE_ERROR
+            return False, "Failed to extract text from resume DOCX file."
 
-        if supported_types[detected_mime_type] == "txt":
-            success, error = FormValidationHelper.validate_text_length(
-                self.content.decode("utf-8")
-            )
+        success, error = FormValidationHelper.validate_text_length(extracted_text)
+        if not success:
             return success, error
-
-        elif supported_types[detected_mime_type] == "docx":
-            # DOCX: extract text on backend (Gemini doesn't support DOCX inline data)
-            try:
-                doc = Document(BytesIO(self.content))
-                extracted_text = "\n".join(
-                    [paragraph.text for paragraph in doc.paragraphs]
-                )
-                success, error = FormValidationHelper.validate_text_length(extracted_text)
-                if not success:
-                    return success, error
-                self.content = extracted_text.encode("utf-8")
-                self.mime_type = "text/plain"
-                    
-            except Exception as e:
-                print(f"Failed to extract text from resume DOCX file: {e}")
-                return False, "Failed to extract text from resume DOCX file."
-        return True, "Successfully validated file."
\ No newline at end of file
+        log(
+            f"-> Extracted {len(extracted_text):,} characters from a "
+            f"{len(self.content):,}-byte {file_type.upper()} file"
+        )
+        self.content = extracted_text.encode("utf-8")
+        self.mime_type = "text/plain"
+        return True, "Successfully validated file."
@@ -1,120 +1,314 @@
-import trafilatura
-from google import genai
-from google.genai import types
-from google.api_core import exceptions as google_exceptions
-from google.api_core import retry
-from google.api_core.exceptions import GoogleAPIError, DeadlineExceeded
+import time
+
+import httpx
 
 from config import Config
+from helpers.context_cache_helper import ContextCacheHelper
+from helpers.document_executor_helper import DocumentProcessingError, run_document_job
+from helpers.job_cache_helper import hash_content
+from helpers.job_fetch_helper import JobPageFetcher
+from helpers.job_posting_helper import extract_job_page
+from helpers.lazy_import_helper import lazy_import
+from helpers.metrics_helper import (
+    record_job_details,
+    record_stage,
+    record_token_usage,
+    time_stage,
+)
+from helpers.prompt_budget_helper import fit_job_page, fit_rewrite_inputs
+from helpers.refinement_helper import (
+    number_paragraphs,
+    parse_refined_paragraphs,
+    splice_paragraphs,
+    split_paragraphs,
+)
+from helpers.retry_helper import (
+    CoverLetterError,
+    GeminiRequestError,
+    GeminiUnavailableError,
+    JobFetchError,
+    LatencyBudget,
+    LatencyTracker,
+    call_with_retry,
+    is_retryable,
+)
+from helpers.trace_helper import log
 
 
-# Configure retry decorator with exponential backoff
-# Retries up to 3 times with exponential backoff (1s, 2s, 4s, up to 32s max)
-retry_decorator = retry.Retry(
-    initial=1.0,        # Initial delay of 1 second
-    maximum=32.0,       # Maximum delay of 32 seconds
-    multiplier=2.0,     # Double the delay each retry (exponential backoff)
-    deadline=300.0,     # Overall timeout of 5 minutes
-    predicate=retry.if_exception_type(
-        google_exceptions.ResourceExhausted,    # Rate limit (429)
-        google_exceptions.ServiceUnavailable,   # Service unavailable (503)
-        DeadlineExceeded,                       # Timeout errors
-        GoogleAPIError,                         # General API/network errors
-    ),
-)
+# Imported on first use; see LazyModule
+genai = lazy_import("google.genai")
+genai_errors = lazy_import("google.genai.errors")
+types = lazy_import("google.genai.types")
+google_exceptions = lazy_import("google.api_core.exceptions")
+
+# Recent latencies of each kind of Gemini call, used to pick the hedging delay
+SUMMARY_LATENCY = LatencyTracker()
+REWRITE_LATENCY = LatencyTracker()
+REFINE_LATENCY = LatencyTracker()
 
 
 class GeminiHelper:
-    def __init__(self):
+    def __init__(
+        self,
+        client=None,
+        job_cache=None,
+        context_cache=None,
+        limiter=None,
+        document_executor=None,
+        job_fetcher=None,
+    ):
+        """
+        Args:
+            client: Optional pre-built genai.Client (or a compatible fake). The app passes
+                the process-wide client created in its lifespan hook; when omitted a new
+                client is created.
+            job_cache: Optional JobCacheHelper used to skip re-fetching and re-summarising
+                job postings that were seen recently.
+            context_cache: Optional ContextCacheHelper used to reuse Gemini cached contexts
+                for the rewrite instructions and a user's documents.
+            limiter: Optional AdaptiveConcurrencyLimiter shared by every model call in the
+                process; calls that can't get a slot raise GeminiOverloadedError.
+            document_executor: Optional DocumentExecutor that runs page extraction in a
+                worker process; without one it runs in a thread.
+            job_fetcher: Optional JobPageFetcher shared by the process, so job page
+                downloads reuse its connections and conditional-GET cache; without one
+                each download uses a short-lived fetcher.
+        """
+        self.client = client if client is not None else self.create_client()
+        self.job_cache = job_cache
+        self.context_cache = context_cache
+        self.limiter = limiter
+        self.document_executor = document_executor
+        self.job_fetcher = job_fetcher
+
+    async def limited(self, coroutine_factory):
+        """Run a Gemini call through the shared concurrency limiter, if there is one"""
+        if self.limiter is None:
+            return await coroutine_factory()
+        return await self.limiter.run(coroutine_factory)
+
+    async def call_model(self, coroutine_factory, step, budget=None, tracker=None):
+        """
+        Run a Gemini call with budgeted retries, each attempt taking its own limiter slot.
+
+        Raises:
+            CoverLetterError: GeminiUnavailableError once transient failures are exhausted,
+                GeminiRequestError for anything retrying can't fix, or LatencyBudgetExceededError
+        """
+        try:
+            return await call_with_retry(
+                lambda: self.limited(coroutine_factory), step, budget, tracker
+            )
+        except CoverLetterError:
+            raise
+        except Exception as e:
+            log(f"ERROR in {step}: {e}", level="error")
+            raise self.structured_error(e) from e
+
+    @classmethod
+    def structured_error(cls, error):
+        """Map a raw SDK/transport error to the CoverLetterError callers should handle"""
+        if isinstance(error, CoverLetterError):
+            return error
+        if cls.is_service_unavailable_error(error) or is_retryable(error):
+            return GeminiUnavailableError(str(error))
+        return GeminiRequestError(str(error))
+
+    @staticmethod
+    def create_client():
+        """
+        Build a genai.Client whose async HTTP connection pool is sized from Config.
+
+        The client is meant to be created once per process and shared, so connections,
+        TLS sessions and auth setup are reused across requests.
+        """
         api_key = Config.GEMINI_API_KEY
         if not api_key:
             raise ValueError(
                 "GEMINI_API_KEY environment variable is not set. Please check your configuration"
             )
 
-        self.client = genai.Client(api_key=api_key)
+        http_options = types.HttpOptions(
+            async_client_args={
+                "limits": httpx.Limits(
+                    max_connections=Config.GEMINI_MAX_CONNECTIONS,
+                    max_keepalive_connections=Config.GEMINI_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=Config.GEMINI_KEEPALIVE_EXPIRY_SECONDS,
+                ),
+            },
+        )
+        return genai.Client(api_key=api_key, http_options=http_options)
+
+    @staticmethod
+    async def close_client(client):
+        """Close both the async and sync connection pools of a shared client"""
+        await client.aio.aclose()
+        client.close()
+
+    async def download_page(self, job_url):
+        """Download the raw HTML of a job posting (see JobPageFetcher.fetch)"""
+        if self.job_fetcher is not None:
+            return await self.job_fetcher.fetch(job_url)
+        async with JobPageFetcher() as job_fetcher:
+            return await job_fetcher.fetch(job_url)
 
-    @retry_decorator
-    def fetch_job_details(self, job_url):
+    async def fetch_job_details(self, job_url, budget=None):
         """
         Step 1: Fetches job posting content from URL and extracts relevant details using trafilatura and Gemini.
         
         This method:
-        1. Fetches the HTML content from the job URL using trafilatura
-        2. Extracts the main content (removes nav, footer, ads, etc.)
-        3. Uses Gemini to analyze and summarize company and role information
+        1. Fetches the HTML content from the job URL with the shared JobPageFetcher
+        2. Extracts the main content with trafilatura in a worker process (removes nav, footer, ads, etc.)
+           and reads the job details from the page locally (see parse_job_posting)
+        3. Uses Gemini to analyze and summarize company and role information, unless the local
+           details are at least Config.JOB_PARSER_MIN_CONFIDENCE complete
+        
+        When a job cache is configured, a known URL skips all three steps and a page whose
+        extracted text was already summarised (possibly via another URL) skips step 3.
+        
+        Args:
+            job_url: Link to the job posting
+            budget: LatencyBudget shared with the rest of the request; a fresh one if omitted
         
         Returns:
-            str: Structured job details containing company and role information, or None on failure
+            str: Structured job details containing company and role information
+        
+        Raises:
+            JobFetchError: The page could not be downloaded or had too little text
+            CoverLetterError: The Gemini summary failed (see call_model)
         """
-        print(f"-> STEP 1: Fetching job details from URL: {job_url}")
+        log(f"-> STEP 1: Fetching job details from URL: {job_url}")
+        budget = budget or LatencyBudget()
         
+        if self.job_cache is not None:
+            content_hash = await self.job_cache.get_content_hash(job_url)
+            if content_hash:
+                job_details = await self.job_cache.get_summary(content_hash)
+                if job_details:
+                    log("-> Step 1 served from cache (URL match).")
+                    return job_details
+
+        # Step 1a: Fetch the page asynchronously and extract content using trafilatura
+        log("-> Fetching and extracting webpage content...")
         try:
-            # Step 1a: Fetch and extract content using trafilatura
-            # trafilatura.fetch_url() handles HTTP requests with proper headers and error handling
-            print("-> Fetching and extracting webpage content...")
-            downloaded = trafilatura.fetch_url(job_url)
-            
-            if not downloaded:
-                print("ERROR: Could not fetch content from the URL")
-                return None
-            
-            # Extract main content using trafilatura
-            extracted_text = trafilatura.extract(
-                downloaded,
-                include_comments=False,
-                include_tables=True,
-                no_fallback=False
+            with time_stage("job_fetch"):
+                downloaded = await call_with_retry(
+                    lambda: self.download_page(job_url), "Step 1 (Downloading Job Page)", budget
+                )
+        except CoverLetterError:
+            raise
+        except Exception as e:
+            log(f"ERROR: Could not fetch content from the URL: {e}", level="error")
+            raise JobFetchError(f"Could not fetch content from the URL: {e}") from e
+        
+        # Extract main content using trafilatura and parse the job details locally
+        # (CPU-bound, so keep it off the event loop)
+        try:
+            with time_stage("job_extract"):
+                extracted_text, posting = await run_document_job(
+                    self.document_executor, extract_job_page, downloaded
+                )
+        except DocumentProcessingError as e:
+            log(f"ERROR: Could not extract content from the webpage: {e}", level="error")
+            raise JobFetchError(f"Could not extract content from the webpage: {e}") from e
+        
+        parsed = posting is not None and posting.confidence >= Config.JOB_PARSER_MIN_CONFIDENCE
+        if parsed and len((extracted_text or "").strip()) < 100:
+            # Pages rendered by JavaScript (e.g. Workday) may only have their JSON-LD
+            extracted_text = posting.job_details()
+        if not extracted_text or len(extracted_text.strip()) < 100:
+            log("ERROR: Could not extract sufficient content from the webpage", level="error")
+            raise JobFetchError("Could not extract sufficient content from the webpage")
+        
+        log(f"-> Extracted {len(extracted_text)} characters of content")
+        
+        if self.job_cache is not None:
+            content_hash = hash_content(extracted_text)
+            await self.job_cache.set_content_hash(job_url, content_hash)
+            job_details = await self.job_cache.get_summary(content_hash)
+            if job_details:
+                log("-> Step 1 served from cache (content match).")
+                return job_details
+        
+        if parsed:
+            job_details = posting.job_details()
+            record_job_details(posting.source)
+            if self.job_cache is not None:
+                await self.job_cache.set_summary(content_hash, job_details)
+            log(
+                f"-> Step 1 successful. Job details parsed locally ({posting.source}, "
+                f"confidence {posting.confidence:.2f}); skipping the Gemini summary.",
+                source=posting.source,
+                confidence=posting.confidence,
             )
-            
-            if not extracted_text or len(extracted_text.strip()) < 100:
-                print("ERROR: Could not extract sufficient content from the webpage")
-                return None
-            
-            print(f"-> Extracted {len(extracted_text)} characters of content")
-            
-            # Step 1b: Use Gemini to analyze and summarize the content
-            print("-> Analyzing content with Gemini...")
-            
-            system_instruction = (
-                "You are an expert job posting analyzer. Your task is to extract and summarize "
-                "key information from job posting text. Focus on identifying: "
-                "1) Company name, mission, values, and culture "
-                "2) Role title, key requirements, responsibilities, and technical skills. "
-                "Provide a clear, concise summary that captures the essential information "
-                "needed to tailor a cover letter."
+            return job_details
+        if posting is not None:
+            log(
+                f"-> Local job details too incomplete ({posting.source}, "
+                f"confidence {posting.confidence:.2f})",
+                source=posting.source,
+                confidence=posting.confidence,
             )
-            
-            user_query = f"""
-            Analyze the following job posting content and extract the key information:
-
-            {extracted_text}
-
-            Please provide a structured summary with the following sections:
-            1. COMPANY INFORMATION: Name, mission/values, industry, and any relevant company culture details
-            2. ROLE INFORMATION: Job title, key responsibilities, required qualifications, technical skills/stack, and any unique requirements
-            
-            Keep the summary concise but comprehensive enough to understand what the company does and what the role requires.
-            """
-            
-            config = types.GenerateContentConfig(system_instruction=system_instruction)
-            
-            response = self.client.models.generate_content(
-                model=Config.GEMINI_MODEL, 
-                contents=user_query, 
-                config=config
+        
+        # Step 1b: Use Gemini to analyze and summarize the content
+        log("-> Analyzing content with Gemini...")
+        page_text = fit_job_page(extracted_text)
+        
+        system_instruction = (
+            "You are an expert job posting analyzer. Your task is to extract and summarize "
+            "key information from job posting text. Focus on identifying: "
+            "1) Company name, mission, values, and culture "
+            "2) Role title, key requirements, responsibilities, and technical skills. "
+            "Provide a clear, concise summary that captures the essential information "
+            "needed to tailor a cover letter."
+        )
+        
+        user_query = f"""
+        Analyze the following job posting content and extract the key information:
+
+        {page_text}
+
+        Please provide a structured summary with the following sections:
+        1. COMPANY INFORMATION: Name, mission/values, industry, and any relevant company culture details
+        2. ROLE INFORMATION: Job title, key responsibilities, required qualifications, technical skills/stack, and any unique requirements
+        
+        Keep the summary concise but comprehensive enough to understand what the company does and what the role requires.
+        """
+        
+        config = types.GenerateContentConfig(system_instruction=system_instruction)
+        
+        with time_stage("gemini_summary"):
+            response = await self.call_model(
+                lambda: self.client.aio.models.generate_content(
+                    model=Config.GEMINI_MODEL, 
+                    contents=user_query, 
+                    config=config
+                ),
+                "Step 1 (Analyzing Job Details)",
+                budget,
+                SUMMARY_LATENCY,
             )
-            
-            job_details = response.text
-            print("-> Step 1 successful. Job details extracted and analyzed.")
-            return job_details
-            
-        except Exception as e:
-            print(f"ERROR in Step 1 (Fetching Job Details): {e}")
-            return None
+        record_token_usage("summary", response.usage_metadata)
+        record_job_details("gemini_summary")
+        
+        job_details = response.text
+        if not job_details:
+            raise GeminiRequestError("Gemini returned an empty job summary")
+        if self.job_cache is not None:
+            await self.job_cache.set_summary(content_hash, job_details)
+        log("-> Step 1 successful. Job details extracted and analyzed.")
+        return job_details
 
-    @retry_decorator
-    def rewrite_cover_letter(
+    @staticmethod
+    def is_service_unavailable_error(error):
+        """True for rate-limit (429) and overload (503) errors from either Google client library"""
+        if isinstance(
+            error, (google_exceptions.ServiceUnavailable, google_exceptions.ResourceExhausted)
+        ):
+            return True
+        return isinstance(error, genai_errors.APIError) and error.code in (429, 503)
+
+    def build_rewrite_parts(
         self,
         job_details,
         resume_text=None,
@@ -125,31 +319,50 @@ class GeminiHelper:
         resume_file_mime_type=None,
     ):
         """
-        Step 2: Uses the extracted data to rewrite the cover letter based on complex instructions.
+        Builds the prompt pieces for a Step 2 rewrite call.
 
-        Args:
-            job_details: Company and role description text
-            resume_text: User's resume text (optional if resume_file_data is provided)
-            existing_letter: Cover letter text (optional if cover_letter_file_data is provided)
-            cover_letter_file_data: Raw cover letter file bytes (optional if existing_letter is provided)
-            cover_letter_file_mime_type: MIME type of cover letter file (required if cover_letter_file_data is provided)
-            resume_file_data: Raw resume file bytes (optional if resume_text is provided)
-            resume_file_mime_type: MIME type of resume file (required if resume_file_data is provided)
-        """
-        print("-> STEP 2: Rewriting the cover letter using extracted data.")
+        Takes the same arguments as rewrite_cover_letter. The instructions and the user's
+        documents come first and don't depend on the job, so they can be served from a
+        Gemini cached context; the job details follow in their own part.
 
+        Returns:
+            tuple: (system_instruction, document_parts, job_part), or None if inputs are missing
+        """
         # Validate that we have either existing_letter or cover_letter_file_data
         if not existing_letter and not cover_letter_file_data:
-            print(
-                "ERROR: Neither existing_letter text nor cover_letter_file_data was provided."
+            log(
+                "ERROR: Neither existing_letter text nor cover_letter_file_data was provided.",
+                level="error",
             )
             return None
 
         # Validate that we have either resume_text or resume_file_data
         if not resume_text and not resume_file_data:
-            print("ERROR: Neither resume_text nor resume_file_data was provided.")
+            log("ERROR: Neither resume_text nor resume_file_data was provided.", level="error")
             return None
 
+        # Fit the text inputs (including uploads already extracted to text/plain) into the
+        # prompt's token budget; files Gemini reads itself, like scanned PDFs, are left as is
+        inputs = {"job_details": job_details}
+        if resume_file_data is None:
+            inputs["resume"] = resume_text
+        elif resume_file_mime_type == "text/plain":
+            inputs["resume"] = resume_file_data.decode("utf-8")
+        if cover_letter_file_data is None:
+            inputs["cover_letter"] = existing_letter
+        elif cover_letter_file_mime_type == "text/plain":
+            inputs["cover_letter"] = cover_letter_file_data.decode("utf-8")
+        fitted = fit_rewrite_inputs(inputs)
+        job_details = fitted["job_details"]
+        if resume_file_data is None:
+            resume_text = fitted["resume"]
+        elif "resume" in fitted:
+            resume_file_data = fitted["resume"].encode("utf-8")
+        if cover_letter_file_data is None:
+            existing_letter = fitted["cover_letter"]
+        elif "cover_letter" in fitted:
+            cover_letter_file_data = fitted["cover_letter"].encode("utf-8")
+
         # The detailed instructions are baked directly into the system prompt and user prompt
         # to guide the model's behavior and response format.
 
@@ -172,7 +385,7 @@ class GeminiHelper:
 
         prompt_text = f"""
         Analyze the following inputs:
-        1. [NEW ROLE REQUIREMENTS & COMPANY DESCRIPTION]: {job_details}
+        1. [NEW ROLE REQUIREMENTS & COMPANY DESCRIPTION]: provided at the end of this request
         2. [EXISTING COVER LETTER]: {cover_letter_ref}
         3. [RESUME]: {resume_ref}
 
@@ -192,75 +405,387 @@ class GeminiHelper:
         Start your response directly with the salutation ("Dear...") and provide ONLY the revised cover letter text.
         """
 
-        try:
-            config = types.GenerateContentConfig(system_instruction=system_instruction)
-
-            # Build content parts based on whether we have file data or text
-            parts = []
+        # Build content parts based on whether we have file data or text
+        parts = []
 
-            # Add cover letter (file or text)
-            if cover_letter_file_data and cover_letter_file_mime_type:
-                print(
-                    f"-> Processing cover letter from file (MIME type: {cover_letter_file_mime_type})"
-                )
-                cover_letter_part = types.Part(
-                    inline_data=types.Blob(
-                        mime_type=cover_letter_file_mime_type, data=cover_letter_file_data
-                    )
+        # Add cover letter (file or text)
+        if cover_letter_file_data and cover_letter_file_mime_type:
+            log(
+                f"-> Processing cover letter from file (MIME type: {cover_letter_file_mime_type})"
+            )
+            cover_letter_part = types.Part(
+                inline_data=types.Blob(
+                    mime_type=cover_letter_file_mime_type, data=cover_letter_file_data
                 )
-                parts.append(cover_letter_part)
+            )
+            parts.append(cover_letter_part)
 
-            # Add resume (file or text - will be embedded in prompt if text)
-            if resume_file_data and resume_file_mime_type:
-                print(
-                    f"-> Processing resume from file (MIME type: {resume_file_mime_type})"
-                )
-                resume_part = types.Part(
-                    inline_data=types.Blob(
-                        mime_type=resume_file_mime_type, data=resume_file_data
-                    )
+        # Add resume (file or text - will be embedded in prompt if text)
+        if resume_file_data and resume_file_mime_type:
+            log(
+                f"-> Processing resume from file (MIME type: {resume_file_mime_type})"
+            )
+            resume_part = types.Part(
+                inline_data=types.Blob(
+                    mime_type=resume_file_mime_type, data=resume_file_data
                 )
-                parts.append(resume_part)
+            )
+            parts.append(resume_part)
 
-            # Add the text prompt
-            text_part = types.Part(text=prompt_text)
-            parts.append(text_part)
+        # Add the text prompt
+        text_part = types.Part(text=prompt_text)
+        parts.append(text_part)
 
-            # Generate content
-            if len(parts) > 1:
-                # Use multipart content (files + text)
-                print("-> Using multipart content with file attachments")
-                contents = [types.Content(role="user", parts=parts)]
+        job_part = types.Part(
+            text=f"[NEW ROLE REQUIREMENTS & COMPANY DESCRIPTION]: {job_details}"
+        )
+        return system_instruction, parts, job_part
 
-                response = self.client.models.generate_content(
-                    model=Config.GEMINI_MODEL, contents=contents, config=config
-                )
-            else:
-                # Use text-only approach
-                print("-> Processing from text input only")
-                response = self.client.models.generate_content(
-                    model=Config.GEMINI_MODEL, contents=prompt_text, config=config
-                )
+    @staticmethod
+    def build_inline_rewrite_request(system_instruction, document_parts, job_part):
+        """Contents and config that send the instructions and documents with the request"""
+        if len(document_parts) > 1:
+            # Use multipart content (files + text)
+            log("-> Using multipart content with file attachments")
+        else:
+            # Use text-only approach
+            log("-> Processing from text input only")
+        contents = [types.Content(role="user", parts=[*document_parts, job_part])]
+        config = types.GenerateContentConfig(system_instruction=system_instruction)
+        return contents, config
+
+    async def prepare_rewrite_request(self, **rewrite_args):
+        """
+        Builds the contents and config for a Step 2 rewrite call, referencing a cached
+        context for the instructions and documents when one is available.
+
+        Returns:
+            tuple: (contents, config, cache_key), where cache_key is only set when a cached
+            context is used, or None if inputs are missing
+        """
+        rewrite_parts = self.build_rewrite_parts(**rewrite_args)
+        if rewrite_parts is None:
+            return None
+        system_instruction, document_parts, job_part = rewrite_parts
+
+        if self.context_cache is not None:
+            cache_name, cache_key = await self.context_cache.get_or_create(
+                Config.GEMINI_MODEL, system_instruction, document_parts
+            )
+            if cache_name:
+                log("-> Using cached context for instructions and documents")
+                contents = [types.Content(role="user", parts=[job_part])]
+                config = types.GenerateContentConfig(cached_content=cache_name)
+                return contents, config, cache_key
+
+        contents, config = self.build_inline_rewrite_request(*rewrite_parts)
+        return contents, config, None
+
+    async def generate_rewrite(self, stream=False, **rewrite_args):
+        """
+        Sends a Step 2 rewrite call, falling back to inline content when Gemini no longer
+        recognises the cached context (e.g. it expired early or was deleted).
+
+        Returns:
+            The generate_content response, or an async iterator of chunks when stream is True
 
-            revised_letter = response.text
-            print("-> Step 2 successful. Cover letter rewritten.")
-            return revised_letter
+        Raises:
+            ValueError: The resume or cover letter is missing
+        """
+        request = await self.prepare_rewrite_request(**rewrite_args)
+        if request is None:
+            raise ValueError("Both a resume and a cover letter are required.")
+        contents, config, cache_key = request
+
+        if stream:
+            generate = self.client.aio.models.generate_content_stream
+        else:
+            generate = self.client.aio.models.generate_content
 
-        except google_exceptions.ServiceUnavailable as e:
-            print(f"ERROR in Step 2 (Rewriting Cover Letter): 503 Service Unavailable - {e}")
-            return "SERVICE_UNAVAILABLE"
-        except google_exceptions.ResourceExhausted as e:
-            print(f"ERROR in Step 2 (Rewriting Cover Letter): Resource Exhausted - {e}")
-            return "SERVICE_UNAVAILABLE"
+        try:
+            return await generate(model=Config.GEMINI_MODEL, contents=contents, config=config)
         except Exception as e:
-            print(f"ERROR in Step 2 (Rewriting Cover Letter): {e}")
+            if cache_key is None or not ContextCacheHelper.is_cache_missing_error(e):
+                raise
+            log(f"-> Cached context unavailable, retrying with inline content: {e}", level="warning")
+            await self.context_cache.invalidate(cache_key)
+            contents, config = self.build_inline_rewrite_request(
+                *self.build_rewrite_parts(**rewrite_args)
+            )
+            return await generate(model=Config.GEMINI_MODEL, contents=contents, config=config)
+
+    async def rewrite_cover_letter(
+        self,
+        job_details,
+        resume_text=None,
+        existing_letter=None,
+        cover_letter_file_data=None,
+        cover_letter_file_mime_type=None,
+        resume_file_data=None,
+        resume_file_mime_type=None,
+        budget=None,
+    ):
+        """
+        Step 2: Uses the extracted data to rewrite the cover letter based on complex instructions.
+
+        Args:
+            job_details: Company and role description text
+            resume_text: User's resume text (optional if resume_file_data is provided)
+            existing_letter: Cover letter text (optional if cover_letter_file_data is provided)
+            cover_letter_file_data: Raw cover letter file bytes (optional if existing_letter is provided)
+            cover_letter_file_mime_type: MIME type of cover letter file (required if cover_letter_file_data is provided)
+            resume_file_data: Raw resume file bytes (optional if resume_text is provided)
+            resume_file_mime_type: MIME type of resume file (required if resume_file_data is provided)
+            budget: LatencyBudget shared with Step 1; a fresh one if omitted
+
+        Returns:
+            str: The revised cover letter
+
+        Raises:
+            CoverLetterError: See call_model
+        """
+        log("-> STEP 2: Rewriting the cover letter using extracted data.")
+
+        try:
+            with time_stage("gemini_rewrite"):
+                response = await self.call_model(
+                    lambda: self.generate_rewrite(
+                        job_details=job_details,
+                        resume_text=resume_text,
+                        existing_letter=existing_letter,
+                        cover_letter_file_data=cover_letter_file_data,
+                        cover_letter_file_mime_type=cover_letter_file_mime_type,
+                        resume_file_data=resume_file_data,
+                        resume_file_mime_type=resume_file_mime_type,
+                    ),
+                    "Step 2 (Rewriting Cover Letter)",
+                    budget,
+                    REWRITE_LATENCY,
+                )
+        except GeminiRequestError:
             # Provide more detailed error message for file-related issues
             if cover_letter_file_data:
-                print(
-                    f"  Cover letter file processing failed. MIME type: {cover_letter_file_mime_type}, File size: {len(cover_letter_file_data)} bytes"
+                log(
+                    f"  Cover letter file processing failed. MIME type: {cover_letter_file_mime_type}, File size: {len(cover_letter_file_data)} bytes",
+                    level="error",
                 )
             if resume_file_data:
-                print(
-                    f"  Resume file processing failed. MIME type: {resume_file_mime_type}, File size: {len(resume_file_data)} bytes"
+                log(
+                    f"  Resume file processing failed. MIME type: {resume_file_mime_type}, File size: {len(resume_file_data)} bytes",
+                    level="error",
                 )
-            return None
+            raise
+        record_token_usage("rewrite", response.usage_metadata)
+
+        revised_letter = response.text
+        if not revised_letter:
+            raise GeminiRequestError("Gemini returned an empty cover letter")
+        log("-> Step 2 successful. Cover letter rewritten.")
+        return revised_letter
+
+    async def rewrite_cover_letter_stream(
+        self,
+        job_details,
+        resume_text=None,
+        existing_letter=None,
+        cover_letter_file_data=None,
+        cover_letter_file_mime_type=None,
+        resume_file_data=None,
+        resume_file_mime_type=None,
+        budget=None,
+    ):
+        """
+        Step 2 (streaming): Same as rewrite_cover_letter, but yields the revised letter in
+        pieces as Gemini generates them.
+
+        Opening the stream is retried within the budget like any other call; once chunks
+        have been sent a failure can't be retried and is raised to the caller.
+
+        Yields:
+            str: Successive chunks of the revised cover letter text
+
+        Raises:
+            CoverLetterError: See call_model
+        """
+        log("-> STEP 2: Streaming the rewritten cover letter.")
+
+        # Hold a limiter slot for the whole stream, not just the initial request
+        if self.limiter is not None:
+            await self.limiter.acquire()
+        start = time.monotonic()
+        overloaded = False
+        first_chunk = True
+        usage_metadata = None
+        outcome = "error"
+        try:
+            stream = await call_with_retry(
+                lambda: self.generate_rewrite(
+                    stream=True,
+                    job_details=job_details,
+                    resume_text=resume_text,
+                    existing_letter=existing_letter,
+                    cover_letter_file_data=cover_letter_file_data,
+                    cover_letter_file_mime_type=cover_letter_file_mime_type,
+                    resume_file_data=resume_file_data,
+                    resume_file_mime_type=resume_file_mime_type,
+                ),
+                "Step 2 (Streaming Cover Letter)",
+                budget,
+            )
+            async for chunk in stream:
+                # Only the final chunk carries the totals for the whole response
+                usage_metadata = chunk.usage_metadata or usage_metadata
+                if chunk.text:
+                    if first_chunk:
+                        first_chunk = False
+                        record_stage("gemini_rewrite_first_chunk", time.monotonic() - start)
+                    yield chunk.text
+            outcome = "ok"
+        except CoverLetterError:
+            raise
+        except Exception as e:
+            overloaded = self.is_service_unavailable_error(e)
+            log(f"ERROR in Step 2 (Streaming Cover Letter): {e}", level="error")
+            raise self.structured_error(e) from e
+        finally:
+            latency = time.monotonic() - start
+            record_stage("gemini_rewrite", latency, outcome)
+            record_token_usage("rewrite", usage_metadata)
+            if self.limiter is not None:
+                self.limiter.release(overloaded=overloaded, latency=latency)
+
+        log("-> Step 2 successful. Cover letter streamed.")
+
+    def build_refine_request(
+        self,
+        job_details,
+        paragraphs,
+        indices,
+        guidance=None,
+        resume_text=None,
+        resume_file_data=None,
+        resume_file_mime_type=None,
+    ):
+        """
+        Builds the contents and config for a refinement call (see refine_cover_letter).
+
+        The job details and resume are fitted into the rewrite token budget; the letter is
+        sent whole, since the untouched paragraphs are the context the new ones must fit.
+
+        Returns:
+            tuple: (contents, config)
+        """
+        inputs = {"job_details": job_details}
+        if resume_file_data is None:
+            inputs["resume"] = resume_text
+        elif resume_file_mime_type == "text/plain":
+            inputs["resume"] = resume_file_data.decode("utf-8")
+        fitted = fit_rewrite_inputs(inputs)
+        if "resume" in fitted:
+            resume_text, resume_file_data = fitted["resume"], None
+
+        system_instruction = (
+            "You are an expert cover letter editor. You rewrite only the paragraphs of a cover "
+            "letter you are asked to, so that they read naturally with the rest of the letter. "
+            "Your output MUST be ONLY the rewritten paragraphs in the requested format, with no "
+            "preamble or commentary."
+        )
+        markers = ", ".join(f"[P{index}]" for index in indices)
+        guidance_text = (
+            f"Follow this guidance from the applicant: {guidance.strip()}"
+            if guidance and guidance.strip()
+            else "Make them stronger and more specific to the role."
+        )
+        prompt_text = f"""
+        Below is a cover letter, with a marker line such as [P0] before each paragraph, followed by the job it is for and the applicant's resume.
+
+        [COVER LETTER]:
+        {number_paragraphs(paragraphs)}
+
+        Rewrite ONLY the paragraphs {markers}. {guidance_text}
+        1. Keep the company name, role title, tone and length of the letter; the other paragraphs stay exactly as they are.
+        2. Do not repeat points the other paragraphs already make, and keep the rewritten paragraphs consistent with them.
+        3. Draw only on the resume and the job details. Paraphrase the resume rather than quoting it.
+
+        Answer with each rewritten paragraph preceded by its marker line (for example [P{indices[0]}]) and nothing else.
+
+        [NEW ROLE REQUIREMENTS & COMPANY DESCRIPTION]: {fitted["job_details"]}
+
+        [RESUME]: {"See the attached resume document" if resume_file_data else resume_text}
+        """
+
+        parts = []
+        if resume_file_data and resume_file_mime_type:
+            parts.append(
+                types.Part(
+                    inline_data=types.Blob(mime_type=resume_file_mime_type, data=resume_file_data)
+                )
+            )
+        parts.append(types.Part(text=prompt_text))
+        contents = [types.Content(role="user", parts=parts)]
+        config = types.GenerateContentConfig(system_instruction=system_instruction)
+        return contents, config
+
+    async def refine_cover_letter(
+        self,
+        job_details,
+        letter,
+        indices,
+        guidance=None,
+        resume_text=None,
+        resume_file_data=None,
+        resume_file_mime_type=None,
+        budget=None,
+    ):
+        """
+        Regenerates some paragraphs of a finished letter and splices them back in.
+
+        Gemini only writes the chosen paragraphs, so the answer is a fraction of a full
+        rewrite. Paragraphs are split at blank lines (see split_paragraphs).
+
+        Args:
+            job_details: Company and role description text the letter was written for
+            letter: The letter to refine
+            indices: 0-based indices of the paragraphs to regenerate
+            guidance: Optional instructions from the user, e.g. "less formal"
+            resume_text: User's resume text (optional if resume_file_data is provided)
+            resume_file_data: Stored resume bytes (optional if resume_text is provided)
+            resume_file_mime_type: MIME type of resume_file_data
+            budget: LatencyBudget for the request; a fresh one if omitted
+
+        Returns:
+            str: The letter with the chosen paragraphs replaced
+
+        Raises:
+            CoverLetterError: See call_model; GeminiRequestError when the answer is missing
+                one of the paragraphs
+        """
+        log(f"-> Refining paragraphs {indices} of the cover letter.")
+        paragraphs = split_paragraphs(letter)
+        contents, config = self.build_refine_request(
+            job_details,
+            paragraphs,
+            indices,
+            guidance,
+            resume_text,
+            resume_file_data,
+            resume_file_mime_type,
+        )
+
+        with time_stage("gemini_refine"):
+            response = await self.call_model(
+                lambda: self.client.aio.models.generate_content(
+                    model=Config.GEMINI_MODEL, contents=contents, config=config
+                ),
+                "Refining Cover Letter",
+                budget,
+                REFINE_LATENCY,
+            )
+        record_token_usage("refine", response.usage_metadata)
+
+        try:
+            replacements = parse_refined_paragraphs(response.text or "", indices)
+        except ValueError as e:
+            raise GeminiRequestError(f"Gemini returned an incomplete refinement: {e}") from e
+        log("-> Refinement successful.")
+        return splice_paragraphs(paragraphs, replacements)
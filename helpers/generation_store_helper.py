@@ -0,0 +1,93 @@
+import asyncio
+import json
+import uuid
+
+from config import Config
+from helpers.job_cache_helper import SQLiteCacheStore, TTLCache
+from helpers.metrics_helper import record_cache_lookup
+
+
+class GenerationStoreHelper:
+    """
+    Finished cover letters kept with the inputs needed to refine them.
+
+    Each generation holds the letter, the job details it was written for and the resume:
+    its text when it was pasted, or its document ID when it came from the document store.
+    /refine then only needs the generation ID to regenerate some of the letter's
+    paragraphs. IDs are random, since a generation holds the user's letter and resume.
+    Like DocumentStoreHelper, this is an in-memory LRU optionally backed by a SQLite
+    store when Config.GENERATION_STORE_DB_PATH (or Config.SHARED_STATE_DB_PATH) is set.
+    """
+
+    def __init__(
+        self,
+        max_entries=Config.GENERATION_STORE_MAX_ENTRIES,
+        max_bytes=Config.GENERATION_STORE_MAX_BYTES,
+        ttl_seconds=Config.GENERATION_STORE_TTL_SECONDS,
+        db_path=Config.GENERATION_STORE_DB_PATH,
+        db_max_entries=Config.GENERATION_STORE_DB_MAX_ENTRIES,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.cache = TTLCache(max_entries, ttl_seconds, max_bytes=max_bytes)
+        self.store = None
+        if db_path:
+            self.store = SQLiteCacheStore(db_path, "generations", db_max_entries, ttl_seconds)
+
+    async def put(self, letter, job_details, resume_text=None, resume_id=None):
+        """
+        Store a finished letter and return its generation ID.
+
+        Args:
+            letter: The generated (or refined) cover letter
+            job_details: The job details it was written for
+            resume_text: The pasted resume, or None when resume_id is given
+            resume_id: Document store ID of the resume
+        """
+        generation_id = uuid.uuid4().hex
+        value = json.dumps(
+            {
+                "letter": letter,
+                "job_details": job_details,
+                "resume_text": resume_text,
+                "resume_id": resume_id,
+            }
+        )
+        self.cache.set(generation_id, value)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.set, generation_id, value)
+        return generation_id
+
+    async def get(self, generation_id):
+        """
+        Look up a generation.
+
+        Returns:
+            dict: letter, job_details, resume_text and resume_id, or None if the ID is
+                unknown or has expired
+        """
+        value = self.cache.get(generation_id)
+        if value is None and self.store is not None:
+            value = await asyncio.to_thread(self.store.get, generation_id)
+            if value is not None:
+                self.cache.set(generation_id, value)
+        record_cache_lookup("generation", value is not None)
+        if value is None:
+            return None
+        return json.loads(value)
+
+    def stats(self):
+        stats = {
+            "memory": {
+                "hits": self.cache.hits,
+                "misses": self.cache.misses,
+                "size": len(self.cache),
+                "bytes": self.cache.total_bytes,
+            },
+        }
+        if self.store is not None:
+            stats["disk"] = {"hits": self.store.hits, "misses": self.store.misses}
+        return stats
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
@@ -0,0 +1,267 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from config import Config
+from helpers.metrics_helper import record_cache_lookup
+from helpers.sqlite_helper import connect_sqlite
+
+
+# Query parameters that only carry tracking/attribution data and never change the posting
+TRACKING_QUERY_PARAMS = {
+    "fbclid",
+    "gclid",
+    "gh_src",
+    "lever-source",
+    "lever-origin",
+    "mc_cid",
+    "mc_eid",
+    "ref",
+    "refid",
+    "source",
+    "src",
+    "trk",
+    "trackingid",
+}
+TRACKING_QUERY_PREFIXES = ("utm_",)
+# SQLite cache rows record when they were last read to within this many seconds
+ACCESS_TIME_RESOLUTION_SECONDS = 60
+
+
+def normalize_job_url(url):
+    """
+    Normalise a job URL so trivially different links to the same posting share a cache key.
+
+    Lowercases the scheme and host, drops the fragment, default ports and trailing slash,
+    strips tracking query parameters and sorts the ones that remain.
+    """
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    hostname = (parsed.hostname or "").lower()
+    port = parsed.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        hostname = f"{hostname}:{port}"
+
+    query = [
+        (key, value)
+        for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_QUERY_PARAMS
+        and not key.lower().startswith(TRACKING_QUERY_PREFIXES)
+    ]
+    path = parsed.path.rstrip("/") or "/"
+    return urlunparse((scheme, hostname, path, "", urlencode(sorted(query)), ""))
+
+
+def hash_content(text):
+    """Stable key for extracted page text, shared by every URL that yields the same content"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class TTLCache:
+    """
+    In-memory LRU cache with per-entry expiry and hit/miss counters.
+
+    With max_bytes set, values must support len() and the least recently used entries
+    are also evicted to keep their combined length under max_bytes.
+    """
+
+    def __init__(self, max_entries, ttl_seconds, max_bytes=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self.delete(key)
+        self.misses += 1
+        return None
+
+    def set(self, key, value):
+        self.delete(key)
+        if self.max_bytes is not None:
+            if len(value) > self.max_bytes:
+                return
+            self.total_bytes += len(value)
+        self.entries[key] = (value, time.monotonic() + self.ttl_seconds)
+        while len(self.entries) > self.max_entries or (
+            self.max_bytes is not None and self.total_bytes > self.max_bytes
+        ):
+            self.delete(next(iter(self.entries)))
+
+    def delete(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None and self.max_bytes is not None:
+            self.total_bytes -= len(entry[0])
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class SQLiteCacheStore:
+    """
+    Optional on-disk cache layer so entries survive machine restarts.
+
+    Rows expire after the TTL and the table is trimmed to max_entries by evicting
+    the least recently used rows. The database is opened in WAL mode, so worker processes
+    pointed at the same file share one cache. Calls block, so async code should run them
+    in a thread.
+    """
+
+    def __init__(self, path, table, max_entries, ttl_seconds):
+        self.table = table
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.connection = connect_sqlite(path)
+        self.connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self.connection.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute(
+                f"SELECT value, accessed_at FROM {self.table} WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            # Only write when the recency changes noticeably, so reads shared by several
+            # worker processes don't all queue for the write lock
+            if now - row[1] > ACCESS_TIME_RESOLUTION_SECONDS:
+                self.connection.execute(
+                    f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key)
+                )
+                self.connection.commit()
+        self.hits += 1
+        return row[0]
+
+    def set(self, key, value):
+        now = time.time()
+        with self.lock:
+            self.connection.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now + self.ttl_seconds, now),
+            )
+            self.connection.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,))
+            self.connection.execute(
+                f"DELETE FROM {self.table} WHERE key NOT IN "
+                f"(SELECT key FROM {self.table} ORDER BY accessed_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            self.connection.commit()
+
+    def delete(self, key):
+        with self.lock:
+            self.connection.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self.connection.commit()
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+class JobCacheHelper:
+    """
+    Two-level cache for job-posting extraction and summarisation.
+
+    The URL layer maps a normalised job URL to the hash of its extracted text; the
+    content layer maps that hash to the Gemini summary, so the same posting reached
+    through different URLs is only summarised once. Each layer is an in-memory LRU,
+    optionally backed by a SQLite store when Config.JOB_CACHE_DB_PATH is set (it defaults
+    to the file worker processes share, Config.SHARED_STATE_DB_PATH).
+    """
+
+    def __init__(
+        self,
+        max_entries=Config.JOB_CACHE_MAX_ENTRIES,
+        ttl_seconds=Config.JOB_CACHE_TTL_SECONDS,
+        db_path=Config.JOB_CACHE_DB_PATH,
+        db_max_entries=Config.JOB_CACHE_DB_MAX_ENTRIES,
+    ):
+        self.url_cache = TTLCache(max_entries, ttl_seconds)
+        self.content_cache = TTLCache(max_entries, ttl_seconds)
+        self.url_store = None
+        self.content_store = None
+        if db_path:
+            self.url_store = SQLiteCacheStore(db_path, "job_urls", db_max_entries, ttl_seconds)
+            self.content_store = SQLiteCacheStore(
+                db_path, "job_summaries", db_max_entries, ttl_seconds
+            )
+
+    @staticmethod
+    async def _get(cache, store, key):
+        value = cache.get(key)
+        if value is None and store is not None:
+            value = await asyncio.to_thread(store.get, key)
+            if value is not None:
+                cache.set(key, value)
+        return value
+
+    @staticmethod
+    async def _set(cache, store, key, value):
+        cache.set(key, value)
+        if store is not None:
+            await asyncio.to_thread(store.set, key, value)
+
+    async def get_content_hash(self, job_url):
+        content_hash = await self._get(self.url_cache, self.url_store, normalize_job_url(job_url))
+        record_cache_lookup("job_url", content_hash is not None)
+        return content_hash
+
+    async def set_content_hash(self, job_url, content_hash):
+        await self._set(self.url_cache, self.url_store, normalize_job_url(job_url), content_hash)
+
+    async def get_summary(self, content_hash):
+        summary = await self._get(self.content_cache, self.content_store, content_hash)
+        record_cache_lookup("job_summary", summary is not None)
+        return summary
+
+    async def set_summary(self, content_hash, summary):
+        await self._set(self.content_cache, self.content_store, content_hash, summary)
+
+    def stats(self):
+        """Hit/miss counters and sizes for each layer"""
+        stats = {
+            "url_memory": {
+                "hits": self.url_cache.hits,
+                "misses": self.url_cache.misses,
+                "size": len(self.url_cache),
+            },
+            "content_memory": {
+                "hits": self.content_cache.hits,
+                "misses": self.content_cache.misses,
+                "size": len(self.content_cache),
+            },
+        }
+        if self.url_store is not None:
+            stats["url_disk"] = {"hits": self.url_store.hits, "misses": self.url_store.misses}
+            stats["content_disk"] = {
+                "hits": self.content_store.hits,
+                "misses": self.content_store.misses,
+            }
+        return stats
+
+    def close(self):
+        if self.url_store is not None:
+            self.url_store.close()
+            self.content_store.close()
@@ -0,0 +1,278 @@
+import asyncio
+import importlib.util
+import socket
+
+import httpcore
+import httpx
+
+from config import Config
+from helpers.form_validation_helper import FormValidationHelper
+from helpers.job_cache_helper import TTLCache
+from helpers.metrics_helper import record_cache_lookup
+from helpers.retry_helper import JobFetchError
+from helpers.trace_helper import log
+
+
+# HTTP/2 needs the optional h2 package (httpx[http2]); without it pages are fetched over HTTP/1.1
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# httpx adds Accept-Encoding itself: gzip and deflate, plus br/zstd when brotli/zstandard are installed
+JOB_FETCH_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; cover-letter-tweaker/0.1)",
+    "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+}
+
+
+class UnsafeAddressError(JobFetchError):
+    """The job site's name resolved to an address validate_url_safety would refuse"""
+
+
+class JobPageTooLargeError(JobFetchError):
+    """The job page is bigger than the fetcher's max_bytes"""
+
+
+async def resolve_safe_addresses(host, port, timeout=None):
+    """
+    Resolve a host name once and check every address it resolves to.
+
+    All addresses must pass FormValidationHelper.validate_ip_safety, so an answer mixing
+    public and private addresses can't be used to reach the private one.
+
+    Returns:
+        list: The addresses, in resolver order
+
+    Raises:
+        UnsafeAddressError: An address is private, loopback or link-local
+        httpcore.ConnectError, httpcore.ConnectTimeout: The name could not be resolved
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        infos = await asyncio.wait_for(
+            loop.getaddrinfo(host, port, type=socket.SOCK_STREAM), timeout
+        )
+    except asyncio.TimeoutError:
+        raise httpcore.ConnectTimeout(f"Timed out resolving {host}") from None
+    except OSError as e:
+        raise httpcore.ConnectError(f"Could not resolve {host}: {e}") from e
+
+    addresses = list(dict.fromkeys(info[4][0] for info in infos))
+    for address in addresses:
+        try:
+            success, error = FormValidationHelper.validate_ip_safety(address)
+        except ValueError:
+            success, error = False, "Unrecognised address"
+        if not success:
+            raise UnsafeAddressError(f"{host} resolved to {address}: {error}")
+    return addresses
+
+
+class SafeNetworkBackend(httpcore.AsyncNetworkBackend):
+    """
+    Network backend that resolves each host itself and only connects to checked addresses.
+
+    The connection goes to the address that was checked, so the name is looked up once and
+    a second DNS answer can't swap in a private address (DNS rebinding). TLS still uses
+    the host name for SNI and certificate checks.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        addresses = await resolve_safe_addresses(host, port, timeout)
+        error = None
+        for address in addresses:
+            try:
+                return await self.backend.connect_tcp(
+                    address, port, timeout, local_address, socket_options
+                )
+            except httpcore.ConnectError as e:
+                error = e
+        raise error
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        raise httpcore.ConnectError("Job pages can't be fetched over Unix sockets")
+
+    async def sleep(self, seconds):
+        await self.backend.sleep(seconds)
+
+
+class SafeTransport(httpx.AsyncHTTPTransport):
+    """
+    httpx transport whose connections go through a SafeNetworkBackend.
+
+    Raises:
+        RuntimeError: The installed httpx/httpcore no longer keep the pool's network backend
+            where this expects it, so the address checks can't be installed
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # httpx has no option for httpcore's network backend, so wrap the one its pool built.
+        # Those are private attributes: refuse to start rather than silently skip the checks
+        pool = getattr(self, "_pool", None)
+        backend = getattr(pool, "_network_backend", None)
+        if not isinstance(backend, httpcore.AsyncNetworkBackend):
+            raise RuntimeError(
+                f"httpx {httpx.__version__} / httpcore {httpcore.__version__} don't expose the "
+                "connection pool's network backend, so job page addresses can't be checked"
+            )
+        pool._network_backend = SafeNetworkBackend(backend)
+
+
+class CachedPage:
+    """A downloaded job page with the validators to revalidate it"""
+
+    def __init__(self, body, etag=None, last_modified=None):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def __len__(self):
+        # TTLCache sizes entries by len()
+        return len(self.body)
+
+
+class JobPageFetcher:
+    """
+    Downloads job postings over one pooled HTTP client, created once per process.
+
+    Connections are kept alive and use HTTP/2 where the site and the h2 package allow.
+    Every fetch has connect and read timeouts plus an overall deadline, follows at most
+    max_redirects redirects and streams the body, giving up once the decoded page passes
+    max_bytes (so a compressed bomb can't blow up memory either). Pages served with an
+    ETag or Last-Modified header are kept in an LRU, and the next fetch of the same URL
+    is a conditional GET that reuses the kept copy on 304 Not Modified.
+
+    Each address a job site resolves to is checked against validate_url_safety's rules
+    before connecting, redirects included. With a proxy the proxy resolves names, so only
+    the link itself is checked (by form validation). allow_private_addresses turns the
+    check off for tests against a local server.
+    """
+
+    def __init__(
+        self,
+        max_bytes=Config.JOB_FETCH_MAX_BYTES,
+        proxy=Config.JOB_FETCH_PROXY,
+        http2=Config.JOB_FETCH_HTTP2,
+        cache_max_entries=Config.JOB_FETCH_CACHE_MAX_ENTRIES,
+        cache_max_bytes=Config.JOB_FETCH_CACHE_MAX_BYTES,
+        cache_ttl_seconds=Config.JOB_FETCH_CACHE_TTL_SECONDS,
+        allow_private_addresses=False,
+    ):
+        self.max_bytes = max_bytes
+        if http2 and not HTTP2_AVAILABLE:
+            log("-> h2 is not installed; job pages are fetched over HTTP/1.1", level="warning")
+        transport_options = {
+            "http2": http2 and HTTP2_AVAILABLE,
+            "limits": httpx.Limits(
+                max_connections=Config.JOB_FETCH_MAX_CONNECTIONS,
+                max_keepalive_connections=Config.JOB_FETCH_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=Config.JOB_FETCH_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+        }
+        if proxy:
+            transport = httpx.AsyncHTTPTransport(proxy=proxy, **transport_options)
+        elif allow_private_addresses:
+            transport = httpx.AsyncHTTPTransport(**transport_options)
+        else:
+            transport = SafeTransport(**transport_options)
+        self.client = httpx.AsyncClient(
+            transport=transport,
+            headers=JOB_FETCH_HEADERS,
+            timeout=httpx.Timeout(
+                Config.JOB_FETCH_READ_TIMEOUT_SECONDS,
+                connect=Config.JOB_FETCH_CONNECT_TIMEOUT_SECONDS,
+            ),
+            follow_redirects=True,
+            max_redirects=Config.JOB_FETCH_MAX_REDIRECTS,
+            trust_env=False,
+        )
+        self.pages = TTLCache(cache_max_entries, cache_ttl_seconds, max_bytes=cache_max_bytes)
+        self.fetches = 0
+        self.not_modified = 0
+        self.too_large = 0
+        self.blocked = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def fetch(self, url):
+        """
+        Download a job page.
+
+        Returns:
+            bytes: The decoded body (the kept copy when the site answers 304)
+
+        Raises:
+            JobPageTooLargeError: The page is over max_bytes
+            UnsafeAddressError: The site (or a redirect) resolves to a private address
+            httpx.HTTPStatusError: The site answered with an error status
+            httpx.TransportError, TimeoutError: The connection failed or timed out
+        """
+        self.fetches += 1
+        # Keyed by the exact URL requested, not normalize_job_url's form: links that only
+        # normalise alike can still be different resources, and validators only hold for
+        # the one they came from
+        key = url
+        cached = self.pages.get(key)
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        try:
+            async with asyncio.timeout(Config.JOB_FETCH_TIMEOUT_SECONDS):
+                async with self.client.stream("GET", url, headers=headers) as response:
+                    if cached is not None:
+                        record_cache_lookup("job_page", response.status_code == 304)
+                    if response.status_code == 304 and cached is not None:
+                        self.not_modified += 1
+                        # Renew the kept copy's TTL
+                        self.pages.set(key, cached)
+                        return cached.body
+                    response.raise_for_status()
+                    body = await self._read_body(response)
+        except UnsafeAddressError:
+            self.blocked += 1
+            raise
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self.pages.set(key, CachedPage(body, etag, last_modified))
+        else:
+            self.pages.delete(key)
+        return body
+
+    async def _read_body(self, response):
+        """Read a streamed body, giving up as soon as it passes max_bytes"""
+        declared = response.headers.get("Content-Length", "")
+        if declared.isdigit() and int(declared) > self.max_bytes:
+            self.too_large += 1
+            raise JobPageTooLargeError(f"The job page is larger than {self.max_bytes} bytes")
+        body = bytearray()
+        async for chunk in response.aiter_bytes():
+            body += chunk
+            if len(body) > self.max_bytes:
+                self.too_large += 1
+                raise JobPageTooLargeError(f"The job page is larger than {self.max_bytes} bytes")
+        return bytes(body)
+
+    def stats(self):
+        return {
+            "fetches": self.fetches,
+            "not_modified": self.not_modified,
+            "too_large": self.too_large,
+            "blocked": self.blocked,
+            "cached_pages": len(self.pages),
+            "cached_bytes": self.pages.total_bytes,
+        }
+
+    async def close(self):
+        await self.client.aclose()
@@ -0,0 +1,484 @@
+import html
+import json
+import re
+
+from config import Config
+from helpers.document_executor_helper import extract_page_text
+from helpers.lazy_import_helper import lazy_import
+from helpers.prompt_budget_helper import is_heading, split_lines, trim_job_text
+from helpers.trace_helper import log
+
+lxml_html = lazy_import("lxml.html")
+
+
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "ul", "ol", "li", "dl", "dt", "dd", "table", "tr",
+    "td", "th", "blockquote", "pre", "br", "h1", "h2", "h3", "h4", "h5", "h6",
+}
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+SKIP_TAGS = {
+    "script", "style", "noscript", "template", "svg", "nav", "header", "footer", "form", "button",
+}
+HEADING_MAX_CHARS = 60
+
+# Heading -> kind of section, first match wins; "skip" sections say nothing about the
+# company or the role and are left out, like the Gemini summary leaves them out
+SECTION_HEADINGS = (
+    ("skip", re.compile(
+        r"benefits|perks|compensation|salary|pay range|what we offer|why you'll love"
+        r"|equal (employment )?opportunity|\beeo\b|how to apply|application process"
+        r"|accommodation|privacy|disclaimer",
+    )),
+    ("responsibilities", re.compile(
+        r"responsibilit|duties|what you('ll| will)( be)? do|day[- ]to[- ]day|in this role"
+        r"|your impact|you will|the work\b",
+    )),
+    ("qualifications", re.compile(
+        r"qualification|requirement|what you('ll| will)? bring|looking for|who you are|about you"
+        r"|you have|you bring|skills|experience|nice to have|bonus|preferred|must have",
+    )),
+    ("role", re.compile(
+        r"about (the|this) (role|position|job|opportunity)|^the (role|position|opportunity)"
+        r"|role overview|job description|^overview|^summary|^position",
+    )),
+    ("company", re.compile(
+        r"^about (us|the company)|who we are|^our (mission|story|company|values|culture|team)"
+        r"|^the team|why (join|work)|life at|^company",
+    )),
+)
+ROLE_KINDS = ("role", "responsibilities", "qualifications")
+# Role text a page needs before it is trusted in full without Gemini's summary
+MIN_ROLE_CHARS = 600
+TITLE_SEPARATORS = re.compile(r"\s+(?:[-–—|·•:@]|at)\s+")
+CAREERS_SUFFIX = re.compile(r"\s+(careers|jobs|job board|hiring)$", re.IGNORECASE)
+
+
+def clean_text(text):
+    """Text with runs of whitespace collapsed, or None if nothing is left"""
+    text = " ".join((text or "").split())
+    return text or None
+
+
+def has_class(name):
+    """XPath condition for elements with the CSS class `name` (lxml needs cssselect for CSS)"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def by_class(name):
+    """XPath of the elements with the CSS class `name`"""
+    return f"//*[{has_class(name)}]"
+
+
+def first_text(document, xpath):
+    """Text of the first element (or attribute) an XPath finds"""
+    for match in document.xpath(xpath):
+        text = clean_text(match if isinstance(match, str) else match.text_content())
+        if text:
+            return text
+    return None
+
+
+def is_bold_block(element):
+    """A block whose text is all in <strong>/<b>, like "<p><strong>About the role</strong></p>" """
+    text = clean_text(element.text_content())
+    bold = clean_text(" ".join(child.text_content() for child in element.iter("strong", "b")))
+    return text is not None and text == bold
+
+
+def html_lines(root):
+    """
+    Lines of text of an HTML element, one per block, as (text, is_heading) pairs.
+
+    List items start with "- ". Headings are <h1>-<h6> and short blocks that are all bold
+    or end with a colon.
+    """
+    lines = []
+    buffer = []
+
+    def flush(element=None):
+        text = clean_text("".join(buffer))
+        buffer.clear()
+        if not text:
+            return
+        tag = element.tag if element is not None else None
+        if tag == "li":
+            lines.append((f"- {text}", False))
+            return
+        heading = tag in HEADING_TAGS or (
+            len(text) <= HEADING_MAX_CHARS
+            and tag in BLOCK_TAGS
+            and (text.endswith(":") or is_bold_block(element))
+        )
+        lines.append((text, heading))
+
+    def walk(element):
+        tag = element.tag if isinstance(element.tag, str) else None
+        if tag in SKIP_TAGS or tag is None:
+            return
+        block = tag in BLOCK_TAGS
+        if block:
+            flush()
+        buffer.append(element.text or "")
+        for child in element:
+            walk(child)
+            buffer.append(child.tail or "")
+        if block:
+            # Only a block without nested blocks can be a heading or a list item
+            nested = any(child.tag in BLOCK_TAGS for child in element.iterdescendants(tag="*"))
+            flush(element if tag == "li" or not nested else None)
+
+    walk(root)
+    flush()
+    return lines
+
+
+def text_lines(text):
+    """Lines of plain text (e.g. trafilatura's output) as (text, is_heading) pairs"""
+    lines = []
+    for line in split_lines(text):
+        if line.startswith(("* ", "• ")):
+            line = "- " + line[2:]
+        lines.append((line, is_heading(line) and not line.startswith("- ")))
+    return lines
+
+
+def fragment_lines(fragment):
+    """Lines of a JSON-LD description, which may be HTML, escaped HTML or plain text"""
+    if "&lt;" in fragment:
+        fragment = html.unescape(fragment)
+    if "<" not in fragment:
+        return text_lines(fragment)
+    return html_lines(lxml_html.fragment_fromstring(fragment, create_parent="div"))
+
+
+def classify_heading(heading, company=None):
+    text = heading.strip(" :#*_").casefold()
+    for kind, pattern in SECTION_HEADINGS:
+        if pattern.search(text):
+            return kind
+    if company and company.casefold() in text:
+        return "company"
+    return "role"
+
+
+def group_sections(lines, company=None):
+    """
+    Split lines into sections at their headings.
+
+    Returns:
+        list: [kind, heading, lines] for each section with text; text before the first
+            heading is about the company if it names it and about the role otherwise
+    """
+    sections = []
+    current = [None, None, []]
+    for text, heading in lines:
+        if heading:
+            sections.append(current)
+            current = [classify_heading(text, company), text.rstrip(":"), []]
+        else:
+            current[2].append(text)
+    sections.append(current)
+
+    grouped = [section for section in sections if section[2]]
+    for section in grouped:
+        if section[0] is None:
+            mentions_company = company and company.casefold() in " ".join(section[2]).casefold()
+            section[0] = "company" if mentions_company else "role"
+    return grouped
+
+
+def company_from_title(page_title, job_title):
+    """
+    Company name from a page title such as "Acme - Senior Engineer" or "Senior Engineer at Acme".
+
+    Only trusted when the job title is one side of the separator, so the other side is known
+    to be the company.
+    """
+    if not page_title or not job_title:
+        return None
+    parts = [part.strip() for part in TITLE_SEPARATORS.split(page_title)]
+    if len(parts) != 2 or job_title.casefold() not in [part.casefold() for part in parts]:
+        return None
+    company = parts[1] if parts[0].casefold() == job_title.casefold() else parts[0]
+    return clean_text(CAREERS_SUFFIX.sub("", company))
+
+
+class ParsedJobPosting:
+    """
+    Job details read from a page without a model: title, company, location and sections.
+
+    `source` says which parser found them ("json_ld", "greenhouse", "lever", "workday" or
+    "headings"). The parsers collect (text, is_heading) lines; group() splits them into
+    sections once the company name is known. `confidence` (0-1) says how complete the
+    details are: a title, a company name, enough role text and recognised
+    responsibility/qualification sections each add to it. A company name guessed from
+    og:site_name (`company_guessed`) doesn't count, since on a job board that is the
+    board's name.
+    """
+
+    def __init__(
+        self, source, title=None, company=None, location=None, employment_type=None, lines=()
+    ):
+        self.source = source
+        self.title = title
+        self.company = company
+        self.location = location
+        self.employment_type = employment_type
+        self.lines = list(lines)
+        self.sections = []
+        self.company_guessed = False
+
+    def group(self):
+        self.sections = group_sections(self.lines, self.company)
+
+    @property
+    def confidence(self):
+        role_chars = sum(
+            len(line) for kind, _, lines in self.sections if kind in ROLE_KINDS for line in lines
+        )
+        structured = any(
+            kind in ("responsibilities", "qualifications") for kind, _, _ in self.sections
+        )
+        return round(
+            0.25 * bool(self.title)
+            + 0.3 * bool(self.company and not self.company_guessed)
+            + 0.25 * min(1.0, role_chars / MIN_ROLE_CHARS)
+            + 0.2 * structured,
+            2,
+        )
+
+    def job_details(self):
+        """
+        The details in the shape of the Gemini summary, trimmed like one.
+
+        Returns:
+            str: "COMPANY INFORMATION" and "ROLE INFORMATION" sections
+        """
+        company_lines = [f"Name: {self.company}"] if self.company else []
+        role_lines = [
+            f"{label}: {value}"
+            for label, value in (
+                ("Title", self.title),
+                ("Location", self.location),
+                ("Employment type", self.employment_type),
+            )
+            if value
+        ]
+        for kind, heading, lines in self.sections:
+            if kind == "skip":
+                continue
+            target = company_lines if kind == "company" else role_lines
+            if heading:
+                target.append(f"{heading}:")
+            target.extend(lines)
+        details = "\n".join(
+            ["COMPANY INFORMATION", *company_lines, "", "ROLE INFORMATION", *role_lines]
+        )
+        return trim_job_text(details, Config.JOB_PAGE_TOKEN_BUDGET)
+
+
+def find_job_postings(data):
+    """schema.org JobPosting objects anywhere in a JSON-LD document (including @graph)"""
+    if isinstance(data, list):
+        for item in data:
+            yield from find_job_postings(item)
+    elif isinstance(data, dict):
+        types = data.get("@type")
+        if "JobPosting" in (types if isinstance(types, list) else [types]):
+            yield data
+        for key in ("@graph", "mainEntity"):
+            yield from find_job_postings(data.get(key))
+
+
+def json_ld_name(value):
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if isinstance(value, dict):
+        value = value.get("name")
+    return clean_text(value) if isinstance(value, str) else None
+
+
+def json_ld_location(posting):
+    if posting.get("jobLocationType") == "TELECOMMUTE":
+        return "Remote"
+    locations = posting.get("jobLocation")
+    places = []
+    for location in locations if isinstance(locations, list) else [locations]:
+        address = location.get("address") if isinstance(location, dict) else None
+        if isinstance(address, dict):
+            parts = [
+                json_ld_name(address.get(key))
+                for key in ("addressLocality", "addressRegion", "addressCountry")
+            ]
+            place = ", ".join(part for part in parts if part)
+        else:
+            place = json_ld_name(address)
+        if place and place not in places:
+            places.append(place)
+    return "; ".join(places) or None
+
+
+def parse_json_ld(document):
+    for script in document.xpath("//script[contains(@type, 'ld+json')]"):
+        try:
+            # Some sites wrap the JSON in an HTML comment
+            text = (script.text or "").strip().removeprefix("<!--").removesuffix("-->")
+            data = json.loads(text, strict=False)
+        except ValueError:
+            continue
+        for posting in find_job_postings(data):
+            lines = []
+            description = posting.get("description")
+            if isinstance(description, str):
+                lines.extend(fragment_lines(description))
+            for key, heading in (
+                ("responsibilities", "Responsibilities"),
+                ("qualifications", "Qualifications"),
+                ("skills", "Skills"),
+                ("experienceRequirements", "Experience"),
+            ):
+                value = posting.get(key)
+                if isinstance(value, str) and value.strip():
+                    lines.append((heading, True))
+                    lines.extend(fragment_lines(value))
+            employment_type = posting.get("employmentType")
+            if isinstance(employment_type, list):
+                employment_type = ", ".join(str(value) for value in employment_type)
+            if isinstance(employment_type, str):
+                # schema.org values such as "FULL_TIME"
+                employment_type = employment_type.replace("_", " ").capitalize()
+            return ParsedJobPosting(
+                "json_ld",
+                title=json_ld_name(posting.get("title")),
+                company=json_ld_name(posting.get("hiringOrganization")),
+                location=json_ld_location(posting),
+                employment_type=json_ld_name(employment_type),
+                lines=lines,
+            )
+    return None
+
+
+def parse_greenhouse(document):
+    content = document.xpath("//*[@id='content'] | " + by_class("job__description"))
+    title = first_text(document, by_class("app-title") + " | " + by_class("job__title") + "//h1")
+    if not content or not title:
+        return None
+    company = first_text(document, by_class("company-name"))
+    if company and company.casefold().startswith("at "):
+        company = company[3:].strip()
+    return ParsedJobPosting(
+        "greenhouse",
+        title=title,
+        company=company,
+        location=first_text(
+            document, "//*[@id='header']" + by_class("location") + " | " + by_class("job__location")
+        ),
+        lines=html_lines(content[0]),
+    )
+
+
+def parse_lever(document):
+    title = first_text(document, by_class("posting-headline") + "/h2")
+    sections = document.xpath(f"//*[{has_class('section')} and {has_class('page-centered')}]")
+    if not title or not sections:
+        return None
+    categories = by_class("posting-categories")
+    return ParsedJobPosting(
+        "lever",
+        title=title,
+        location=first_text(document, categories + by_class("location")),
+        employment_type=first_text(document, categories + by_class("commitment")),
+        lines=[line for section in sections for line in html_lines(section)],
+    )
+
+
+def parse_workday(document):
+    content = document.xpath("//*[@data-automation-id='jobPostingDescription']")
+    title = first_text(document, "//*[@data-automation-id='jobPostingHeader']")
+    if not content or not title:
+        return None
+    return ParsedJobPosting(
+        "workday",
+        title=title,
+        location=first_text(document, "//*[@data-automation-id='locations']//dd"),
+        employment_type=first_text(document, "//*[@data-automation-id='time']//dd"),
+        lines=html_lines(content[0]),
+    )
+
+
+def parse_headings(document, extracted_text):
+    """Any other page: the main text trafilatura found, split at lines that look like headings"""
+    if not extracted_text:
+        return None
+    title = first_text(document, "//h1") if document is not None else None
+    return ParsedJobPosting("headings", title=title, lines=text_lines(extracted_text))
+
+
+def parse_job_posting(downloaded, extracted_text=None):
+    """
+    Read job details from a job page without Gemini.
+
+    Tries schema.org JobPosting JSON-LD, then Greenhouse, Lever and Workday page layouts,
+    then headings in the page's main text, and returns the most complete result. Company
+    names missing from the page body are taken from the page title, or as a last resort
+    from og:site_name (which then doesn't add to the confidence).
+
+    Args:
+        downloaded: The page's HTML
+        extracted_text: Main text of the page from trafilatura, for the headings fallback
+
+    Returns:
+        ParsedJobPosting: The most confident result, or None if nothing was found
+    """
+    try:
+        document = lxml_html.document_fromstring(downloaded)
+    except (ValueError, lxml_html.etree.ParserError):
+        document = None
+
+    candidates = []
+    if document is not None:
+        for parse in (parse_json_ld, parse_greenhouse, parse_lever, parse_workday):
+            candidate = parse(document)
+            if candidate is not None:
+                candidates.append(candidate)
+    fallback = parse_headings(document, extracted_text)
+    if fallback is not None:
+        candidates.append(fallback)
+    if not candidates:
+        return None
+
+    site_name, page_titles = None, []
+    if document is not None:
+        site_name = first_text(document, "//meta[@property='og:site_name']/@content")
+        page_titles = [
+            first_text(document, "//meta[@property='og:title']/@content"),
+            first_text(document, "//title"),
+        ]
+    for candidate in candidates:
+        if not candidate.company:
+            from_titles = (company_from_title(title, candidate.title) for title in page_titles)
+            candidate.company = next(filter(None, from_titles), None)
+        if not candidate.company and site_name:
+            candidate.company = site_name
+            candidate.company_guessed = True
+        candidate.group()
+    return max(candidates, key=lambda candidate: candidate.confidence)
+
+
+def extract_job_page(downloaded):
+    """
+    Main text of a job page and the job details parsed from it locally.
+
+    Runs in a DocumentExecutor worker, so it must stay a picklable module-level function.
+
+    Returns:
+        tuple: (trafilatura text or None, ParsedJobPosting or None)
+    """
+    extracted_text = extract_page_text(downloaded)
+    try:
+        posting = parse_job_posting(downloaded, extracted_text)
+    except Exception as e:
+        # A page the parser trips over is still summarised by Gemini
+        log(f"WARNING: Could not parse the job page locally: {e}", level="warning")
+        posting = None
+    return extracted_text, posting
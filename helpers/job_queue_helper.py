@@ -0,0 +1,390 @@
+import asyncio
+import itertools
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+from config import Config
+from helpers.retry_helper import GeminiUnavailableError
+from helpers.sqlite_helper import connect_sqlite, immediate_transaction
+from helpers.trace_helper import TRACE_ID, log
+
+
+# Priority names accepted from clients; lower values run first
+JOB_PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# How often wait() re-reads a job that another worker process runs
+OTHER_PROCESS_POLL_SECONDS = 0.5
+
+
+class JobQueueFullError(GeminiUnavailableError):
+    """Raised when a job is submitted while the queue already holds max_queue jobs"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"The job queue is full; retry after {retry_after}s", retry_after)
+
+
+class QueuedJob:
+    """One submitted job; payload is dropped once the job has finished"""
+
+    def __init__(self, job_id, payload, priority, trace_id=None, created_at=None):
+        self.id = job_id
+        self.payload = payload
+        self.priority = priority
+        self.trace_id = trace_id
+        self.status = QUEUED
+        self.created_at = created_at or time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.status_code = None
+        self.content = None
+        self.done = asyncio.Event()
+
+    def to_dict(self):
+        """Public view of the job, as returned by GET /jobs/{id}"""
+        job = {"job_id": self.id, "status": self.status, "created_at": self.created_at}
+        if self.started_at is not None:
+            job["started_at"] = self.started_at
+        if self.finished_at is not None:
+            job["finished_at"] = self.finished_at
+            job["status_code"] = self.status_code
+            job.update(self.content)
+        return job
+
+
+class JobQueueStore:
+    """
+    SQLite copy of the queue so jobs survive a restart and any worker process can report them.
+
+    Each job row names the queue (owner) that runs it, and each queue refreshes a heartbeat
+    row while it is alive. Unfinished jobs whose owner has stopped, or whose heartbeat has
+    gone stale, can be claimed by another queue. Calls block, so async code should run
+    them in a thread.
+    """
+
+    COLUMNS = (
+        "id, status, priority, trace_id, payload, status_code, content, "
+        "created_at, started_at, finished_at"
+    )
+
+    def __init__(self, path, owner):
+        self.owner = owner
+        self.lock = threading.Lock()
+        self.connection = connect_sqlite(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS queued_jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, priority INTEGER NOT NULL, "
+            "trace_id TEXT, payload TEXT, status_code INTEGER, content TEXT, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL, owner TEXT)"
+        )
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(queued_jobs)")]
+        if "owner" not in columns:
+            # Tables created before jobs had owners; their jobs are claimed by the first queue
+            self.connection.execute("ALTER TABLE queued_jobs ADD COLUMN owner TEXT")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS queue_owners (id TEXT PRIMARY KEY, heartbeat_at REAL NOT NULL)"
+        )
+        self.connection.commit()
+
+    def save(self, job):
+        with self.lock:
+            self.connection.execute(
+                f"INSERT OR REPLACE INTO queued_jobs ({self.COLUMNS}, owner) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job.id,
+                    job.status,
+                    job.priority,
+                    job.trace_id,
+                    json.dumps(job.payload) if job.payload is not None else None,
+                    job.status_code,
+                    json.dumps(job.content) if job.content is not None else None,
+                    job.created_at,
+                    job.started_at,
+                    job.finished_at,
+                    self.owner,
+                ),
+            )
+            self.connection.commit()
+
+    @staticmethod
+    def _job(row):
+        (job_id, status, priority, trace_id, payload, status_code, content,
+         created_at, started_at, finished_at) = row
+        job = QueuedJob(job_id, json.loads(payload) if payload else None, priority, trace_id, created_at)
+        job.status = status
+        job.started_at = started_at
+        job.finished_at = finished_at
+        job.status_code = status_code
+        job.content = json.loads(content) if content else None
+        if finished_at is not None:
+            job.done.set()
+        return job
+
+    def get(self, job_id, finished_after):
+        """A job as last saved by whichever queue runs it, unless its result has expired"""
+        with self.lock:
+            row = self.connection.execute(
+                f"SELECT {self.COLUMNS} FROM queued_jobs "
+                "WHERE id = ? AND (finished_at IS NULL OR finished_at > ?)",
+                (job_id, finished_after),
+            ).fetchone()
+        return self._job(row) if row is not None else None
+
+    def heartbeat(self):
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO queue_owners (id, heartbeat_at) VALUES (?, ?)",
+                (self.owner, time.time()),
+            )
+            self.connection.commit()
+
+    def claim_orphans(self, stale_before):
+        """
+        Take over the unfinished jobs of queues that have stopped or gone quiet.
+
+        Returns:
+            list: The claimed jobs, reset to queued (a job that was running starts over)
+        """
+        with self.lock, immediate_transaction(self.connection):
+            self.connection.execute(
+                "DELETE FROM queue_owners WHERE heartbeat_at <= ? AND id != ?",
+                (stale_before, self.owner),
+            )
+            rows = self.connection.execute(
+                f"SELECT {self.COLUMNS} FROM queued_jobs WHERE finished_at IS NULL "
+                "AND (owner IS NULL OR (owner != ? AND owner NOT IN (SELECT id FROM queue_owners))) "
+                "ORDER BY created_at",
+                (self.owner,),
+            ).fetchall()
+            self.connection.executemany(
+                "UPDATE queued_jobs SET owner = ?, status = ?, started_at = NULL WHERE id = ?",
+                [(self.owner, QUEUED, row[0]) for row in rows],
+            )
+        jobs = [self._job(row) for row in rows]
+        for job in jobs:
+            job.status = QUEUED
+            job.started_at = None
+        return jobs
+
+    def delete_finished_before(self, timestamp):
+        with self.lock:
+            self.connection.execute(
+                "DELETE FROM queued_jobs WHERE finished_at IS NOT NULL AND finished_at <= ?",
+                (timestamp,),
+            )
+            self.connection.commit()
+
+    def close(self):
+        """Stop heartbeating, so other queues claim this one's unfinished jobs straight away"""
+        with self.lock:
+            self.connection.execute("DELETE FROM queue_owners WHERE id = ?", (self.owner,))
+            self.connection.commit()
+            self.connection.close()
+
+
+class JobQueueHelper:
+    """
+    Bounded priority queue of background jobs run by a fixed pool of worker tasks.
+
+    submit() stores a JSON-serialisable payload and returns a job ID straight away; the
+    workers pass payloads to the handler given to start(), which returns an HTTP status
+    and JSON body that are kept for result_ttl_seconds. The worker count is a hard cap on
+    how many jobs run at once, whatever the number of clients. With a db_path, jobs are
+    also written to SQLite, and unfinished jobs (including ones that were running) of a
+    queue that has stopped, or stopped heartbeating, are queued again by a live one. Worker
+    processes sharing the file see each other's jobs: a job runs in the process it was
+    submitted to, and get()/wait() in any process report it.
+    """
+
+    def __init__(
+        self,
+        workers=Config.JOB_QUEUE_WORKERS,
+        max_queue=Config.JOB_QUEUE_MAX_SIZE,
+        result_ttl_seconds=Config.JOB_QUEUE_RESULT_TTL_SECONDS,
+        db_path=Config.JOB_QUEUE_DB_PATH,
+        heartbeat_seconds=Config.JOB_QUEUE_HEARTBEAT_SECONDS,
+    ):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.result_ttl_seconds = result_ttl_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.store = JobQueueStore(db_path, owner=uuid.uuid4().hex) if db_path else None
+        self.jobs = {}
+        self.queue = asyncio.PriorityQueue()
+        # Tie-breaker so jobs of equal priority run in submission order
+        self.sequence = itertools.count()
+        self.tasks = []
+        self.handler = None
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    async def start(self, handler):
+        """
+        Args:
+            handler: async callable taking a job payload and returning (status_code, content)
+        """
+        self.handler = handler
+        if self.store is not None:
+            await asyncio.to_thread(self.store.heartbeat)
+            await self._claim_orphans()
+            self.tasks.append(asyncio.create_task(self._heartbeat()))
+        self.tasks += [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        if self.store is not None:
+            self.store.close()
+
+    async def _claim_orphans(self):
+        jobs = await asyncio.to_thread(
+            self.store.claim_orphans, time.time() - 3 * self.heartbeat_seconds
+        )
+        for job in jobs:
+            self.jobs[job.id] = job
+            self._enqueue(job)
+        if jobs:
+            log(f"-> Re-queued {len(jobs)} unfinished background jobs")
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                await asyncio.to_thread(self.store.heartbeat)
+                await self._claim_orphans()
+            except sqlite3.Error as e:
+                log(f"-> Background job heartbeat failed: {e}", level="warning")
+
+    def _enqueue(self, job):
+        self.queue.put_nowait((job.priority, next(self.sequence), job.id))
+
+    async def _save(self, job):
+        if self.store is not None:
+            await asyncio.to_thread(self.store.save, job)
+
+    async def submit(self, payload, priority=JOB_PRIORITIES["normal"]):
+        """
+        Queue a job and return it.
+
+        Raises:
+            JobQueueFullError: max_queue jobs are already waiting
+        """
+        await self.purge_expired()
+        if self.queue.qsize() >= self.max_queue:
+            self.rejected += 1
+            raise JobQueueFullError(retry_after=Config.GEMINI_RETRY_AFTER_SECONDS)
+        job = QueuedJob(uuid.uuid4().hex, payload, priority, TRACE_ID.get())
+        self.jobs[job.id] = job
+        await self._save(job)
+        self._enqueue(job)
+        return job
+
+    async def get(self, job_id):
+        """A job of this queue, or (with a store) of another process's queue; None if unknown or expired"""
+        job = self.jobs.get(job_id)
+        if job is None and self.store is not None:
+            return await asyncio.to_thread(
+                self.store.get, job_id, time.time() - self.result_ttl_seconds
+            )
+        if job is not None and self._expired(job, time.time()):
+            return None
+        return job
+
+    async def wait(self, job, timeout):
+        """
+        Wait up to timeout seconds for a job to finish.
+
+        Returns:
+            QueuedJob: The job, as it stands once it has finished or the time is up
+        """
+        if job.id in self.jobs:
+            try:
+                await asyncio.wait_for(job.done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            return job
+        # Run by another process: poll the store
+        deadline = time.monotonic() + timeout
+        while not job.done.is_set() and time.monotonic() < deadline:
+            await asyncio.sleep(min(OTHER_PROCESS_POLL_SECONDS, deadline - time.monotonic()))
+            job = await self.get(job.id) or job
+        return job
+
+    def position(self, job):
+        """How many of this process's queued jobs start first (None once it has started)"""
+        if job.status != QUEUED or job.id not in self.jobs:
+            return None
+        key = (job.priority, job.created_at)
+        return sum(
+            1
+            for other in self.jobs.values()
+            if other.status == QUEUED and (other.priority, other.created_at) < key
+        )
+
+    def _expired(self, job, now):
+        return job.finished_at is not None and job.finished_at + self.result_ttl_seconds <= now
+
+    async def purge_expired(self):
+        now = time.time()
+        for job_id in [job_id for job_id, job in self.jobs.items() if self._expired(job, now)]:
+            del self.jobs[job_id]
+        if self.store is not None:
+            await asyncio.to_thread(self.store.delete_finished_before, now - self.result_ttl_seconds)
+
+    async def _worker(self):
+        while True:
+            _, _, job_id = await self.queue.get()
+            job = self.jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                continue
+            await self._run(job)
+
+    async def _run(self, job):
+        token = TRACE_ID.set(job.trace_id)
+        try:
+            job.status = RUNNING
+            job.started_at = time.time()
+            await self._save(job)
+            try:
+                job.status_code, job.content = await self.handler(job.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log(f"ERROR in background job {job.id}: {e}", level="error")
+                job.status_code, job.content = 500, {
+                    "success": False,
+                    "error": f"An error occurred: {str(e)}",
+                }
+            job.status = SUCCEEDED if job.status_code == 200 else FAILED
+            job.finished_at = time.time()
+            job.payload = None
+            if job.status == SUCCEEDED:
+                self.completed += 1
+            else:
+                self.failed += 1
+            await self._save(job)
+            job.done.set()
+        finally:
+            TRACE_ID.reset(token)
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "queued": self.queue.qsize(),
+            "running": sum(1 for job in self.jobs.values() if job.status == RUNNING),
+            "retained": len(self.jobs),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
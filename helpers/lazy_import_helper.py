@@ -0,0 +1,54 @@
+import importlib
+
+from helpers.trace_helper import log
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is only imported the first time one of its attributes is used.
+
+    google.genai, trafilatura and the document parsers take most of the app's import time,
+    and a cold-started machine should be serving pages before they are needed. Code keeps
+    using the module as usual (types.Part(...), except genai_errors.APIError); the warm-up
+    task imports them in the background so requests rarely pay for it.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attribute):
+        return getattr(self.load(), attribute)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    """Module `name`, imported on first use"""
+    return LazyModule(name)
+
+
+def preload_modules(*names):
+    """Import modules now (e.g. from a warm-up thread) so their first use doesn't pay for it
+
+    Preloading is only a head start: a module that fails to import is logged and skipped,
+    and the code that uses it gets the error when it needs it.
+
+    Returns:
+        list: Names of the modules that failed to import
+    """
+    failed = []
+    for name in names:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            log(f"-> Could not preload {name}: {e}", level="warning", module=name)
+            failed.append(name)
+    return failed
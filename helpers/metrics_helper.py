@@ -0,0 +1,278 @@
+import copy
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+# Seconds; spans a cached lookup (ms) up to a slow Gemini rewrite (minutes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+# Per-request {stage: seconds}, set by TraceMiddleware so the request log can list where time went
+STAGE_TIMINGS = ContextVar("stage_timings", default=None)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base for metrics with a fixed set of label names, one series per label combination"""
+
+    type_name = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(labels[name] for name in self.labelnames)
+
+    def snapshot(self):
+        """This process's series as JSON-serialisable [labels, value] pairs"""
+        with self.lock:
+            return [[[str(label) for label in key], value] for key, value in self.series.items()]
+
+    def merged_series(self, others=()):
+        """This process's series with those of other processes' snapshots added in"""
+        with self.lock:
+            merged = {
+                tuple(str(label) for label in key): copy.deepcopy(value)
+                for key, value in self.series.items()
+            }
+        for series in others:
+            for key, value in series:
+                key = tuple(key)
+                merged[key] = self._add(merged[key], value) if key in merged else value
+        return merged
+
+    def _add(self, value, other):
+        return value + other
+
+    def render(self, others=()):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for key, value in sorted(self.merged_series(others).items()):
+            lines.extend(self._render_series(list(zip(self.labelnames, key)), value))
+        return lines
+
+    def _render_series(self, labels, value):
+        return [f"{self.name}{format_labels(labels)} {format_value(value)}"]
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.series[key] = self.series.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type_name = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.series[key] = value
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = (*sorted(buckets), math.inf)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                # Per-bucket (non-cumulative) counts, then sum
+                series = self.series[key] = [[0] * len(self.buckets), 0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+
+    def _add(self, value, other):
+        if len(other[0]) != len(value[0]):
+            # Another process with different buckets (e.g. mid-deploy); can't be added up
+            return value
+        return [[a + b for a, b in zip(value[0], other[0])], value[1] + other[1]]
+
+    def _render_series(self, labels, value):
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            bucket_labels = format_labels([*labels, ("le", format_value(bound))])
+            lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+        lines.append(f"{self.name}_sum{format_labels(labels)} {format_value(total)}")
+        lines.append(f"{self.name}_count{format_labels(labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self):
+        """Counter and histogram series of this process, for other processes to add to theirs"""
+        return {
+            name: metric.snapshot()
+            for name, metric in self.metrics.items()
+            if not isinstance(metric, Gauge)
+        }
+
+    def render(self, snapshots=()):
+        """
+        All metrics in the Prometheus text exposition format.
+
+        Args:
+            snapshots: snapshot()s of other worker processes, whose counters and histograms
+                are added to this process's; gauges are this process's alone
+        """
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render([snapshot.get(metric.name, []) for snapshot in snapshots]))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "cover_letter_request_seconds",
+    "Time from receiving a request to sending the last byte of its response",
+    ["method", "route", "status"],
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "cover_letter_stage_seconds",
+    "Time spent in each stage of handling a request",
+    ["stage", "outcome"],
+)
+CACHE_LOOKUPS = REGISTRY.counter(
+    "cover_letter_cache_lookups_total",
+    "Cache lookups by cache and result",
+    ["cache", "result"],
+)
+RETRIES = REGISTRY.counter(
+    "cover_letter_retries_total",
+    "Retried attempts of upstream calls",
+    ["step"],
+)
+UPSTREAM_ERRORS = REGISTRY.counter(
+    "cover_letter_upstream_errors_total",
+    "Failed attempts of upstream calls by HTTP status (or error type when there is none)",
+    ["step", "code"],
+)
+GEMINI_TOKENS = REGISTRY.counter(
+    "cover_letter_gemini_tokens_total",
+    "Gemini tokens reported in response usage metadata",
+    ["call", "type"],
+)
+JOB_DETAILS = REGISTRY.counter(
+    "cover_letter_job_details_total",
+    "Job details taken from job pages, by the local parser that read them or gemini_summary",
+    ["source"],
+)
+# Mirrors of the /stats counters, refreshed whenever /metrics is scraped
+STATS = REGISTRY.gauge(
+    "cover_letter_stats",
+    "Values reported by /stats, flattened into a component and a field",
+    ["component", "field"],
+)
+
+# usage_metadata attribute -> "type" label of GEMINI_TOKENS
+TOKEN_USAGE_FIELDS = {
+    "prompt_token_count": "prompt",
+    "cached_content_token_count": "cached",
+    "candidates_token_count": "output",
+    "thoughts_token_count": "thoughts",
+}
+
+
+def record_stage(stage, seconds, outcome="ok"):
+    """Add a stage's duration to STAGE_SECONDS and to the current request's stage timings"""
+    STAGE_SECONDS.observe(seconds, stage=stage, outcome=outcome)
+    timings = STAGE_TIMINGS.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def time_stage(stage):
+    """Time the wrapped block as a stage; its outcome is "error" if the block raises"""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        record_stage(stage, time.perf_counter() - start, outcome)
+
+
+def record_cache_lookup(cache, hit):
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def record_job_details(source):
+    JOB_DETAILS.inc(source=source)
+
+
+def record_token_usage(call, usage_metadata):
+    """Add the token counts of a Gemini response (or its final stream chunk) to GEMINI_TOKENS"""
+    if usage_metadata is None:
+        return
+    for field, token_type in TOKEN_USAGE_FIELDS.items():
+        count = getattr(usage_metadata, field, None)
+        if count:
+            GEMINI_TOKENS.inc(count, call=call, type=token_type)
+
+
+def record_stats(stats, component=""):
+    """Copy the numeric values of a /stats payload into the STATS gauge"""
+    for field, value in stats.items():
+        if isinstance(value, dict):
+            record_stats(value, f"{component}.{field}" if component else field)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            STATS.set(value, component=component or field, field=field)
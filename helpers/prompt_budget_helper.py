@@ -0,0 +1,260 @@
+import math
+import re
+
+from config import Config
+from helpers.trace_helper import log
+
+
+# Lines that only carry legal or application-form boilerplate
+BOILERPLATE_PATTERN = re.compile(
+    r"equal (employment )?opportunity|without regard to|reasonable accommodation|e-verify"
+    r"|affirmative action|protected veteran|applicant privacy|privacy (policy|notice)"
+    r"|cookie (policy|settings|preferences|notice)|(use|accept( all)?) cookies"
+    r"|pay transparency|background check|by (submitting|clicking|applying)"
+    r"|all rights reserved",
+    re.IGNORECASE,
+)
+# Headings of sections that say nothing about the company or the role; the whole heading
+# must match, so "Benefits Administrator" is still a job title
+BENEFITS_HEADING_PATTERN = re.compile(
+    r"^((our )?(benefits|perks)( (and|&) (benefits|perks))?"
+    r"|(compensation|salary|pay) (and|&) benefits"
+    r"|what we offer( you)?|why you'll love (it here|working here|us))\s*:?$",
+    re.IGNORECASE,
+)
+HEADING_MAX_CHARS = 60
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+KEYWORD_PATTERN = re.compile(r"\w[\w+#]*")
+# Words too common to say whether a resume or letter paragraph fits a job
+KEYWORD_STOPWORDS = frozenset(
+    "and are for from has have our that the their this was were will with you your".split()
+)
+
+
+def estimate_tokens(text):
+    """
+    Local approximation of the Gemini token count of a text.
+
+    Gemini averages about four characters per token on English prose; counting exactly
+    would need a count_tokens round trip per prompt. Config.PROMPT_CHARS_PER_TOKEN tunes
+    the ratio.
+    """
+    if not text:
+        return 0
+    return math.ceil(len(text) / Config.PROMPT_CHARS_PER_TOKEN)
+
+
+def is_heading(line):
+    """Short line that isn't a bullet or a sentence, e.g. "What you'll do" or "Benefits:" """
+    return (
+        len(line) <= HEADING_MAX_CHARS
+        and not line.startswith(("- ", "* ", "• "))
+        and not line.endswith((".", ","))
+    )
+
+
+def split_lines(text):
+    """Non-empty lines with surrounding whitespace removed"""
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def drop_duplicates(lines):
+    """Drop lines repeated earlier in the text (ignoring case and spacing)"""
+    seen = set()
+    kept = []
+    for line in lines:
+        key = " ".join(line.casefold().split())
+        if key in seen:
+            continue
+        seen.add(key)
+        kept.append(line)
+    return kept
+
+
+def drop_boilerplate(lines):
+    """
+    Drop legal boilerplate and whole benefits/compensation sections of a scraped job page.
+
+    A benefits section runs until the next heading. Only meant for page text: the rules
+    would also hit descriptions the user typed. If nothing would be left, the lines are
+    returned as they are.
+    """
+    kept = []
+    in_benefits = False
+    for line in lines:
+        if is_heading(line):
+            # Job pages and parsed postings mark headings up as markdown ("**Benefits:**")
+            in_benefits = bool(BENEFITS_HEADING_PATTERN.match(line.strip("#*_ ")))
+            if in_benefits:
+                continue
+        if in_benefits or BOILERPLATE_PATTERN.search(line):
+            continue
+        kept.append(line)
+    return kept or lines
+
+
+def truncate_lines(lines, max_tokens):
+    """Keep the leading lines that fit in max_tokens, cutting the first one that doesn't at a word"""
+    kept = []
+    used = 0
+    for line in lines:
+        # +1 for the newline joining it to the previous line
+        tokens = estimate_tokens(line) + 1
+        if used + tokens <= max_tokens:
+            kept.append(line)
+            used += tokens
+            continue
+        remaining_chars = int((max_tokens - used - 1) * Config.PROMPT_CHARS_PER_TOKEN)
+        if remaining_chars > 0:
+            cut = line[:remaining_chars].rsplit(" ", 1)[0]
+            if cut:
+                kept.append(cut + " …")
+        break
+    return kept
+
+
+def trim_job_text(text, max_tokens):
+    """Scraped job page text without duplicates and boilerplate, fitted to max_tokens"""
+    lines = drop_boilerplate(drop_duplicates(split_lines(text)))
+    return "\n".join(truncate_lines(lines, max_tokens))
+
+
+def split_paragraphs(text):
+    """Blank-line separated paragraphs as lists of lines, repeated lines dropped across the text"""
+    seen = set()
+    paragraphs = []
+    for block in PARAGRAPH_BREAK.split(text):
+        lines = []
+        for line in split_lines(block):
+            key = " ".join(line.casefold().split())
+            if key not in seen:
+                seen.add(key)
+                lines.append(line)
+        if lines:
+            paragraphs.append(lines)
+    return paragraphs
+
+
+def keywords(text):
+    """Distinct lowercase words of three or more characters, without the commonest ones"""
+    return {
+        word
+        for word in KEYWORD_PATTERN.findall(text.casefold())
+        if len(word) >= 3 and word not in KEYWORD_STOPWORDS
+    }
+
+
+def paragraph_tokens(lines):
+    # +1 per line for its newline, and +1 for the blank line before the paragraph
+    return sum(estimate_tokens(line) + 1 for line in lines) + 1
+
+
+def trim_document_text(text, max_tokens, relevant_to=None):
+    """
+    A resume, cover letter or job details fitted to max_tokens on paragraph boundaries.
+
+    Repeated lines are dropped and whole paragraphs are kept, in their original order and
+    with their blank lines, so a letter keeps its shape. The first and last paragraphs
+    (a letter's salutation and sign-off, a resume's header) go in first, then the rest by
+    how many of relevant_to's words they share, or in order without relevant_to. Only when
+    no whole paragraph fits is the first of them cut at a line boundary instead. Text
+    already within max_tokens is returned unchanged.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    paragraphs = split_paragraphs(text)
+    order = list(range(len(paragraphs)))
+    if relevant_to:
+        wanted = keywords(relevant_to)
+        scores = [len(wanted & keywords(" ".join(lines))) for lines in paragraphs]
+        order.sort(key=lambda index: -scores[index])
+    if len(order) > 1:
+        last = len(paragraphs) - 1
+        order = [0, last] + [index for index in order if index not in (0, last)]
+
+    kept = {}
+    used = 0
+    for index in order:
+        tokens = paragraph_tokens(paragraphs[index])
+        if used + tokens <= max_tokens:
+            kept[index] = paragraphs[index]
+            used += tokens
+    if not kept and paragraphs:
+        kept[order[0]] = truncate_lines(paragraphs[order[0]], max_tokens)
+    return "\n\n".join("\n".join(kept[index]) for index in sorted(kept))
+
+
+def allocate_budget(token_counts, budget):
+    """
+    Split a token budget between inputs.
+
+    Inputs smaller than an equal share keep everything they need and the rest of the
+    budget is shared among the larger ones, so one long input is trimmed before a
+    short one is touched.
+
+    Args:
+        token_counts: {name: estimated tokens}
+        budget: Total tokens for all inputs
+
+    Returns:
+        dict: {name: tokens allowed}
+    """
+    allowances = {}
+    remaining = budget
+    ordered = sorted(token_counts.items(), key=lambda item: item[1])
+    for index, (name, tokens) in enumerate(ordered):
+        share = remaining // (len(ordered) - index)
+        allowances[name] = min(tokens, share)
+        remaining -= allowances[name]
+    return allowances
+
+
+def fit_job_page(text, max_tokens=Config.JOB_PAGE_TOKEN_BUDGET):
+    """Extracted job page text trimmed for the summary prompt, logging the token counts"""
+    before = estimate_tokens(text)
+    trimmed = trim_job_text(text, max_tokens)
+    log(
+        f"-> Job page prompt: ~{before:,} -> ~{estimate_tokens(trimmed):,} tokens",
+        tokens_before=before,
+        tokens_after=estimate_tokens(trimmed),
+    )
+    return trimmed
+
+
+def fit_rewrite_inputs(inputs, budget=Config.REWRITE_INPUT_TOKEN_BUDGET):
+    """
+    Fit the text inputs of a rewrite prompt into a shared token budget.
+
+    Nothing is changed while everything together fits. Otherwise each input over its
+    allowance (see allocate_budget) is cut down to it by trim_document_text, the resume
+    and cover letter keeping the paragraphs closest to the job details. The job details
+    get no boilerplate rules here: scraped pages already lost their boilerplate in
+    fit_job_page or the local parser, and descriptions the user typed keep every word.
+
+    Args:
+        inputs: {"job_details": ..., "resume": ..., "cover_letter": ...}; inputs sent as
+            files Gemini reads itself (e.g. scanned PDFs) are left out
+        budget: Total tokens for the inputs
+
+    Returns:
+        dict: The inputs, trimmed
+    """
+    fitted = dict(inputs)
+    counts = {name: estimate_tokens(text) for name, text in fitted.items()}
+    before = sum(counts.values())
+
+    if before > budget:
+        allowances = allocate_budget(counts, budget)
+        for name, text in fitted.items():
+            if counts[name] > allowances[name]:
+                relevant_to = inputs.get("job_details") if name != "job_details" else None
+                fitted[name] = trim_document_text(text, allowances[name], relevant_to)
+
+    after = sum(estimate_tokens(text) for text in fitted.values())
+    log(
+        f"-> Rewrite prompt inputs: ~{before:,} -> ~{after:,} tokens",
+        tokens_before=before,
+        tokens_after=after,
+        **{f"{name}_tokens": estimate_tokens(text) for name, text in fitted.items()},
+    )
+    return fitted
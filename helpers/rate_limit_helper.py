@@ -0,0 +1,375 @@
+import asyncio
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+
+from config import Config
+from helpers.retry_helper import GeminiUnavailableError
+from helpers.sqlite_helper import connect_sqlite, immediate_transaction
+from helpers.trace_helper import log
+
+
+class GeminiOverloadedError(GeminiUnavailableError):
+    """Raised when a Gemini call can't get a slot before its queue deadline"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Gemini is at capacity; retry after {retry_after}s", retry_after)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency governor shared by every Gemini call in the process.
+
+    The concurrency limit grows by roughly one slot per limit's worth of successful calls
+    and halves when Gemini answers 429/503, so all requests back off together instead of
+    each retrying on its own. Calls over the limit wait in a FIFO queue; when the queue is
+    full, or the estimated wait would exceed the queue deadline, or the deadline passes
+    while waiting, the call fails fast with GeminiOverloadedError.
+    """
+
+    def __init__(
+        self,
+        is_overload_error,
+        initial_limit=Config.GEMINI_CONCURRENCY_INITIAL,
+        min_limit=Config.GEMINI_CONCURRENCY_MIN,
+        max_limit=Config.GEMINI_CONCURRENCY_MAX,
+        max_queue=Config.GEMINI_MAX_QUEUE,
+        queue_timeout_seconds=Config.GEMINI_QUEUE_TIMEOUT_SECONDS,
+    ):
+        """
+        Args:
+            is_overload_error: Predicate telling whether a failed call was a 429/503
+        """
+        self.is_overload_error = is_overload_error
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.in_flight = 0
+        self.waiters = deque()
+        # Exponentially weighted average call latency, used to estimate queue waits
+        self.average_latency = 5.0
+        self.last_decrease = 0.0
+        self.rejected = 0
+        self.overloads = 0
+
+    @property
+    def current_limit(self):
+        return max(self.min_limit, int(self.limit))
+
+    def estimated_wait(self):
+        """Seconds a new caller would likely wait for a slot"""
+        return (len(self.waiters) + 1) / self.current_limit * self.average_latency
+
+    def _reject(self, wait):
+        self.rejected += 1
+        return GeminiOverloadedError(retry_after=max(1, math.ceil(wait)))
+
+    async def acquire(self):
+        if self.in_flight < self.current_limit and not self.waiters:
+            self.in_flight += 1
+            return
+
+        estimated_wait = self.estimated_wait()
+        if len(self.waiters) >= self.max_queue or estimated_wait > self.queue_timeout_seconds:
+            raise self._reject(estimated_wait)
+
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.append(future)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout_seconds)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # A slot was handed over at the last moment
+                if isinstance(e, asyncio.TimeoutError):
+                    return
+                self._return_slot()
+                raise
+            future.cancel()
+            self.waiters.remove(future)
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._reject(self.estimated_wait()) from None
+            raise
+
+    def release(self, overloaded=False, latency=None):
+        """Return a slot and adapt the limit to the outcome of the call"""
+        if overloaded:
+            self.overloads += 1
+        self._adapt(overloaded, latency, time.monotonic())
+        self._return_slot()
+
+    def _adapt(self, overloaded, latency, now):
+        if overloaded:
+            # Halve at most once per average call latency so one burst of 429s counts once
+            if now - self.last_decrease > self.average_latency:
+                self.limit = max(self.min_limit, self.limit / 2)
+                self.last_decrease = now
+                log(f"-> Gemini overloaded, concurrency limit lowered to {self.current_limit}", level="warning")
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        if latency is not None:
+            self.average_latency = 0.8 * self.average_latency + 0.2 * latency
+
+    def _return_slot(self):
+        self.in_flight -= 1
+        while self.waiters and self.in_flight < self.current_limit:
+            future = self.waiters.popleft()
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    async def run(self, coroutine_factory):
+        """Await coroutine_factory() while holding a slot"""
+        await self.acquire()
+        start = time.monotonic()
+        try:
+            result = await coroutine_factory()
+        except Exception as e:
+            self.release(overloaded=self.is_overload_error(e))
+            raise
+        except BaseException:
+            # Cancelled: free the slot without treating it as a success or an overload
+            self._return_slot()
+            raise
+        self.release(latency=time.monotonic() - start)
+        return result
+
+    def stats(self):
+        return {
+            "limit": self.current_limit,
+            "in_flight": self.in_flight,
+            "queue_depth": len(self.waiters),
+            "average_latency_seconds": round(self.average_latency, 3),
+            "rejected": self.rejected,
+            "overloads": self.overloads,
+        }
+
+    async def close(self):
+        """Release anything held outside the process (nothing, for a process-local limiter)"""
+
+
+class SharedLimiterStore:
+    """
+    SQLite state of a concurrency limiter shared by several worker processes.
+
+    One row holds the AIMD state (limit, average latency, time of the last decrease) and
+    each slot in use is a lease row naming the process that holds it. Leases expire after
+    lease_seconds, and leases of processes that no longer exist are dropped when a store
+    is opened, so a worker that crashed mid-call can't keep its slots. Calls block, so
+    async code should run them in a thread.
+    """
+
+    def __init__(self, path, name, initial_limit, lease_seconds):
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.lock = threading.Lock()
+        self.connection = connect_sqlite(path)
+        with self.lock, immediate_transaction(self.connection):
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS limiter_state ("
+                "name TEXT PRIMARY KEY, limit_value REAL NOT NULL, "
+                "average_latency REAL NOT NULL, last_decrease REAL NOT NULL)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS limiter_leases ("
+                "id TEXT PRIMARY KEY, name TEXT NOT NULL, pid INTEGER NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self.connection.execute(
+                "INSERT OR IGNORE INTO limiter_state VALUES (?, ?, ?, ?)",
+                (name, float(initial_limit), 5.0, 0.0),
+            )
+            pids = [
+                row[0]
+                for row in self.connection.execute(
+                    "SELECT DISTINCT pid FROM limiter_leases WHERE name = ?", (name,)
+                )
+            ]
+            for pid in pids:
+                if not process_exists(pid):
+                    self.connection.execute(
+                        "DELETE FROM limiter_leases WHERE name = ? AND pid = ?", (name, pid)
+                    )
+
+    def try_acquire(self, lease_id, min_limit):
+        """
+        Take a slot if fewer than the shared limit are in use.
+
+        Returns:
+            tuple: (granted, (limit, average_latency, in_flight)) with the state as it was seen
+        """
+        now = time.time()
+        with self.lock, immediate_transaction(self.connection):
+            self.connection.execute(
+                "DELETE FROM limiter_leases WHERE name = ? AND expires_at <= ?", (self.name, now)
+            )
+            limit, average_latency = self.connection.execute(
+                "SELECT limit_value, average_latency FROM limiter_state WHERE name = ?", (self.name,)
+            ).fetchone()
+            (in_flight,) = self.connection.execute(
+                "SELECT COUNT(*) FROM limiter_leases WHERE name = ?", (self.name,)
+            ).fetchone()
+            granted = in_flight < max(min_limit, int(limit))
+            if granted:
+                self.connection.execute(
+                    "INSERT INTO limiter_leases VALUES (?, ?, ?, ?)",
+                    (lease_id, self.name, os.getpid(), now + self.lease_seconds),
+                )
+                in_flight += 1
+        return granted, (limit, average_latency, in_flight)
+
+    def release(self, lease_id, adapt=None):
+        """
+        Give a slot back.
+
+        Args:
+            adapt: Optional callable taking (limit, average_latency, last_decrease) and
+                returning them updated, applied to the shared state in the same transaction
+
+        Returns:
+            int: Slots still in use by all processes
+        """
+        with self.lock, immediate_transaction(self.connection):
+            self.connection.execute("DELETE FROM limiter_leases WHERE id = ?", (lease_id,))
+            if adapt is not None:
+                state = self.connection.execute(
+                    "SELECT limit_value, average_latency, last_decrease FROM limiter_state "
+                    "WHERE name = ?",
+                    (self.name,),
+                ).fetchone()
+                self.connection.execute(
+                    "UPDATE limiter_state SET limit_value = ?, average_latency = ?, last_decrease = ? "
+                    "WHERE name = ?",
+                    (*adapt(*state), self.name),
+                )
+            (in_flight,) = self.connection.execute(
+                "SELECT COUNT(*) FROM limiter_leases WHERE name = ?", (self.name,)
+            ).fetchone()
+        return in_flight
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+def process_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class SharedConcurrencyLimiter(AdaptiveConcurrencyLimiter):
+    """
+    AdaptiveConcurrencyLimiter whose limit and slots are shared by every worker process.
+
+    Slots are leases in a SharedLimiterStore and the AIMD state lives in the same file,
+    so max_limit caps Gemini calls across all workers and a 429 seen by one worker lowers
+    the limit for all of them. A slot freed by another worker can't wake a waiting call,
+    so waiting calls poll for one every poll_seconds; they still fail fast when the queue
+    is full or the estimated wait is past the queue deadline, but are served in no
+    particular order. Slots are given back from a thread after the call, so release()
+    stays synchronous.
+    """
+
+    def __init__(
+        self,
+        is_overload_error,
+        db_path,
+        poll_seconds=Config.GEMINI_SHARED_POLL_SECONDS,
+        lease_seconds=Config.GEMINI_SHARED_LEASE_SECONDS,
+        name="gemini",
+        **kwargs,
+    ):
+        super().__init__(is_overload_error, **kwargs)
+        self.poll_seconds = poll_seconds
+        self.store = SharedLimiterStore(db_path, name, self.limit, lease_seconds)
+        # Lease IDs held by this process's calls; any of them can be given back on release
+        self.leases = []
+        self.shared_in_flight = 0
+        self.pending_releases = set()
+
+    async def acquire(self):
+        estimated_wait = self.estimated_wait()
+        if len(self.waiters) >= self.max_queue or estimated_wait > self.queue_timeout_seconds:
+            raise self._reject(estimated_wait)
+
+        deadline = time.monotonic() + self.queue_timeout_seconds
+        waiter = object()
+        self.waiters.append(waiter)
+        try:
+            while not await self._try_acquire():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise self._reject(self.estimated_wait())
+                # Jitter so waiting workers don't all retry in lockstep
+                await asyncio.sleep(min(remaining, self.poll_seconds * random.uniform(0.5, 1.5)))
+        finally:
+            self.waiters.remove(waiter)
+
+    async def _try_acquire(self):
+        lease_id = uuid.uuid4().hex
+        attempt = asyncio.ensure_future(
+            asyncio.to_thread(self.store.try_acquire, lease_id, self.min_limit)
+        )
+        try:
+            granted, state = await asyncio.shield(attempt)
+        except asyncio.CancelledError:
+            # The lease may still be granted after the caller has gone; give it straight back
+            attempt.add_done_callback(lambda _: self._release_abandoned(attempt, lease_id))
+            raise
+        self.limit, self.average_latency, self.shared_in_flight = state
+        if granted:
+            self.leases.append(lease_id)
+            self.in_flight += 1
+        return granted
+
+    def _release_abandoned(self, attempt, lease_id):
+        if not attempt.cancelled() and attempt.exception() is None and attempt.result()[0]:
+            self._release_in_background(lease_id)
+
+    def release(self, overloaded=False, latency=None):
+        """Return a slot and adapt the shared limit to the outcome of the call"""
+        if overloaded:
+            self.overloads += 1
+
+        def adapt(limit, average_latency, last_decrease):
+            # Wall-clock time, since the last decrease may have been made by another process
+            self.limit, self.average_latency, self.last_decrease = limit, average_latency, last_decrease
+            self._adapt(overloaded, latency, time.time())
+            return self.limit, self.average_latency, self.last_decrease
+
+        self._return_slot(adapt)
+
+    def _return_slot(self, adapt=None):
+        self.in_flight -= 1
+        self._release_in_background(self.leases.pop(), adapt)
+
+    def _release_in_background(self, lease_id, adapt=None):
+        release = asyncio.ensure_future(asyncio.to_thread(self.store.release, lease_id, adapt))
+        self.pending_releases.add(release)
+        release.add_done_callback(self._release_done)
+
+    def _release_done(self, release):
+        self.pending_releases.discard(release)
+        if release.cancelled():
+            return
+        if release.exception() is not None:
+            # The lease stays taken until it expires
+            log(f"-> Could not release a shared Gemini slot: {release.exception()}", level="warning")
+        else:
+            self.shared_in_flight = release.result()
+
+    def stats(self):
+        return {**super().stats(), "shared_in_flight": self.shared_in_flight}
+
+    async def close(self):
+        await asyncio.gather(*self.pending_releases, return_exceptions=True)
+        self.store.close()
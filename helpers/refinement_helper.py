@@ -0,0 +1,91 @@
+import re
+
+from config import Config
+
+
+GENERATION_NOT_FOUND_ERROR = (
+    "Your previous cover letter has expired. Please generate it again or send its text."
+)
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+# "[P2]" on its own line before each paragraph of the refinement prompt and its answer
+PARAGRAPH_MARKER = re.compile(r"^\s*\[P(\d+)\]\s*", re.MULTILINE)
+
+
+def split_paragraphs(letter):
+    """Paragraphs of a letter, split at blank lines; the salutation and sign-off count too"""
+    return [paragraph.strip() for paragraph in PARAGRAPH_BREAK.split(letter) if paragraph.strip()]
+
+
+def join_paragraphs(paragraphs):
+    return "\n\n".join(paragraphs)
+
+
+def number_paragraphs(paragraphs):
+    """The letter with a [P<index>] marker line before each paragraph, for the prompt"""
+    return "\n\n".join(f"[P{index}]\n{paragraph}" for index, paragraph in enumerate(paragraphs))
+
+
+def parse_paragraph_indices(value, paragraph_count):
+    """
+    Validate the paragraphs a client asked to regenerate.
+
+    Args:
+        value: Comma-separated 0-based indices, e.g. "0,2"
+        paragraph_count: Number of paragraphs in the letter
+
+    Returns:
+        tuple: (sorted unique indices, None), or (None, error message)
+    """
+    try:
+        indices = sorted({int(part) for part in value.split(",") if part.strip()})
+    except ValueError:
+        return None, "Please list the paragraphs to regenerate as comma-separated numbers like 0,2."
+    if not indices:
+        return None, "Please choose at least one paragraph to regenerate."
+    if indices[0] < 0 or indices[-1] >= paragraph_count:
+        return None, (
+            f"Paragraph numbers must be between 0 and {paragraph_count - 1}; "
+            f"the letter has {paragraph_count} paragraphs."
+        )
+    if len(indices) == paragraph_count:
+        return None, "To regenerate every paragraph, generate a new cover letter instead."
+    return indices, None
+
+
+def validate_guidance(guidance):
+    """Check the optional guidance for a refinement; returns an error message or None"""
+    if guidance and len(guidance) > Config.REFINE_MAX_GUIDANCE_CHARS:
+        return (
+            f"Guidance exceeds maximum length of {Config.REFINE_MAX_GUIDANCE_CHARS:,} characters."
+        )
+    return None
+
+
+def parse_refined_paragraphs(text, indices):
+    """
+    Paragraphs from a refinement answer, found by their [P<index>] markers.
+
+    Returns:
+        dict: {index: paragraph} for each requested index (other markers are ignored)
+
+    Raises:
+        ValueError: A requested paragraph is missing or empty
+    """
+    pieces = PARAGRAPH_MARKER.split(text)
+    # [text before the first marker, index, paragraph, index, paragraph, ...]
+    # Blank lines inside a paragraph would shift the numbering of the ones after it
+    found = {
+        int(index): PARAGRAPH_BREAK.sub("\n", paragraph.strip())
+        for index, paragraph in zip(pieces[1::2], pieces[2::2])
+    }
+    missing = [index for index in indices if not found.get(index)]
+    if missing:
+        raise ValueError(f"The answer has no paragraph {', '.join(map(str, missing))}")
+    return {index: found[index] for index in indices}
+
+
+def splice_paragraphs(paragraphs, replacements):
+    """The letter with the paragraphs at the keys of replacements swapped for their values"""
+    return join_paragraphs(
+        [replacements.get(index, paragraph) for index, paragraph in enumerate(paragraphs)]
+    )
@@ -0,0 +1,63 @@
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+
+from config import Config
+from helpers.trace_helper import log
+
+
+REQUEST_TOO_LARGE_ERROR = (
+    f"The request is too large. Uploads are limited to "
+    f"{Config.MAX_FILE_SIZE_BYTES // (1024 * 1024)}MB per file."
+)
+
+
+class RequestTooLargeError(HTTPException):
+    """Raised while reading a request body once it passes the size limit"""
+
+    def __init__(self):
+        super().__init__(status_code=413, detail=REQUEST_TOO_LARGE_ERROR)
+
+
+def request_too_large_response():
+    return JSONResponse(status_code=413, content={"success": False, "error": REQUEST_TOO_LARGE_ERROR})
+
+
+class RequestSizeLimitMiddleware:
+    """
+    ASGI middleware that stops oversized request bodies before multipart parsing buffers them.
+
+    A declared Content-Length over the limit is answered with 413 without reading the body.
+    Bodies without one (chunked uploads) are counted as they arrive, and RequestTooLargeError
+    is raised from receive() as soon as they pass the limit; FastAPI re-raises it from form
+    parsing so the app's exception handler turns it into the same 413.
+    """
+
+    def __init__(self, app, max_bytes=Config.MAX_REQUEST_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            log(f"-> Rejected request declaring {int(content_length):,} bytes", level="warning")
+            await request_too_large_response()(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    log(f"-> Rejected request body after {received:,} bytes", level="warning")
+                    raise RequestTooLargeError()
+            return message
+
+        await self.app(scope, limited_receive, send)
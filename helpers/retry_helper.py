@@ -0,0 +1,172 @@
+import asyncio
+import random
+import time
+from collections import deque
+
+import httpx
+
+from config import Config
+from helpers.lazy_import_helper import lazy_import
+from helpers.metrics_helper import RETRIES, UPSTREAM_ERRORS
+from helpers.trace_helper import log
+
+google_exceptions = lazy_import("google.api_core.exceptions")
+genai_errors = lazy_import("google.genai.errors")
+
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class CoverLetterError(Exception):
+    """Base class for failures surfaced by the job-fetch and rewrite pipeline"""
+
+
+class JobFetchError(CoverLetterError):
+    """The job posting could not be downloaded or didn't contain enough text"""
+
+
+class GeminiUnavailableError(CoverLetterError):
+    """Gemini is rate limiting or overloaded; the client should retry later"""
+
+    def __init__(self, message="Gemini is unavailable", retry_after=Config.GEMINI_RETRY_AFTER_SECONDS):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class GeminiRequestError(CoverLetterError):
+    """Gemini rejected the request or failed in a way retrying won't fix"""
+
+
+class LatencyBudgetExceededError(CoverLetterError):
+    """The request ran out of its latency budget before a step could finish"""
+
+
+def status_code_of(error):
+    """HTTP status carried by an error from genai, google-api-core or httpx, if any"""
+    if isinstance(error, genai_errors.APIError):
+        return error.code
+    if isinstance(error, google_exceptions.GoogleAPICallError):
+        return error.code
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code
+    return None
+
+
+def is_retryable(error):
+    """True for transient failures: timeouts, connection errors, 408/429/5xx responses"""
+    if isinstance(error, (httpx.TransportError, asyncio.TimeoutError)):
+        return True
+    if isinstance(error, (google_exceptions.ServiceUnavailable, google_exceptions.ResourceExhausted)):
+        return True
+    return status_code_of(error) in RETRYABLE_STATUS_CODES
+
+
+class LatencyBudget:
+    """Wall-clock allowance shared by every step and retry of one request"""
+
+    def __init__(self, seconds=Config.REQUEST_LATENCY_BUDGET_SECONDS):
+        self.deadline = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.deadline - time.monotonic())
+
+    def check(self, step):
+        if self.remaining() <= 0:
+            raise LatencyBudgetExceededError(f"Latency budget exhausted before {step}")
+
+
+class LatencyTracker:
+    """Rolling window of call latencies, used to decide when to hedge"""
+
+    def __init__(self, window=200):
+        self.samples = deque(maxlen=window)
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+
+    def percentile(self, fraction):
+        if len(self.samples) < Config.GEMINI_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def _hedged(coroutine_factory, hedge_after):
+    """
+    Run coroutine_factory(); if it hasn't finished after hedge_after seconds, start a
+    second copy and return whichever succeeds first.
+    """
+    tasks = {asyncio.create_task(coroutine_factory())}
+    # Every wait is inside the try, so a caller's timeout cancelling this coroutine also
+    # cancels the calls it started instead of leaving them holding limiter slots
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+        if done:
+            return done.pop().result()
+
+        log(f"-> No response after {hedge_after:.1f}s, sending a hedged request", level="warning")
+        tasks.add(asyncio.create_task(coroutine_factory()))
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+            if not tasks:
+                # Both attempts failed; surface the most recent error
+                raise done.pop().exception()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def call_with_retry(coroutine_factory, step, budget=None, tracker=None):
+    """
+    Await coroutine_factory() with jittered exponential backoff inside a latency budget.
+
+    Only transient errors (see is_retryable) are retried, and a retry is only attempted
+    when its backoff still fits in the budget. When tracker has enough samples and
+    hedging is enabled, a duplicate request is sent once an attempt runs past the p95.
+
+    Raises:
+        LatencyBudgetExceededError: The budget ran out
+        The last error from coroutine_factory once retries are exhausted or it isn't retryable
+    """
+    budget = budget or LatencyBudget()
+    attempt = 0
+    while True:
+        attempt += 1
+        budget.check(step)
+        start = time.monotonic()
+
+        hedge_after = tracker.percentile(0.95) if tracker and Config.GEMINI_HEDGE_ENABLED else None
+        if hedge_after is not None:
+            call = _hedged(coroutine_factory, hedge_after)
+        else:
+            call = coroutine_factory()
+
+        try:
+            result = await asyncio.wait_for(call, budget.remaining())
+        except asyncio.TimeoutError:
+            raise LatencyBudgetExceededError(f"Latency budget exhausted during {step}") from None
+        except Exception as e:
+            UPSTREAM_ERRORS.inc(step=step, code=str(status_code_of(e) or type(e).__name__))
+            if not is_retryable(e) or attempt >= Config.GEMINI_RETRY_MAX_ATTEMPTS:
+                raise
+            # Full jitter keeps concurrent requests from retrying in lockstep
+            backoff = random.uniform(
+                0,
+                min(
+                    Config.GEMINI_RETRY_MAX_BACKOFF_SECONDS,
+                    Config.GEMINI_RETRY_INITIAL_BACKOFF_SECONDS * 2 ** (attempt - 1),
+                ),
+            )
+            if backoff >= budget.remaining():
+                raise
+            log(f"-> {step} failed ({e}); retry {attempt} in {backoff:.1f}s", level="warning")
+            RETRIES.inc(step=step)
+            await asyncio.sleep(backoff)
+            continue
+
+        if tracker is not None:
+            tracker.record(time.monotonic() - start)
+        return result
@@ -0,0 +1,57 @@
+import os
+import tempfile
+
+import uvicorn
+
+from config import Config
+from helpers.trace_helper import log
+
+
+def available_cpus():
+    """CPUs this process may run on (its affinity mask where the platform reports one)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def worker_count():
+    """Config.WEB_CONCURRENCY, or one worker per available CPU when it is 0"""
+    return Config.WEB_CONCURRENCY or available_cpus()
+
+
+def run_server(app="main:app"):
+    """
+    Serve the app with uvicorn, in several worker processes when there is more than one CPU.
+
+    Workers share one listening socket, and uvicorn's supervisor restarts any that die.
+    Sending it SIGHUP replaces the workers one at a time: since uvicorn 0.51 each new worker
+    has to report ready before the old one is sent SIGTERM, and a stopping worker gets
+    Config.GRACEFUL_SHUTDOWN_SECONDS to finish its in-flight requests, so code can be
+    reloaded without dropping requests. SIGTTIN and SIGTTOU add and remove a worker. With a
+    single worker uvicorn serves the app in this process without a supervisor, so SIGHUP
+    doesn't reload anything; set WEB_CONCURRENCY to 2 or more for that.
+
+    With more than one worker, the caches, stored documents, background jobs and the Gemini
+    concurrency limit are shared through the SQLite file at Config.SHARED_STATE_DB_PATH
+    (a file in the temp directory unless set). Workers read their settings from the
+    environment when they start, so the worker count and shared path are passed that way.
+    """
+    workers = worker_count()
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    if workers > 1 and not Config.SHARED_STATE_DB_PATH:
+        os.environ["SHARED_STATE_DB_PATH"] = os.path.join(
+            tempfile.gettempdir(), "cover-letter-tweaker-state.db"
+        )
+    log(
+        f"-> Starting {workers} worker(s) on {Config.HOST}:{Config.PORT}",
+        workers=workers,
+        shared_state=os.environ.get("SHARED_STATE_DB_PATH"),
+    )
+    uvicorn.run(
+        app,
+        host=Config.HOST,
+        port=Config.PORT,
+        workers=workers,
+        timeout_graceful_shutdown=Config.GRACEFUL_SHUTDOWN_SECONDS,
+    )
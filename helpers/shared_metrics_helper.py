@@ -0,0 +1,107 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+from config import Config
+from helpers.metrics_helper import REGISTRY
+from helpers.sqlite_helper import connect_sqlite, immediate_transaction
+from helpers.trace_helper import log
+
+
+class SharedMetricsStore:
+    """
+    SQLite table of the latest metrics snapshot of every worker process.
+
+    Rows of stopped workers are kept, so totals don't drop when a worker is replaced,
+    until they are retention_seconds old. Calls block, so async code should run them in
+    a thread.
+    """
+
+    def __init__(self, path, worker_id, retention_seconds):
+        self.worker_id = worker_id
+        self.retention_seconds = retention_seconds
+        self.lock = threading.Lock()
+        self.connection = connect_sqlite(path)
+        with self.lock, immediate_transaction(self.connection):
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS metric_snapshots ("
+                "worker TEXT PRIMARY KEY, updated_at REAL NOT NULL, data TEXT NOT NULL)"
+            )
+
+    def publish(self, snapshot):
+        now = time.time()
+        with self.lock, immediate_transaction(self.connection):
+            self.connection.execute(
+                "INSERT OR REPLACE INTO metric_snapshots VALUES (?, ?, ?)",
+                (self.worker_id, now, json.dumps(snapshot)),
+            )
+            self.connection.execute(
+                "DELETE FROM metric_snapshots WHERE updated_at < ?",
+                (now - self.retention_seconds,),
+            )
+
+    def other_snapshots(self):
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT data FROM metric_snapshots WHERE worker != ?", (self.worker_id,)
+            ).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+class SharedMetricsHelper:
+    """
+    Metrics added up across the worker processes sharing a SQLite file.
+
+    Each worker publishes its counters and histograms every publish_seconds (and when it
+    stops), and render() adds the other workers' latest snapshots to this worker's live
+    values, so a scrape of any worker returns the totals of all of them. Other workers'
+    values lag by up to publish_seconds. Gauges (the /stats mirror) stay those of the
+    worker that answered.
+    """
+
+    def __init__(
+        self,
+        db_path=Config.METRICS_DB_PATH,
+        publish_seconds=Config.METRICS_PUBLISH_SECONDS,
+        retention_seconds=Config.METRICS_RETENTION_SECONDS,
+        registry=REGISTRY,
+    ):
+        self.registry = registry
+        self.publish_seconds = publish_seconds
+        self.store = SharedMetricsStore(db_path, uuid.uuid4().hex, retention_seconds)
+        self.task = None
+
+    async def start(self):
+        await self.publish()
+        self.task = asyncio.create_task(self._publish_periodically())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+        # Leave this worker's final totals for the others to keep counting
+        await self.publish()
+        self.store.close()
+
+    async def publish(self):
+        try:
+            await asyncio.to_thread(self.store.publish, self.registry.snapshot())
+        except sqlite3.Error as e:
+            log(f"-> Publishing metrics failed: {e}", level="warning")
+
+    async def _publish_periodically(self):
+        while True:
+            await asyncio.sleep(self.publish_seconds)
+            await self.publish()
+
+    async def render(self):
+        """All workers' metrics in the Prometheus text exposition format"""
+        snapshots = await asyncio.to_thread(self.store.other_snapshots)
+        return self.registry.render(snapshots)
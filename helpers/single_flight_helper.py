@@ -0,0 +1,70 @@
+import asyncio
+
+from config import Config
+from helpers.job_cache_helper import TTLCache
+from helpers.trace_helper import log
+
+
+class SingleFlightHelper:
+    """
+    Coalesces concurrent calls that share a key into a single in-flight task.
+
+    The first caller for a key starts the work; identical callers that arrive while it
+    is running await the same task instead of repeating it. Successful results are kept
+    for a short window afterwards, so a retry or double submit that lands just after
+    completion is answered from memory too. If every caller waiting on a task is
+    cancelled, the task is cancelled as well.
+    """
+
+    def __init__(
+        self,
+        result_ttl_seconds=Config.SINGLE_FLIGHT_RESULT_TTL_SECONDS,
+        max_results=Config.SINGLE_FLIGHT_MAX_RESULTS,
+    ):
+        self.in_flight = {}
+        self.waiters = {}
+        self.recent_results = TTLCache(max_results, result_ttl_seconds)
+        self.coalesced = 0
+
+    async def run(self, key, coroutine_factory, should_keep=bool):
+        """
+        Args:
+            key: Hashable identity of the work, e.g. a hash of the normalised inputs
+            coroutine_factory: Zero-argument callable returning the coroutine to run
+            should_keep: Predicate deciding whether a result may be served to later
+                callers during the post-completion window (failures usually shouldn't)
+        """
+        result = self.recent_results.get(key)
+        if result is not None:
+            self.coalesced += 1
+            return result
+
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(coroutine_factory())
+            self.in_flight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done, should_keep))
+        else:
+            self.coalesced += 1
+            log("-> Joining identical in-flight request")
+
+        # Shield the shared task so one caller disconnecting doesn't cancel it for the rest
+        self.waiters[task] = self.waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self.waiters[task] == 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            self.waiters[task] -= 1
+            if not self.waiters[task]:
+                del self.waiters[task]
+
+    def _finish(self, key, task, should_keep):
+        self.in_flight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        result = task.result()
+        if should_keep(result):
+            self.recent_results.set(key, result)
@@ -0,0 +1,38 @@
+import sqlite3
+from contextlib import contextmanager
+
+from config import Config
+
+
+def connect_sqlite(path):
+    """
+    Open a SQLite database that several worker processes can use at once.
+
+    WAL mode lets readers carry on while another process writes, and the busy timeout
+    makes a writer wait for the lock instead of failing straight away. Writes are synced
+    at checkpoints rather than on every commit (synchronous=NORMAL), which is durable
+    enough for caches. Calls block, so async code should run them in a thread.
+    """
+    connection = sqlite3.connect(
+        path, timeout=Config.SQLITE_BUSY_TIMEOUT_SECONDS, check_same_thread=False
+    )
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+@contextmanager
+def immediate_transaction(connection):
+    """
+    Run statements in a transaction that takes the write lock up front.
+
+    A plain transaction only locks on its first write, so two processes reading then
+    writing the same rows could both act on what they read; BEGIN IMMEDIATE serialises them.
+    """
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        yield connection
+    except BaseException:
+        connection.rollback()
+        raise
+    connection.commit()
@@ -0,0 +1,237 @@
+import gzip
+import hashlib
+import importlib.util
+import mimetypes
+import threading
+from pathlib import Path
+
+from starlette.responses import Response
+
+from helpers.trace_helper import log
+
+
+# Brotli variants need the brotli package (installed with httpx[brotli]); without it only gzip is built
+BROTLI_AVAILABLE = importlib.util.find_spec("brotli") is not None
+
+# Fingerprinted URLs change whenever the content does, so browsers may keep them for good
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Pages and unfingerprinted URLs are revalidated with their ETag on every use
+REVALIDATE_CACHE_CONTROL = "no-cache"
+# Below this, compression saves less than the Content-Encoding header costs
+MIN_COMPRESS_BYTES = 256
+DIGEST_CHARS = 12
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+
+def compress_variants(content, content_type):
+    """
+    Precompressed bodies of an asset, at the strongest settings since they are built once.
+
+    Returns:
+        dict: {"br": bytes, "gzip": bytes}, keeping only encodings that make it smaller
+    """
+    if len(content) < MIN_COMPRESS_BYTES or not content_type.startswith(COMPRESSIBLE_TYPES):
+        return {}
+    variants = {}
+    if BROTLI_AVAILABLE:
+        import brotli
+
+        variants["br"] = brotli.compress(content, quality=11)
+    # mtime=0 keeps the bytes identical across restarts and workers
+    variants["gzip"] = gzip.compress(content, compresslevel=9, mtime=0)
+    return {encoding: body for encoding, body in variants.items() if len(body) < len(content)}
+
+
+def preferred_encoding(accept_encoding, available):
+    """
+    Pick the encoding to send from an Accept-Encoding header.
+
+    Args:
+        accept_encoding: Header value, e.g. "gzip, deflate, br;q=0.9"
+        available: Encodings there is a variant for
+
+    Returns:
+        str: "br" or "gzip" when the client accepts one we have (br wins ties), else None
+    """
+    qualities = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in ("br", "gzip"):
+        if encoding not in available:
+            continue
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header names etag (weak comparison, as RFC 9110 asks for GETs)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+class StaticAsset:
+    """One file or rendered page held in memory, with its precompressed variants"""
+
+    def __init__(self, name, content, content_type):
+        self.name = name
+        self.content_type = content_type
+        self.digest = hashlib.sha256(content).hexdigest()[:DIGEST_CHARS]
+        self.variants = {None: content, **compress_variants(content, content_type)}
+        path = Path(name)
+        self.fingerprinted_name = str(path.with_name(f"{path.stem}.{self.digest}{path.suffix}"))
+
+    def etag(self, encoding):
+        # Each encoding is a different representation, so it needs its own strong ETag
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+    def response(self, request_headers, cache_control):
+        """
+        The asset in the best encoding the client accepts, or 304 if it already has that one.
+
+        Args:
+            request_headers: The request's headers
+            cache_control: Cache-Control value to send
+
+        Returns:
+            Response: 200 with the body, or 304 without one
+        """
+        encoding = preferred_encoding(request_headers.get("accept-encoding"), self.variants)
+        headers = {
+            "Cache-Control": cache_control,
+            "ETag": self.etag(encoding),
+            "Vary": "Accept-Encoding",
+        }
+        if etag_matches(request_headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(self.variants[encoding], headers=headers, media_type=self.content_type)
+
+
+def content_type_for(name):
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type == "application/javascript":
+        content_type += "; charset=utf-8"
+    return content_type
+
+
+class StaticAssetsHelper:
+    """
+    Serves a static directory from memory under content-hashed URLs.
+
+    Every file is read, hashed and compressed once (on the first use, or in the lifespan
+    so the first page view doesn't pay for it). Pages that link to the files get their URLs
+    from url(), e.g. /static/script.3f2a9c1d0b7e.js, which can be cached forever; the plain
+    names still work, revalidated on each use, for pages rendered before a deploy. Rendered
+    pages are cached the same way through page().
+
+    Args:
+        directory: Folder of static files
+        url_prefix: Path the files are served under
+        reload: Rebuild when a file changes and re-render pages on every use (for development)
+    """
+
+    def __init__(self, directory, url_prefix="/static", reload=False):
+        self.directory = Path(directory)
+        self.url_prefix = url_prefix
+        self.reload = reload
+        self.assets = None
+        self.pages = {}
+        self.signature = None
+        self.lock = threading.Lock()
+
+    def directory_signature(self):
+        return tuple(
+            (str(path), stat.st_mtime_ns, stat.st_size)
+            for path in sorted(self.directory.rglob("*"))
+            if path.is_file() and (stat := path.stat())
+        )
+
+    def load(self):
+        """Read, fingerprint and compress the directory, unless it is already loaded and unchanged"""
+        with self.lock:
+            if self.assets is not None and not self.reload:
+                return
+            signature = self.directory_signature()
+            if signature == self.signature:
+                return
+            assets = {}
+            for path in sorted(self.directory.rglob("*")):
+                if not path.is_file():
+                    continue
+                name = path.relative_to(self.directory).as_posix()
+                asset = StaticAsset(name, path.read_bytes(), content_type_for(name))
+                assets[name] = asset
+                assets[asset.fingerprinted_name] = asset
+            self.assets = assets
+            self.pages = {}
+            self.signature = signature
+        files = {asset.name: asset for asset in assets.values()}.values()
+        log(
+            f"-> Static assets: {len(files)} files, "
+            f"{sum(len(asset.variants[None]) for asset in files):,} bytes "
+            f"(encodings: {', '.join(['br', 'gzip'] if BROTLI_AVAILABLE else ['gzip'])})",
+            files=len(files),
+        )
+
+    def get(self, name):
+        """The asset served at a plain or fingerprinted name, or None"""
+        self.load()
+        return self.assets.get(name)
+
+    def url(self, name):
+        """Fingerprinted URL of a file in the directory, for use in templates"""
+        asset = self.get(name)
+        if asset is None:
+            raise FileNotFoundError(f"No static file named {name!r} in {self.directory}")
+        return f"{self.url_prefix}/{asset.fingerprinted_name}"
+
+    def response(self, name, request_headers):
+        """
+        Serve a static file: fingerprinted names are immutable, plain names are revalidated.
+
+        Returns:
+            Response: The file, a 304, or a 404 for unknown names
+        """
+        asset = self.get(name)
+        if asset is None:
+            return Response(status_code=404)
+        cache_control = (
+            IMMUTABLE_CACHE_CONTROL if name == asset.fingerprinted_name else REVALIDATE_CACHE_CONTROL
+        )
+        return asset.response(request_headers, cache_control)
+
+    def page(self, name, render):
+        """
+        A rendered page cached with its compressed variants and ETag.
+
+        Args:
+            name: Cache key, e.g. the template name
+            render: Called with no arguments to render the page's HTML; run again only after
+                the static files change (their URLs are in the page) or, with reload, every time
+
+        Returns:
+            StaticAsset: The page
+        """
+        self.load()
+        page = self.pages.get(name)
+        if page is None or self.reload:
+            page = StaticAsset(name, render().encode(), "text/html; charset=utf-8")
+            self.pages[name] = page
+        return page
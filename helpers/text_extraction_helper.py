@@ -0,0 +1,74 @@
+import re
+import unicodedata
+from io import BytesIO
+
+from config import Config
+from helpers.lazy_import_helper import lazy_import
+
+docx = lazy_import("docx")
+pypdf = lazy_import("pypdf")
+
+
+# MIME type -> function turning the file's bytes into text; add formats with @text_extractor
+TEXT_EXTRACTORS = {}
+
+# Types Gemini accepts as inline data, so the original file can be sent when extraction
+# yields too little text (e.g. a scanned PDF that is really a picture)
+BLOB_FALLBACK_MIME_TYPES = {"application/pdf"}
+
+
+def text_extractor(mime_type):
+    def register(extract):
+        TEXT_EXTRACTORS[mime_type] = extract
+        return extract
+
+    return register
+
+
+@text_extractor("text/plain")
+def extract_plain_text(content):
+    return content.decode("utf-8")
+
+
+@text_extractor("application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+def extract_docx_text(content):
+    """Plain text of a DOCX file (Gemini doesn't accept DOCX inline data)"""
+    doc = docx.Document(BytesIO(content))
+    return "\n".join([paragraph.text for paragraph in doc.paragraphs])
+
+
+@text_extractor("application/pdf")
+def extract_pdf_text(content):
+    reader = pypdf.PdfReader(BytesIO(content))
+    if reader.is_encrypted:
+        # Many PDFs are "encrypted" with an empty user password just to set permissions
+        reader.decrypt("")
+    pages = reader.pages[: Config.PDF_MAX_PAGES]
+    return "\n\n".join(page.extract_text() or "" for page in pages)
+
+
+def normalize_text(text):
+    """
+    Normalise extracted text so every format reaches the prompt in the same shape.
+
+    Applies NFKC (folding ligatures such as "ﬁ" that PDFs are full of), unifies line
+    endings, drops control characters and collapses runs of spaces and blank lines.
+    """
+    text = unicodedata.normalize("NFKC", text)
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = re.sub(r"[^\S\n]+", " ", text)
+    text = "".join(
+        char for char in text if char == "\n" or unicodedata.category(char) != "Cc"
+    )
+    text = re.sub(r" *\n *", "\n", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+
+def extract_document_text(content, mime_type):
+    """
+    Normalised text of a document, using the extractor registered for its MIME type.
+
+    Runs in a DocumentExecutor worker, so it must stay a picklable module-level function.
+    """
+    return normalize_text(TEXT_EXTRACTORS[mime_type](content))
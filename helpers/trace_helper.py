@@ -0,0 +1,103 @@
+import json
+import re
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from config import Config
+from helpers.metrics_helper import REQUEST_SECONDS, STAGE_TIMINGS
+
+
+TRACE_ID = ContextVar("trace_id", default=None)
+TRACE_HEADER = "X-Request-ID"
+
+# Incoming request IDs are reused only when they look like an ID, not arbitrary log input
+VALID_TRACE_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+# Routes hit by scrapers, health checks and for static files ("other" is unmatched paths);
+# logging them would drown out the interesting lines. They still get latency samples
+QUIET_ROUTES = {"/metrics", "/healthz", "/healthz/ready", "/static/{path:path}", "other"}
+
+
+def log(message, level="info", **fields):
+    """
+    Write one log line tagged with the current request's trace ID.
+
+    With Config.LOG_FORMAT == "json" (the default) each line is a JSON object with the
+    time, level, trace ID, message and any extra fields; otherwise it's plain text.
+    """
+    trace_id = TRACE_ID.get()
+    if Config.LOG_FORMAT == "json":
+        record = {
+            "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "level": level,
+            "trace_id": trace_id,
+            "message": message,
+            **fields,
+        }
+        print(json.dumps(record, default=str), flush=True)
+        return
+    extra = "".join(f" {key}={value}" for key, value in fields.items())
+    print(f"[{trace_id}] {message}{extra}" if trace_id else f"{message}{extra}", flush=True)
+
+
+class TraceMiddleware:
+    """
+    Give every HTTP request a trace ID and record its latency.
+
+    The ID is taken from an incoming X-Request-ID header when present, otherwise generated;
+    it's returned in the same header and attached to every log line written while handling
+    the request. When the response has been sent, the request's duration goes into
+    REQUEST_SECONDS and a "request finished" line lists the time spent in each stage.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        trace_id = headers.get(TRACE_HEADER.lower().encode(), b"").decode("latin-1")
+        if not VALID_TRACE_ID.match(trace_id):
+            trace_id = uuid.uuid4().hex
+        trace_token = TRACE_ID.set(trace_id)
+        timings = {}
+        timings_token = STAGE_TIMINGS.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_trace_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (TRACE_HEADER.lower().encode(), trace_id.encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_trace_id)
+        finally:
+            elapsed = time.perf_counter() - start
+            # Label by route template rather than raw path to keep the series count bounded
+            route = scope.get("route")
+            route_path = getattr(route, "path", "other")
+            REQUEST_SECONDS.observe(
+                elapsed, method=scope["method"], route=route_path, status=str(status)
+            )
+            if route_path not in QUIET_ROUTES:
+                log(
+                    "request finished",
+                    method=scope["method"],
+                    path=scope["path"],
+                    status=status,
+                    duration_ms=round(elapsed * 1000, 1),
+                    stages_ms={stage: round(seconds * 1000, 1) for stage, seconds in timings.items()},
+                )
+            STAGE_TIMINGS.reset(timings_token)
+            TRACE_ID.reset(trace_token)
@@ -1,41 +1,586 @@
-from fastapi import FastAPI, Request, Form, File, UploadFile
-from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
+import asyncio
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, Form, File, UploadFile, Depends
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from pathlib import Path
 from typing import Optional
 
 from config import Config
+from helpers.context_cache_helper import ContextCacheHelper
+from helpers.document_executor_helper import DocumentExecutor
+from helpers.document_store_helper import DocumentStoreHelper
 from helpers.gemini_helper import GeminiHelper
-from helpers.form_validation_helper import FormValidationHelper
+from helpers.form_validation_helper import (
+    DOCUMENT_NOT_FOUND_ERROR,
+    FileValidationHelper,
+    FormValidationHelper,
+)
+from helpers.generation_store_helper import GenerationStoreHelper
+from helpers.job_cache_helper import JobCacheHelper, normalize_job_url
+from helpers.job_fetch_helper import JobPageFetcher
+from helpers.job_queue_helper import JOB_PRIORITIES, JobQueueFullError, JobQueueHelper
+from helpers.metrics_helper import REGISTRY, record_stats
+from helpers.rate_limit_helper import AdaptiveConcurrencyLimiter, SharedConcurrencyLimiter
+from helpers.refinement_helper import (
+    GENERATION_NOT_FOUND_ERROR,
+    parse_paragraph_indices,
+    split_paragraphs,
+    validate_guidance,
+)
+from helpers.request_limit_helper import (
+    RequestSizeLimitMiddleware,
+    RequestTooLargeError,
+    request_too_large_response,
+)
+from helpers.retry_helper import (
+    CoverLetterError,
+    GeminiUnavailableError,
+    JobFetchError,
+    LatencyBudget,
+    LatencyBudgetExceededError,
+)
+from helpers.shared_metrics_helper import SharedMetricsHelper
+from helpers.single_flight_helper import SingleFlightHelper
+from helpers.static_assets_helper import REVALIDATE_CACHE_CONTROL, StaticAssetsHelper
+from helpers.trace_helper import TraceMiddleware, log
 
 DEBUG = Config.DEBUG
 
-app = FastAPI(title="Cover Letter Tweaker")
+JOB_DETAILS_FAILED_ERROR = (
+    "Failed to retrieve job details from the provided URL. "
+    "Please check the link and try again."
+)
+SERVICE_UNAVAILABLE_ERROR = (
+    "The Gemini AI service is currently overloaded. "
+    "Please try again in a few moments."
+)
+GENERATION_FAILED_ERROR = (
+    "Failed to generate revised cover letter. "
+    "Please check your API key and try again."
+)
+TIMED_OUT_ERROR = (
+    "Generating the cover letter took too long. "
+    "Please try again in a few moments."
+)
+JOB_QUEUE_FULL_ERROR = (
+    "Too many cover letters are waiting to be generated. "
+    "Please try again in a few moments."
+)
+
+
+async def create_gemini_client(state):
+    # Importing google.genai is most of the cost; keep it off the event loop
+    state.gemini_client = await asyncio.to_thread(GeminiHelper.create_client)
+    state.context_cache = (
+        ContextCacheHelper(state.gemini_client) if Config.CONTEXT_CACHE_ENABLED else None
+    )
+
+
+async def warm_up(state):
+    """Create the Gemini client and start the document workers in the background
+
+    Runs as a task started by the lifespan, so uvicorn starts accepting connections (and
+    serving pages) straight away instead of waiting for google.genai to import and the
+    workers to spawn. Requests that need Gemini wait for it with wait_until_ready().
+    Starting the workers is only a head start, so failing to do so is logged and the
+    workers start when the first document needs them.
+    """
+    started = time.perf_counter()
+    error = None
+    try:
+        await create_gemini_client(state)
+    except Exception as e:
+        log(f"ERROR during warm-up: {e}", level="error")
+        error = e
+    try:
+        await state.document_executor.warm_up()
+    except Exception as e:
+        log(f"ERROR starting the document workers: {e}", level="error")
+    if error is not None:
+        raise error
+    log(f"-> Warm-up finished in {time.perf_counter() - started:.2f}s")
+
+
+async def wait_until_ready(state):
+    """Wait for the warm-up task, then make sure the Gemini client exists
+
+    If the warm-up failed to create the client, requests try again one at a time, so a
+    failure at startup doesn't leave the service failing until it is restarted.
+
+    Raises:
+        Exception: Creating the client failed again
+    """
+    await asyncio.gather(asyncio.shield(state.warm_up), return_exceptions=True)
+    if state.gemini_client is None:
+        async with state.gemini_client_lock:
+            if state.gemini_client is None:
+                await create_gemini_client(state)
+                log("-> Gemini client created after a failed warm-up")
+
+
+def readiness(state):
+    """("starting" | "ready" | "failed", error message or None) for the warm-up task"""
+    task = getattr(state, "warm_up", None)
+    if task is None or not task.done():
+        return "starting", None
+    if state.gemini_client is not None:
+        return "ready", None
+    if task.cancelled():
+        return "failed", "Warm-up was cancelled"
+    if task.exception() is not None:
+        return "failed", str(task.exception())
+    return "ready", None
+
+
+def create_gemini_limiter():
+    """Gemini concurrency limiter for this process, shared with the other workers when they share state"""
+    if Config.SHARED_STATE_DB_PATH:
+        return SharedConcurrencyLimiter(
+            GeminiHelper.is_service_unavailable_error, Config.SHARED_STATE_DB_PATH
+        )
+    return AdaptiveConcurrencyLimiter(GeminiHelper.is_service_unavailable_error)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create process-wide resources on startup and release them on shutdown"""
+    app.state.started_at = time.time()
+    await asyncio.to_thread(static_assets.load)
+    app.state.gemini_client = None
+    app.state.gemini_client_lock = asyncio.Lock()
+    app.state.context_cache = None
+    app.state.job_cache = JobCacheHelper()
+    app.state.job_fetcher = JobPageFetcher()
+    app.state.gemini_limiter = create_gemini_limiter()
+    app.state.document_executor = DocumentExecutor()
+    app.state.document_store = DocumentStoreHelper()
+    app.state.generation_store = GenerationStoreHelper()
+    app.state.warm_up = asyncio.create_task(warm_up(app.state))
+    app.state.job_queue = JobQueueHelper()
+    await app.state.job_queue.start(lambda payload: run_background_job(app.state, payload))
+    app.state.shared_metrics = SharedMetricsHelper() if Config.METRICS_DB_PATH else None
+    if app.state.shared_metrics is not None:
+        await app.state.shared_metrics.start()
+    try:
+        yield
+    finally:
+        app.state.warm_up.cancel()
+        await asyncio.gather(app.state.warm_up, return_exceptions=True)
+        await app.state.job_queue.stop()
+        if app.state.shared_metrics is not None:
+            await app.state.shared_metrics.stop()
+        if app.state.gemini_client is not None:
+            await GeminiHelper.close_client(app.state.gemini_client)
+        if app.state.context_cache is not None:
+            app.state.context_cache.close()
+        await app.state.gemini_limiter.close()
+        app.state.job_cache.close()
+        await app.state.job_fetcher.close()
+        app.state.document_executor.close()
+        app.state.document_store.close()
+        app.state.generation_store.close()
+
+
+app = FastAPI(title="Cover Letter Tweaker", lifespan=lifespan)
+
+# Reject oversized uploads before multipart parsing spools them
+app.add_middleware(RequestSizeLimitMiddleware)
+# Outermost, so every request (including rejected ones) gets a trace ID and a latency sample
+app.add_middleware(TraceMiddleware)
+
+
+@app.exception_handler(RequestTooLargeError)
+async def request_too_large_handler(request: Request, exc: RequestTooLargeError):
+    return request_too_large_response()
+
 
 # Create directories if they don't exist
 Path("static").mkdir(exist_ok=True)
 Path("templates").mkdir(exist_ok=True)
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Static files, fingerprinted and precompressed in memory (see the /static route)
+static_assets = StaticAssetsHelper("static", reload=DEBUG)
 
 # Setup templates
 templates = Jinja2Templates(directory="templates")
 
+# Coalesces identical in-flight generations and job-page fetches
+single_flight = SingleFlightHelper()
+
+
+def gemini_helper_for(state) -> GeminiHelper:
+    """A helper bound to the shared Gemini client and caches held in the app state"""
+    return GeminiHelper(
+        client=state.gemini_client,
+        job_cache=state.job_cache,
+        context_cache=state.context_cache,
+        limiter=state.gemini_limiter,
+        document_executor=state.document_executor,
+        job_fetcher=state.job_fetcher,
+    )
+
+
+async def get_gemini_helper(request: Request) -> GeminiHelper:
+    """Dependency that hands each request a helper bound to the shared Gemini client
+
+    Waits for the warm-up to create the client if a request arrives during a cold start.
+    """
+    await wait_until_ready(request.app.state)
+    return gemini_helper_for(request.app.state)
+
+
+def get_document_executor(request: Request) -> Optional[DocumentExecutor]:
+    """Dependency returning the shared document worker pool
+
+    None when the app runs without its lifespan (e.g. in-process benchmarks), in which
+    case documents are processed in threads.
+    """
+    return getattr(request.app.state, "document_executor", None)
+
+
+def get_document_store(request: Request) -> Optional[DocumentStoreHelper]:
+    """Dependency returning the shared document store (None without the lifespan)"""
+    return getattr(request.app.state, "document_store", None)
+
+
+def get_generation_store(request: Request) -> Optional[GenerationStoreHelper]:
+    """Dependency returning the store of finished letters for /refine (None without the lifespan)"""
+    return getattr(request.app.state, "generation_store", None)
+
+
+def get_job_queue(request: Request) -> Optional[JobQueueHelper]:
+    """Dependency returning the background job queue (None without the lifespan)"""
+    return getattr(request.app.state, "job_queue", None)
+
+
+async def get_job_details(form_validation_helper, gemini_helper, budget):
+    """Job details fetched from the validated job link, or built from the manual descriptions
+
+    Raises:
+        CoverLetterError: The job link could not be fetched or summarised in time
+    """
+    if form_validation_helper.job_link_provided:
+        # Use fetch_job_details to retrieve information from URL, sharing the fetch with any
+        # concurrent request for the same posting (the job cache retains finished summaries)
+        job_url = form_validation_helper.jobLink.strip()
+        return await single_flight.run(
+            f"job:{normalize_job_url(job_url)}",
+            lambda: gemini_helper.fetch_job_details(job_url, budget),
+            should_keep=lambda job_details: False,
+        )
+
+    # Combine company and role descriptions into job_details
+    return (
+        f"Company Description:\n{form_validation_helper.companyDescription}\n\n"
+        f"Role Description:\n{form_validation_helper.roleDescription}"
+    )
+
+
+async def prepare_job_and_documents(form_validation_helper, gemini_helper, budget):
+    """Fetch the job details and read the uploaded documents concurrently
+
+    The job-link fetch, extraction and summary don't depend on the resume or cover letter,
+    so they overlap the reading, MIME sniffing and DOCX parsing of the uploads. Call
+    validate_job() and validate_document_fields() first. Whichever branch fails first
+    cancels the other.
+
+    Returns:
+        tuple: (job_details, error); error is a document validation message, or None
+
+    Raises:
+        CoverLetterError: The job details could not be fetched
+    """
+    job_task = asyncio.create_task(get_job_details(form_validation_helper, gemini_helper, budget))
+    documents_task = asyncio.create_task(form_validation_helper.read_documents())
+    try:
+        pending = {job_task, documents_task}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if documents_task in done:
+                success, error = documents_task.result()
+                if not success:
+                    return None, error
+            if job_task in done:
+                # Raises straight away if the fetch failed
+                job_task.result()
+        return job_task.result(), None
+    finally:
+        for task in (job_task, documents_task):
+            task.cancel()
+
+
+async def generate_revised_letter(form_validation_helper, gemini_helper, job_details, budget):
+    """Run the rewrite step for a validated form whose documents have been read
+
+    Identical submissions (double clicks, client retries) share a single generation.
+
+    Returns:
+        str: The revised cover letter
+
+    Raises:
+        CoverLetterError: See error_response_content
+    """
+    return await single_flight.run(
+        f"process:{form_validation_helper.fingerprint()}",
+        lambda: gemini_helper.rewrite_cover_letter(
+            job_details=job_details,
+            resume_text=form_validation_helper.resumeText,
+            existing_letter=form_validation_helper.coverLetterText,
+            cover_letter_file_data=form_validation_helper.coverLetterFileData,
+            cover_letter_file_mime_type=form_validation_helper.coverLetterFileMimeType,
+            resume_file_data=form_validation_helper.resumeFileData,
+            resume_file_mime_type=form_validation_helper.resumeFileMimeType,
+            budget=budget,
+        ),
+    )
+
+
+async def run_background_job(state, payload):
+    """Generate the letter for a queued job; the queue's workers call this
+
+    Returns:
+        tuple: (status_code, content), as /process would have answered
+    """
+    form_validation_helper = FormValidationHelper.from_payload(payload)
+    success, error = form_validation_helper.validate_job()
+    if not success:
+        return 400, {"success": False, "error": error}
+    await wait_until_ready(state)
+    gemini_helper = gemini_helper_for(state)
+    try:
+        budget = LatencyBudget()
+        job_details = await get_job_details(form_validation_helper, gemini_helper, budget)
+        revised_letter = await generate_revised_letter(
+            form_validation_helper, gemini_helper, job_details, budget
+        )
+        generation = await save_generation(
+            state.generation_store,
+            state.document_store,
+            form_validation_helper,
+            job_details,
+            revised_letter,
+        )
+    except CoverLetterError as e:
+        return error_response_content(e)
+    return 200, {"success": True, "revised_letter": revised_letter, **generation}
+
+
+async def save_generation(generation_store, document_store, form_validation_helper, job_details,
+                          letter):
+    """Keep a finished letter so /refine can regenerate parts of it
+
+    Text resumes are stored with the letter; other resumes by their document store ID,
+    adding them to the store if the form has no ID for them yet.
+
+    Returns:
+        dict: {"generation_id": ...} to merge into the response, or {} without a store
+    """
+    if generation_store is None:
+        return {}
+    resume_text, resume_id = form_validation_helper.resumeText, None
+    if form_validation_helper.resumeFileData is not None:
+        if form_validation_helper.resumeFileMimeType == "text/plain":
+            resume_text = form_validation_helper.resumeFileData.decode("utf-8")
+        else:
+            resume_text, resume_id = None, form_validation_helper.resumeId
+            if resume_id is None:
+                if document_store is None:
+                    return {}
+                resume_id = await document_store.put(
+                    form_validation_helper.resumeFileData,
+                    form_validation_helper.resumeFileMimeType,
+                )
+    generation_id = await generation_store.put(letter, job_details, resume_text, resume_id)
+    return {"generation_id": generation_id}
+
+
+def error_response_content(error):
+    """Map a CoverLetterError to an HTTP status and JSON body"""
+    if isinstance(error, JobFetchError):
+        return 400, {"success": False, "error": JOB_DETAILS_FAILED_ERROR}
+    if isinstance(error, GeminiUnavailableError):
+        return 503, {
+            "success": False,
+            "error": SERVICE_UNAVAILABLE_ERROR,
+            "retry_after": error.retry_after,
+        }
+    if isinstance(error, LatencyBudgetExceededError):
+        return 504, {"success": False, "error": TIMED_OUT_ERROR}
+    return 500, {"success": False, "error": GENERATION_FAILED_ERROR}
+
+
+def error_response(error):
+    """JSON error response for a CoverLetterError, telling the client when to retry on 503"""
+    status_code, content = error_response_content(error)
+    headers = {"Retry-After": str(content["retry_after"])} if "retry_after" in content else None
+    return JSONResponse(status_code=status_code, content=content, headers=headers)
+
+
+def validation_error_response(error):
+    """JSON response for a form validation error; 404 when a stored document or letter expired"""
+    not_found = error in (DOCUMENT_NOT_FOUND_ERROR, GENERATION_NOT_FOUND_ERROR)
+    return JSONResponse(
+        status_code=404 if not_found else 400,
+        content={"success": False, "error": error},
+    )
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Events message with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def render_index():
+    return templates.get_template("index.html").render(
+        max_text_length=Config.MAX_TEXT_LENGTH,
+        asset_url=static_assets.url,
+    )
+
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
-    """Render the main page"""
-    return templates.TemplateResponse(
-        "index.html", 
-        {
-            "request": request,
-            "max_text_length": Config.MAX_TEXT_LENGTH
-        }
+    """Render the main page (once; later requests get the cached render or a 304)"""
+    return static_assets.page("index.html", render_index).response(
+        request.headers, REVALIDATE_CACHE_CONTROL
     )
 
 
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"], name="static", include_in_schema=False)
+async def static_file(path: str, request: Request):
+    """Serve a static file from memory, compressed to suit the client's Accept-Encoding"""
+    return static_assets.response(path, request.headers)
+
+
+def collect_stats(state):
+    return {
+        "gemini_limiter": state.gemini_limiter.stats(),
+        "job_cache": state.job_cache.stats(),
+        "job_fetcher": state.job_fetcher.stats(),
+        "document_executor": state.document_executor.stats(),
+        "document_store": state.document_store.stats(),
+        "generation_store": state.generation_store.stats(),
+        "job_queue": state.job_queue.stats(),
+        "single_flight_coalesced": single_flight.coalesced,
+    }
+
+
+@app.get("/healthz")
+async def healthz(request: Request):
+    """Liveness: 200 whenever the process is serving requests
+
+    Also reports readiness, which turns "ready" once the warm-up has created the Gemini
+    client and started the document workers; use /healthz/ready to wait for that.
+    """
+    status, error = readiness(request.app.state)
+    content = {
+        "alive": True,
+        "ready": status == "ready",
+        "status": status,
+        "uptime_seconds": round(time.time() - request.app.state.started_at, 3),
+    }
+    if error is not None:
+        content["error"] = error
+    return content
+
+
+@app.get("/healthz/ready")
+async def healthz_ready(request: Request):
+    """Readiness: 200 once warm-up has finished, 503 while starting or if it failed
+
+    After a failed warm-up each check tries to create the Gemini client again, since a
+    load balancer sends no requests that would do it to an instance that isn't ready.
+    """
+    status, error = readiness(request.app.state)
+    if status == "failed":
+        try:
+            await wait_until_ready(request.app.state)
+        except Exception:
+            pass
+        status, error = readiness(request.app.state)
+    content = {"ready": status == "ready", "status": status}
+    if error is not None:
+        content["error"] = error
+    return JSONResponse(status_code=200 if status == "ready" else 503, content=content)
+
+
+@app.get("/stats")
+async def stats(request: Request):
+    """Live counters for the Gemini concurrency limiter, the document workers and the caches
+
+    With several worker processes the counters are those of the worker that answered,
+    identified by worker_pid.
+    """
+    return {"worker_pid": os.getpid(), **collect_stats(request.app.state)}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics(request: Request):
+    """Metrics in the Prometheus text format
+
+    Latency histograms per request and per stage (upload read, MIME sniff, text extraction,
+    job fetch and extraction, Gemini summary and rewrite), counters for cache lookups,
+    retries, upstream errors by status and Gemini tokens, and the /stats values as gauges.
+    With shared state the counters and histograms are totals across all worker processes;
+    the gauges are those of the worker that answered.
+    """
+    record_stats(collect_stats(request.app.state))
+    shared_metrics = getattr(request.app.state, "shared_metrics", None)
+    body = await shared_metrics.render() if shared_metrics is not None else REGISTRY.render()
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
+@app.post("/documents")
+async def upload_document(
+    file: UploadFile = File(...),
+    document_executor: Optional[DocumentExecutor] = Depends(get_document_executor),
+    document_store: Optional[DocumentStoreHelper] = Depends(get_document_store),
+):
+    """Validate, parse and store a resume or cover letter file once
+
+    Returns a document_id that can be sent as resumeId or coverLetterId to the /process
+    endpoints instead of uploading the file again. IDs are content hashes, so uploading
+    the same file twice returns the same ID; an ID that has expired gets a 404 from
+    /process and the file has to be uploaded again.
+    """
+    try:
+        if document_store is None:
+            return JSONResponse(
+                status_code=503,
+                content={"success": False, "error": "Document storage is not available."},
+            )
+        file_validation_helper = FileValidationHelper(file, document_executor)
+        success, error = await file_validation_helper.validate_file()
+        if not success:
+            return validation_error_response(error)
+
+        document_id = await document_store.put(
+            file_validation_helper.content, file_validation_helper.mime_type
+        )
+        return JSONResponse(
+            status_code=200,
+            content={
+                "success": True,
+                "document_id": document_id,
+                "mime_type": file_validation_helper.mime_type,
+                "expires_in": int(document_store.ttl_seconds),
+            },
+        )
+
+    except Exception as e:
+
+        if DEBUG:
+            raise e
+        return JSONResponse(
+            status_code=500,
+            content={"success": False, "error": f"An error occurred: {str(e)}"},
+        )
+
+
 @app.post("/process")
 async def process_cover_letter(
     jobLink: Optional[str] = Form(None),
@@ -45,12 +590,21 @@ async def process_cover_letter(
     coverLetterText: Optional[str] = Form(None),
     resumeFile: Optional[UploadFile] = File(None),
     coverLetterFile: Optional[UploadFile] = File(None),
+    resumeId: Optional[str] = Form(None),
+    coverLetterId: Optional[str] = Form(None),
+    gemini_helper: GeminiHelper = Depends(get_gemini_helper),
+    document_executor: Optional[DocumentExecutor] = Depends(get_document_executor),
+    document_store: Optional[DocumentStoreHelper] = Depends(get_document_store),
+    generation_store: Optional[GenerationStoreHelper] = Depends(get_generation_store),
 ):
     """Process the cover letter using Gemini AI
 
     Combines company and role descriptions, then uses the rewrite_cover_letter
     function to generate a customized cover letter based on the resume.
-    Accepts either text or file upload (TXT, PDF, DOCX) for both resume and cover letter.
+    Accepts either text or file upload (TXT, PDF, DOCX) for both resume and cover letter,
+    or the resumeId/coverLetterId of a document stored earlier. The response carries
+    resume_id/cover_letter_id for the documents used, so later calls can skip the upload,
+    and a generation_id for /refine.
     """
     try:
         form_validation_helper = FormValidationHelper(
@@ -61,90 +615,518 @@ async def process_cover_letter(
             coverLetterText,
             resumeFile,
             coverLetterFile,
+            document_executor,
+            resumeId,
+            coverLetterId,
+            document_store,
         )
-        success, error = await form_validation_helper.validate_form()
+        success, error = form_validation_helper.validate_fields()
+        if success:
+            budget = LatencyBudget()
+            job_details, error = await prepare_job_and_documents(
+                form_validation_helper, gemini_helper, budget
+            )
+            success = error is None
         if not success:
+            return validation_error_response(error)
+
+        revised_letter = await generate_revised_letter(
+            form_validation_helper, gemini_helper, job_details, budget
+        )
+        generation = await save_generation(
+            generation_store, document_store, form_validation_helper, job_details, revised_letter
+        )
+        return JSONResponse(
+            status_code=200,
+            content={
+                "success": True,
+                "revised_letter": revised_letter,
+                **form_validation_helper.document_ids(),
+                **generation,
+            },
+        )
+
+    except CoverLetterError as e:
+        return error_response(e)
+    except Exception as e:
+
+        if DEBUG:
+            raise e
+        return JSONResponse(
+            status_code=500,
+            content={"success": False, "error": f"An error occurred: {str(e)}"},
+        )
+
+
+@app.post("/process/stream")
+async def process_cover_letter_stream(
+    jobLink: Optional[str] = Form(None),
+    companyDescription: Optional[str] = Form(None),
+    roleDescription: Optional[str] = Form(None),
+    resumeText: Optional[str] = Form(None),
+    coverLetterText: Optional[str] = Form(None),
+    resumeFile: Optional[UploadFile] = File(None),
+    coverLetterFile: Optional[UploadFile] = File(None),
+    resumeId: Optional[str] = Form(None),
+    coverLetterId: Optional[str] = Form(None),
+    gemini_helper: GeminiHelper = Depends(get_gemini_helper),
+    document_executor: Optional[DocumentExecutor] = Depends(get_document_executor),
+    document_store: Optional[DocumentStoreHelper] = Depends(get_document_store),
+    generation_store: Optional[GenerationStoreHelper] = Depends(get_generation_store),
+):
+    """Stream the revised cover letter to the browser as Server-Sent Events
+
+    Takes the same form fields as /process. Validation and job-detail failures are
+    returned as JSON exactly like /process; once generation starts the letter arrives
+    as "chunk" events followed by a "done" event carrying the document and generation IDs.
+    Failures partway through the stream are sent as an "error" event carrying the equivalent HTTP status.
+    """
+    try:
+        form_validation_helper = FormValidationHelper(
+            jobLink,
+            companyDescription,
+            roleDescription,
+            resumeText,
+            coverLetterText,
+            resumeFile,
+            coverLetterFile,
+            document_executor,
+            resumeId,
+            coverLetterId,
+            document_store,
+        )
+        success, error = form_validation_helper.validate_fields()
+        if success:
+            budget = LatencyBudget()
+            job_details, error = await prepare_job_and_documents(
+                form_validation_helper, gemini_helper, budget
+            )
+            success = error is None
+        if not success:
+            return validation_error_response(error)
+
+    except CoverLetterError as e:
+        return error_response(e)
+    except Exception as e:
+
+        if DEBUG:
+            raise e
+        return JSONResponse(
+            status_code=500,
+            content={"success": False, "error": f"An error occurred: {str(e)}"},
+        )
+
+    async def event_stream():
+        try:
+            chunks = []
+            async for text in gemini_helper.rewrite_cover_letter_stream(
+                job_details=job_details,
+                resume_text=resumeText,
+                existing_letter=coverLetterText,
+                cover_letter_file_data=form_validation_helper.coverLetterFileData,
+                cover_letter_file_mime_type=form_validation_helper.coverLetterFileMimeType,
+                resume_file_data=form_validation_helper.resumeFileData,
+                resume_file_mime_type=form_validation_helper.resumeFileMimeType,
+                budget=budget,
+            ):
+                chunks.append(text)
+                yield sse_event("chunk", {"text": text})
+            generation = await save_generation(
+                generation_store,
+                document_store,
+                form_validation_helper,
+                job_details,
+                "".join(chunks),
+            )
+            yield sse_event(
+                "done", {"success": True, **form_validation_helper.document_ids(), **generation}
+            )
+        except CoverLetterError as e:
+            status_code, content = error_response_content(e)
+            yield sse_event("error", {"status": status_code, **content})
+        except Exception as e:
+            log(f"ERROR in Step 2 (Streaming Cover Letter): {e}", level="error")
+            yield sse_event("error", {"status": 500, "error": GENERATION_FAILED_ERROR})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(
+    request: Request,
+    jobLink: Optional[str] = Form(None),
+    companyDescription: Optional[str] = Form(None),
+    roleDescription: Optional[str] = Form(None),
+    resumeText: Optional[str] = Form(None),
+    coverLetterText: Optional[str] = Form(None),
+    resumeFile: Optional[UploadFile] = File(None),
+    coverLetterFile: Optional[UploadFile] = File(None),
+    resumeId: Optional[str] = Form(None),
+    coverLetterId: Optional[str] = Form(None),
+    priority: str = Form("normal"),
+    document_executor: Optional[DocumentExecutor] = Depends(get_document_executor),
+    document_store: Optional[DocumentStoreHelper] = Depends(get_document_store),
+    job_queue: Optional[JobQueueHelper] = Depends(get_job_queue),
+):
+    """Queue a cover letter generation and return its job ID straight away
+
+    Takes the same form fields as /process, plus a priority of "high", "normal" or "low".
+    The form and documents are validated before the job is queued, so validation errors
+    are returned here exactly like /process; the job link is fetched by the worker. Poll
+    GET /jobs/{job_id} for the result. A full queue is a 503 with Retry-After.
+    """
+    try:
+        if job_queue is None:
+            return JSONResponse(
+                status_code=503,
+                content={"success": False, "error": "Background jobs are not available."},
+            )
+        if priority not in JOB_PRIORITIES:
             return JSONResponse(
                 status_code=400,
                 content={
                     "success": False,
-                    "error": error,
+                    "error": "Please choose a priority of high, normal or low.",
                 },
             )
+        form_validation_helper = FormValidationHelper(
+            jobLink,
+            companyDescription,
+            roleDescription,
+            resumeText,
+            coverLetterText,
+            resumeFile,
+            coverLetterFile,
+            document_executor,
+            resumeId,
+            coverLetterId,
+            document_store,
+        )
+        success, error = await form_validation_helper.validate_form()
+        if not success:
+            return validation_error_response(error)
 
-        # TODO: Remove this once the form validation helper is implemented
-        # Handle resume file upload if provided
-        resume_file_data = form_validation_helper.resumeFileData
-        resume_file_mime_type = form_validation_helper.resumeFileMimeType
-
-        # Handle cover letter file upload if provided
-        cover_letter_file_data = form_validation_helper.coverLetterFileData
-        cover_letter_file_mime_type = form_validation_helper.coverLetterFileMimeType
-
-        # Initialize Gemini helper
-        gemini_helper = GeminiHelper()
-
-        # Get job details either from URL or manual input
-        if form_validation_helper.job_link_provided:
-            # Use fetch_job_details to retrieve information from URL
-            job_details = gemini_helper.fetch_job_details(jobLink.strip())
-            
-            if job_details is None:
-                return JSONResponse(
-                    status_code=400,
-                    content={
-                        "success": False,
-                        "error": (
-                            "Failed to retrieve job details from the provided URL. "
-                            "Please check the link and try again."
-                        ),
-                    },
-                )
-        else:
-            # Combine company and role descriptions into job_details
-            job_details = (
-                f"Company Description:\n{companyDescription}\n\n"
-                f"Role Description:\n{roleDescription}"
-            )
+        job = await job_queue.submit(form_validation_helper.to_payload(), JOB_PRIORITIES[priority])
+        status_url = str(request.url_for("get_job", job_id=job.id))
+        return JSONResponse(
+            status_code=202,
+            content={
+                "success": True,
+                "job_id": job.id,
+                "status": job.status,
+                "status_url": status_url,
+                **form_validation_helper.document_ids(),
+            },
+            headers={"Location": status_url},
+        )
 
-        # Call the rewrite_cover_letter function
-        revised_letter = gemini_helper.rewrite_cover_letter(
-            job_details=job_details,
-            resume_text=resumeText,
-            existing_letter=coverLetterText,
-            cover_letter_file_data=cover_letter_file_data,
-            cover_letter_file_mime_type=cover_letter_file_mime_type,
-            resume_file_data=resume_file_data,
-            resume_file_mime_type=resume_file_mime_type,
+    except JobQueueFullError as e:
+        return JSONResponse(
+            status_code=503,
+            content={"success": False, "error": JOB_QUEUE_FULL_ERROR, "retry_after": e.retry_after},
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except CoverLetterError as e:
+        return error_response(e)
+    except Exception as e:
+
+        if DEBUG:
+            raise e
+        return JSONResponse(
+            status_code=500,
+            content={"success": False, "error": f"An error occurred: {str(e)}"},
+        )
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    wait: float = 0,
+    job_queue: Optional[JobQueueHelper] = Depends(get_job_queue),
+):
+    """Status of a queued job, with the revised letter (or error) once it has finished
+
+    "status" is queued, running, succeeded or failed; queued jobs report their
+    queue_position when the worker process running them answers. A finished job carries the body /process would have returned plus
+    the equivalent HTTP status_code. With wait=N the request is held for up to N seconds
+    (capped by JOB_QUEUE_MAX_WAIT_SECONDS) until the job finishes, so clients can long
+    poll instead of polling on a timer. Results are kept for JOB_QUEUE_RESULT_TTL_SECONDS;
+    unknown and expired jobs are a 404.
+    """
+    job = await job_queue.get(job_id) if job_queue is not None else None
+    if job is None:
+        return JSONResponse(
+            status_code=404,
+            content={"success": False, "error": "This job was not found or has expired."},
         )
+    wait = min(max(wait, 0), Config.JOB_QUEUE_MAX_WAIT_SECONDS)
+    if wait and not job.done.is_set():
+        job = await job_queue.wait(job, wait)
+    content = job.to_dict()
+    position = job_queue.position(job)
+    if position is not None:
+        content["queue_position"] = position
+    return JSONResponse(status_code=200, content=content)
+
+
+@app.post("/process/batch")
+async def process_cover_letter_batch(
+    jobs: str = Form(...),
+    resumeText: Optional[str] = Form(None),
+    coverLetterText: Optional[str] = Form(None),
+    resumeFile: Optional[UploadFile] = File(None),
+    coverLetterFile: Optional[UploadFile] = File(None),
+    resumeId: Optional[str] = Form(None),
+    coverLetterId: Optional[str] = Form(None),
+    gemini_helper: GeminiHelper = Depends(get_gemini_helper),
+    document_executor: Optional[DocumentExecutor] = Depends(get_document_executor),
+    document_store: Optional[DocumentStoreHelper] = Depends(get_document_store),
+    generation_store: Optional[GenerationStoreHelper] = Depends(get_generation_store),
+):
+    """Tailor one resume and cover letter to many job postings
 
-        if revised_letter == "SERVICE_UNAVAILABLE":
+    `jobs` is a JSON array whose items are either {"jobLink": ...} or
+    {"companyDescription": ..., "roleDescription": ...}. The resume and cover letter are
+    validated and parsed once, then the jobs run with bounded concurrency and results are
+    streamed back as NDJSON in completion order: one line per job with its "index" in the
+    request (and a generation_id for /refine), followed by a {"done": true, ...} summary
+    line with the document IDs. A failing job only fails its own line.
+    """
+    try:
+        try:
+            job_items = json.loads(jobs)
+        except json.JSONDecodeError:
+            job_items = None
+        if (
+            not isinstance(job_items, list)
+            or not job_items
+            or not all(isinstance(item, dict) for item in job_items)
+        ):
             return JSONResponse(
-                status_code=503,
+                status_code=400,
                 content={
                     "success": False,
-                    "error": (
-                        "The Gemini AI service is currently overloaded. "
-                        "Please try again in a few moments."
-                    ),
+                    "error": "Please provide the jobs as a non-empty JSON list of objects.",
                 },
             )
-        elif revised_letter:
-            return JSONResponse(
-                content={"success": True, "revised_letter": revised_letter}
-            )
-        else:
+        if len(job_items) > Config.BATCH_MAX_JOBS:
             return JSONResponse(
-                status_code=500,
+                status_code=400,
                 content={
                     "success": False,
-                    "error": (
-                        "Failed to generate revised cover letter. "
-                        "Please check your API key and try again."
-                    ),
+                    "error": f"A batch can contain at most {Config.BATCH_MAX_JOBS} jobs.",
                 },
             )
 
+        # Read, sniff and parse the documents once for the whole batch
+        documents_helper = FormValidationHelper(
+            resumeText=resumeText,
+            coverLetterText=coverLetterText,
+            resumeFile=resumeFile,
+            coverLetterFile=coverLetterFile,
+            document_executor=document_executor,
+            resumeId=resumeId,
+            coverLetterId=coverLetterId,
+            document_store=document_store,
+        )
+        success, error = await documents_helper.validate_documents()
+        if not success:
+            return validation_error_response(error)
+
+    except Exception as e:
+
+        if DEBUG:
+            raise e
+        return JSONResponse(
+            status_code=500,
+            content={"success": False, "error": f"An error occurred: {str(e)}"},
+        )
+
+    semaphore = asyncio.Semaphore(Config.BATCH_CONCURRENCY)
+
+    async def process_job(index, item):
+        try:
+            job_helper = documents_helper.for_job(
+                item.get("jobLink"),
+                item.get("companyDescription"),
+                item.get("roleDescription"),
+            )
+            success, error = job_helper.validate_job()
+            if not success:
+                return index, 400, {"success": False, "error": error}
+
+            async with semaphore:
+                budget = LatencyBudget()
+                job_details = await get_job_details(job_helper, gemini_helper, budget)
+                revised_letter = await generate_revised_letter(
+                    job_helper, gemini_helper, job_details, budget
+                )
+            generation = await save_generation(
+                generation_store, document_store, job_helper, job_details, revised_letter
+            )
+            return index, 200, {"success": True, "revised_letter": revised_letter, **generation}
+        except CoverLetterError as e:
+            status_code, content = error_response_content(e)
+            return index, status_code, content
+        except Exception as e:
+            log(f"ERROR in batch job {index}: {e}", level="error")
+            return index, 500, {"success": False, "error": f"An error occurred: {str(e)}"}
+
+    async def result_stream():
+        tasks = [
+            asyncio.create_task(process_job(index, item)) for index, item in enumerate(job_items)
+        ]
+        succeeded = 0
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                index, status_code, content = await next_result
+                succeeded += content["success"]
+                yield json.dumps({"index": index, "status": status_code, **content}) + "\n"
+            yield json.dumps(
+                {
+                    "done": True,
+                    "succeeded": succeeded,
+                    "failed": len(tasks) - succeeded,
+                    **documents_helper.document_ids(),
+                }
+            ) + "\n"
+        finally:
+            # Stop outstanding jobs if the client goes away mid-batch
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+
+
+@app.post("/refine")
+async def refine_cover_letter(
+    paragraphs: str = Form(...),
+    generationId: Optional[str] = Form(None),
+    letter: Optional[str] = Form(None),
+    guidance: Optional[str] = Form(None),
+    jobLink: Optional[str] = Form(None),
+    companyDescription: Optional[str] = Form(None),
+    roleDescription: Optional[str] = Form(None),
+    resumeText: Optional[str] = Form(None),
+    resumeFile: Optional[UploadFile] = File(None),
+    resumeId: Optional[str] = Form(None),
+    gemini_helper: GeminiHelper = Depends(get_gemini_helper),
+    document_executor: Optional[DocumentExecutor] = Depends(get_document_executor),
+    document_store: Optional[DocumentStoreHelper] = Depends(get_document_store),
+    generation_store: Optional[GenerationStoreHelper] = Depends(get_generation_store),
+):
+    """Regenerate some paragraphs of an earlier cover letter, keeping the rest as it is
+
+    `paragraphs` lists the 0-based indices of the paragraphs to regenerate, e.g. "1,2";
+    paragraphs are separated by blank lines, and the salutation and sign-off count as
+    paragraphs. `guidance` optionally tells Gemini what to change ("more concise").
+
+    With the generationId returned by /process, /process/stream, /jobs, /process/batch or
+    an earlier /refine, the job details and resume stored with that letter are reused, so
+    nothing is fetched or parsed again; send `letter` as well if the user has edited it.
+    Without one, send `letter` with the job and resume fields of /process. The response
+    carries the revised letter and a new generation_id for the next refinement.
+    """
+    try:
+        if generation_store is None:
+            return JSONResponse(
+                status_code=503,
+                content={"success": False, "error": "Refinement is not available."},
+            )
+        generation = await generation_store.get(generationId) if generationId else None
+        if generationId and generation is None:
+            return validation_error_response(GENERATION_NOT_FOUND_ERROR)
+        if generation is not None and not letter:
+            letter = generation["letter"]
+        if not letter or not letter.strip():
+            return validation_error_response(
+                "Please provide the generationId of an earlier cover letter or its text."
+            )
+        success, error = FormValidationHelper.validate_text_length(letter)
+        if success:
+            error = validate_guidance(guidance)
+            success = error is None
+        if success:
+            indices, error = parse_paragraph_indices(paragraphs, len(split_paragraphs(letter)))
+            success = error is None
+        if not success:
+            return validation_error_response(error)
+
+        budget = LatencyBudget()
+        if generation is not None:
+            job_details = generation["job_details"]
+            resume_text, resume_id = generation["resume_text"], generation["resume_id"]
+            resume_file_data = resume_file_mime_type = None
+            if resume_id:
+                document = await document_store.get(resume_id) if document_store else None
+                if document is None:
+                    return validation_error_response(DOCUMENT_NOT_FOUND_ERROR)
+                resume_file_data, resume_file_mime_type = document
+        else:
+            form_validation_helper = FormValidationHelper(
+                jobLink,
+                companyDescription,
+                roleDescription,
+                resumeText,
+                letter,
+                resumeFile,
+                None,
+                document_executor,
+                resumeId,
+                None,
+                document_store,
+            )
+            success, error = form_validation_helper.validate_fields()
+            if success:
+                job_details, error = await prepare_job_and_documents(
+                    form_validation_helper, gemini_helper, budget
+                )
+                success = error is None
+            if not success:
+                return validation_error_response(error)
+            resume_text = form_validation_helper.resumeText
+            resume_file_data = form_validation_helper.resumeFileData
+            resume_file_mime_type = form_validation_helper.resumeFileMimeType
+
+        revised_letter = await gemini_helper.refine_cover_letter(
+            job_details=job_details,
+            letter=letter,
+            indices=indices,
+            guidance=guidance,
+            resume_text=resume_text,
+            resume_file_data=resume_file_data,
+            resume_file_mime_type=resume_file_mime_type,
+            budget=budget,
+        )
+        if generation is not None:
+            generation_id = await generation_store.put(
+                revised_letter, job_details, resume_text, resume_id
+            )
+            new_generation = {"generation_id": generation_id}
+        else:
+            new_generation = await save_generation(
+                generation_store,
+                document_store,
+                form_validation_helper,
+                job_details,
+                revised_letter,
+            )
+        return JSONResponse(
+            status_code=200,
+            content={
+                "success": True,
+                "revised_letter": revised_letter,
+                "refined_paragraphs": indices,
+                **new_generation,
+            },
+        )
+
+    except CoverLetterError as e:
+        return error_response(e)
     except Exception as e:
 
         if DEBUG:
@@ -156,6 +1138,6 @@ async def process_cover_letter(
 
 
 if __name__ == "__main__":
-    import uvicorn
+    from helpers.server_helper import run_server
 
-    uvicorn.run(app, host="127.0.0.1", port=8000)
+    run_server()
@@ -1,12 +1,24 @@
-// LocalStorage key for form data persistence
-const STORAGE_KEY = 'coverLetterFormData';
+// IndexedDB database for form persistence: text fields and input modes by name, files as Blobs
+const DB_NAME = 'coverLetterTweaker';
+const DB_VERSION = 1;
+const FIELDS_STORE = 'fields';
+const FILES_STORE = 'files';
+// Where earlier versions saved the form (files as base64 in localStorage); moved on first load
+const LEGACY_STORAGE_KEY = 'coverLetterFormData';
 
 // Configuration
 const DEBOUNCE_MS = 500;
-const LOCALSTORAGE_FILE_LIMIT = 2 * 1024 * 1024;  // 2MB
 // MAX_TEXT_LENGTH is set from backend via window.MAX_TEXT_LENGTH in index.html
 const MAX_TEXT_LENGTH = window.MAX_TEXT_LENGTH || 50000;  // Fallback to 50000 if not set
 
+// Server-side document IDs of uploaded files, so each file is only uploaded and parsed once
+const documentIds = new WeakMap();
+
+// Last value saved for each field, so a save only writes the fields that changed
+const savedFields = new Map();
+// Promise for the open IndexedDB database
+let formDatabase = null;
+
 // Debounce function to limit save frequency
 function debounce(func, wait) {
     let timeout;
@@ -60,40 +72,71 @@ function validateTextLength(element) {
     return true;
 }
 
-// Helper function to convert File to base64
-async function fileToBase64(file) {
+// Open (and on first use create) the IndexedDB database holding the saved form
+function openFormDatabase() {
+    if (!formDatabase) {
+        formDatabase = new Promise((resolve, reject) => {
+            const request = indexedDB.open(DB_NAME, DB_VERSION);
+            request.onupgradeneeded = () => {
+                request.result.createObjectStore(FIELDS_STORE);
+                request.result.createObjectStore(FILES_STORE);
+            };
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => reject(request.error);
+        });
+    }
+    return formDatabase;
+}
+
+// Promise for the result of an IndexedDB request
+function requestResult(request) {
+    return new Promise((resolve, reject) => {
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+// Promise settled when an IndexedDB transaction has committed or failed
+function transactionDone(transaction) {
     return new Promise((resolve, reject) => {
-        const reader = new FileReader();
-        reader.onload = () => resolve(reader.result);
-        reader.onerror = error => reject(error);
-        reader.readAsDataURL(file);
+        transaction.oncomplete = () => resolve();
+        transaction.onerror = () => reject(transaction.error);
+        transaction.onabort = () => reject(transaction.error || new DOMException('Transaction aborted', 'AbortError'));
     });
 }
 
-// Helper function to convert base64 back to File object
+// All {key: value} pairs of an object store, read within a transaction
+async function readStore(transaction, storeName) {
+    const store = transaction.objectStore(storeName);
+    const [keys, values] = await Promise.all([
+        requestResult(store.getAllKeys()),
+        requestResult(store.getAll())
+    ]);
+    return Object.fromEntries(keys.map((key, index) => [key, values[index]]));
+}
+
+// Convert a base64 data URL from the old localStorage format back to a File object
 function base64ToFile(base64, filename, mimeType) {
     // Extract the base64 data (remove data URL prefix)
-    const base64Data = base64.split(',')[1];
-    const byteCharacters = atob(base64Data);
-    const byteNumbers = new Array(byteCharacters.length);
+    const byteCharacters = atob(base64.split(',')[1]);
+    const byteArray = new Uint8Array(byteCharacters.length);
     
     for (let i = 0; i < byteCharacters.length; i++) {
-        byteNumbers[i] = byteCharacters.charCodeAt(i);
+        byteArray[i] = byteCharacters.charCodeAt(i);
     }
     
-    const byteArray = new Uint8Array(byteNumbers);
-    const blob = new Blob([byteArray], { type: mimeType });
-    
-    return new File([blob], filename, { type: mimeType });
+    return new File([byteArray], filename, { type: mimeType });
 }
 
-// Save form data to localStorage
-async function saveFormData() {
+// Current value of every saved field: text inputs, input modes and the server's document IDs
+function currentFields() {
     const jobToggle = document.querySelector('.toggle-btn.active[data-target="job"]');
     const resumeToggle = document.querySelector('.toggle-btn.active[data-target="resume"]');
     const coverLetterToggle = document.querySelector('.toggle-btn.active[data-target="coverLetter"]');
+    const resumeFile = document.getElementById('resumeFile').files[0];
+    const coverLetterFile = document.getElementById('coverLetterFile').files[0];
     
-    const formData = {
+    return {
         jobLink: document.getElementById('jobLink').value,
         companyDescription: document.getElementById('companyDescription').value,
         roleDescription: document.getElementById('roleDescription').value,
@@ -101,175 +144,163 @@ async function saveFormData() {
         coverLetterText: document.getElementById('coverLetterText').value,
         jobInputMode: jobToggle ? jobToggle.dataset.mode : 'link',
         resumeInputMode: resumeToggle ? resumeToggle.dataset.mode : 'file',
-        coverLetterInputMode: coverLetterToggle ? coverLetterToggle.dataset.mode : 'file'
+        coverLetterInputMode: coverLetterToggle ? coverLetterToggle.dataset.mode : 'file',
+        resumeDocumentId: (resumeFile && documentIds.get(resumeFile)) || null,
+        coverLetterDocumentId: (coverLetterFile && documentIds.get(coverLetterFile)) || null
     };
+}
+
+// Save the fields that changed since the last save to IndexedDB
+async function saveFormData() {
+    const changes = Object.entries(currentFields()).filter(([name, value]) => savedFields.get(name) !== value);
+    if (changes.length === 0) {
+        return;
+    }
     
-    // Handle resume file if present
-    const resumeFileInput = document.getElementById('resumeFile');
-    if (resumeFileInput && resumeFileInput.files && resumeFileInput.files[0]) {
-        const file = resumeFileInput.files[0];
-        
-        if (file.size <= LOCALSTORAGE_FILE_LIMIT) {
-            try {
-                const base64 = await fileToBase64(file);
-                formData.resumeFile = {
-                    name: file.name,
-                    type: file.type,
-                    data: base64
-                };
-            } catch (error) {
-                console.warn('Failed to save resume file:', error);
-            }
+    try {
+        const db = await openFormDatabase();
+        const transaction = db.transaction(FIELDS_STORE, 'readwrite');
+        const store = transaction.objectStore(FIELDS_STORE);
+        changes.forEach(([name, value]) => store.put(value, name));
+        await transactionDone(transaction);
+        changes.forEach(([name, value]) => savedFields.set(name, value));
+        console.log(`Saved ${changes.map(([name]) => name).join(', ')}`);
+    } catch (error) {
+        console.error('Error saving form data:', error);
+    }
+}
+
+// Save an uploaded file as a Blob (or forget it when file is null); called only when the file changes
+async function saveFile(inputId, file) {
+    try {
+        const db = await openFormDatabase();
+        const transaction = db.transaction(FILES_STORE, 'readwrite');
+        if (file) {
+            transaction.objectStore(FILES_STORE).put(file, inputId);
         } else {
-            console.warn('Resume file too large to save (exceeds 2MB)');
+            transaction.objectStore(FILES_STORE).delete(inputId);
         }
+        await transactionDone(transaction);
+        console.log(file ? `Saved ${file.name}` : `Removed saved ${inputId}`);
+    } catch (error) {
+        console.error(`Error saving ${inputId}:`, error);
+    }
+}
+
+// Move form data saved by earlier versions (base64 files in localStorage) into IndexedDB, once
+async function migrateLocalStorage() {
+    const savedData = localStorage.getItem(LEGACY_STORAGE_KEY);
+    if (!savedData) {
+        return;
     }
     
-    // Handle cover letter file if present
-    const coverLetterFileInput = document.getElementById('coverLetterFile');
-    if (coverLetterFileInput && coverLetterFileInput.files && coverLetterFileInput.files[0]) {
-        const file = coverLetterFileInput.files[0];
-        
-        if (file.size <= LOCALSTORAGE_FILE_LIMIT) {
-            try {
-                const base64 = await fileToBase64(file);
-                formData.coverLetterFile = {
-                    name: file.name,
-                    type: file.type,
-                    data: base64
-                };
-            } catch (error) {
-                console.warn('Failed to save cover letter file:', error);
-            }
-        } else {
-            console.warn('Cover letter file too large to save (exceeds 2MB)');
-        }
+    const formData = JSON.parse(savedData);
+    const fields = {
+        jobLink: formData.jobLink || '',
+        companyDescription: formData.companyDescription || '',
+        roleDescription: formData.roleDescription || '',
+        resumeText: formData.resumeText || '',
+        coverLetterText: formData.coverLetterText || '',
+        jobInputMode: formData.jobInputMode,
+        resumeInputMode: formData.resumeInputMode,
+        // Older versions called the cover letter mode 'inputMode'
+        coverLetterInputMode: formData.coverLetterInputMode || formData.inputMode,
+        resumeDocumentId: (formData.resumeFile && formData.resumeFile.documentId) || null,
+        coverLetterDocumentId: (formData.coverLetterFile && formData.coverLetterFile.documentId) || null
+    };
+    const files = {};
+    if (formData.resumeFile && formData.resumeFile.data) {
+        files.resumeFile = base64ToFile(formData.resumeFile.data, formData.resumeFile.name, formData.resumeFile.type);
+    }
+    if (formData.coverLetterFile && formData.coverLetterFile.data) {
+        files.coverLetterFile = base64ToFile(formData.coverLetterFile.data, formData.coverLetterFile.name, formData.coverLetterFile.type);
     }
     
-    try {
-        localStorage.setItem(STORAGE_KEY, JSON.stringify(formData));
-        console.log('Form data saved to localStorage');
-    } catch (error) {
-        console.error('Error saving to localStorage:', error);
-        // If quota exceeded, try to save without files
-        if (error.name === 'QuotaExceededError') {
-            console.warn('Storage quota exceeded, saving without files');
-            delete formData.resumeFile;
-            delete formData.coverLetterFile;
-            try {
-                localStorage.setItem(STORAGE_KEY, JSON.stringify(formData));
-                console.log('Form data saved without files due to storage limit');
-            } catch (e) {
-                console.error('Failed to save even without files:', e);
-            }
+    const db = await openFormDatabase();
+    const transaction = db.transaction([FIELDS_STORE, FILES_STORE], 'readwrite');
+    Object.entries(fields).forEach(([name, value]) => {
+        if (value !== undefined) {
+            transaction.objectStore(FIELDS_STORE).put(value, name);
         }
+    });
+    Object.entries(files).forEach(([inputId, file]) => transaction.objectStore(FILES_STORE).put(file, inputId));
+    await transactionDone(transaction);
+    localStorage.removeItem(LEGACY_STORAGE_KEY);
+    console.log('Moved saved form data from localStorage to IndexedDB');
+}
+
+// Put a restored file back into its file input
+function restoreFile(inputId, fileNameId, file, documentId) {
+    if (documentId) {
+        documentIds.set(file, documentId);
     }
+    
+    // Create a DataTransfer to set files
+    const dataTransfer = new DataTransfer();
+    dataTransfer.items.add(file);
+    document.getElementById(inputId).files = dataTransfer.files;
+    
+    // Update file name display
+    const fileName = document.getElementById(fileNameId);
+    fileName.textContent = `Selected: ${file.name}`;
+    fileName.classList.add('show');
 }
 
-// Load form data from localStorage
-function loadFormData() {
+// Load saved form data from IndexedDB
+async function loadFormData() {
+    performance.mark('form-restore-start');
     try {
-        const savedData = localStorage.getItem(STORAGE_KEY);
-        if (savedData) {
-            const formData = JSON.parse(savedData);
-            
-            // Populate form fields
-            document.getElementById('jobLink').value = formData.jobLink || '';
-            document.getElementById('companyDescription').value = formData.companyDescription || '';
-            document.getElementById('roleDescription').value = formData.roleDescription || '';
-            document.getElementById('resumeText').value = formData.resumeText || '';
-            document.getElementById('coverLetterText').value = formData.coverLetterText || '';
-            
-            // Restore job input mode
-            if (formData.jobInputMode) {
-                const jobTargetButton = document.querySelector(`.toggle-btn[data-target="job"][data-mode="${formData.jobInputMode}"]`);
-                if (jobTargetButton) {
-                    jobTargetButton.click();
-                }
-            }
-            
-            // Restore resume input mode
-            if (formData.resumeInputMode) {
-                const resumeTargetButton = document.querySelector(`.toggle-btn[data-target="resume"][data-mode="${formData.resumeInputMode}"]`);
-                if (resumeTargetButton) {
-                    resumeTargetButton.click();
-                }
-            }
-            
-            // Restore cover letter input mode (for backward compatibility, check old 'inputMode' field)
-            const coverLetterMode = formData.coverLetterInputMode || formData.inputMode;
-            if (coverLetterMode) {
-                const coverLetterTargetButton = document.querySelector(`.toggle-btn[data-target="coverLetter"][data-mode="${coverLetterMode}"]`);
-                if (coverLetterTargetButton) {
-                    coverLetterTargetButton.click();
-                }
-            }
-            
-            // Restore resume file if present
-            if (formData.resumeFile && formData.resumeFile.data) {
-                try {
-                    const file = base64ToFile(
-                        formData.resumeFile.data,
-                        formData.resumeFile.name,
-                        formData.resumeFile.type
-                    );
-                    
-                    // Create a DataTransfer to set files
-                    const dataTransfer = new DataTransfer();
-                    dataTransfer.items.add(file);
-                    
-                    const resumeFileInput = document.getElementById('resumeFile');
-                    resumeFileInput.files = dataTransfer.files;
-                    
-                    // Update file name display
-                    const resumeFileName = document.getElementById('resumeFileName');
-                    resumeFileName.textContent = `Selected: ${file.name}`;
-                    resumeFileName.classList.add('show');
-                    
-                    console.log('Resume file restored from localStorage');
-                } catch (error) {
-                    console.warn('Failed to restore resume file:', error);
-                }
+        await migrateLocalStorage();
+        
+        const db = await openFormDatabase();
+        const transaction = db.transaction([FIELDS_STORE, FILES_STORE], 'readonly');
+        const [fields, files] = await Promise.all([
+            readStore(transaction, FIELDS_STORE),
+            readStore(transaction, FILES_STORE)
+        ]);
+        
+        // Populate form fields
+        ['jobLink', 'companyDescription', 'roleDescription', 'resumeText', 'coverLetterText'].forEach(name => {
+            if (fields[name] !== undefined) {
+                document.getElementById(name).value = fields[name];
             }
-            
-            // Restore cover letter file if present
-            if (formData.coverLetterFile && formData.coverLetterFile.data) {
-                try {
-                    const file = base64ToFile(
-                        formData.coverLetterFile.data,
-                        formData.coverLetterFile.name,
-                        formData.coverLetterFile.type
-                    );
-                    
-                    // Create a DataTransfer to set files
-                    const dataTransfer = new DataTransfer();
-                    dataTransfer.items.add(file);
-                    
-                    const coverLetterFileInput = document.getElementById('coverLetterFile');
-                    coverLetterFileInput.files = dataTransfer.files;
-                    
-                    // Update file name display
-                    const coverLetterFileName = document.getElementById('fileName');
-                    coverLetterFileName.textContent = `Selected: ${file.name}`;
-                    coverLetterFileName.classList.add('show');
-                    
-                    console.log('Cover letter file restored from localStorage');
-                } catch (error) {
-                    console.warn('Failed to restore cover letter file:', error);
-                }
+        });
+        
+        // Restore input modes
+        [['job', fields.jobInputMode], ['resume', fields.resumeInputMode], ['coverLetter', fields.coverLetterInputMode]].forEach(([target, mode]) => {
+            const targetButton = mode && document.querySelector(`.toggle-btn[data-target="${target}"][data-mode="${mode}"]`);
+            if (targetButton) {
+                targetButton.click();
             }
-            
-            console.log('Form data loaded from localStorage');
+        });
+        
+        // Restore files
+        if (files.resumeFile) {
+            restoreFile('resumeFile', 'resumeFileName', files.resumeFile, fields.resumeDocumentId);
         }
+        if (files.coverLetterFile) {
+            restoreFile('coverLetterFile', 'fileName', files.coverLetterFile, fields.coverLetterDocumentId);
+        }
+        
+        // What was restored is what is saved, so the next save only writes later edits
+        Object.entries(fields).forEach(([name, value]) => savedFields.set(name, value));
+        console.log('Form data loaded from IndexedDB');
     } catch (error) {
-        console.error('Error loading from localStorage:', error);
+        console.error('Error loading saved form data:', error);
     }
+    performance.measure('form-restore', 'form-restore-start');
 }
 
 // Clear saved form data
-function clearSavedData() {
+async function clearSavedData() {
     try {
-        localStorage.removeItem(STORAGE_KEY);
+        localStorage.removeItem(LEGACY_STORAGE_KEY);
+        const db = await openFormDatabase();
+        const transaction = db.transaction([FIELDS_STORE, FILES_STORE], 'readwrite');
+        transaction.objectStore(FIELDS_STORE).clear();
+        transaction.objectStore(FILES_STORE).clear();
+        await transactionDone(transaction);
+        savedFields.clear();
         console.log('Saved form data cleared');
         
         // Clear form fields
@@ -306,7 +337,7 @@ function clearSavedData() {
         // Show feedback
         alert('Saved form data has been cleared!');
     } catch (error) {
-        console.error('Error clearing localStorage:', error);
+        console.error('Error clearing saved form data:', error);
     }
 }
 
@@ -386,6 +417,7 @@ coverLetterFileInput.addEventListener('change', (e) => {
             alert('Please upload a valid file type (.txt, .pdf, or .docx)');
             coverLetterFileInput.value = '';
             coverLetterFileName.classList.remove('show');
+            saveFile('coverLetterFile', null);
             return;
         }
         
@@ -393,10 +425,13 @@ coverLetterFileInput.addEventListener('change', (e) => {
         coverLetterFileName.textContent = `Selected: ${file.name}`;
         coverLetterFileName.classList.add('show');
         
-        // Save file to localStorage
+        // Save the file itself now, and its (now unknown) document ID with the other fields
+        saveFile('coverLetterFile', file);
         debouncedSave();
     } else {
         coverLetterFileName.classList.remove('show');
+        saveFile('coverLetterFile', null);
+        debouncedSave();
     }
 });
 
@@ -416,6 +451,7 @@ resumeFileInput.addEventListener('change', (e) => {
             alert('Please upload a valid file type (.txt, .pdf, or .docx)');
             resumeFileInput.value = '';
             resumeFileName.classList.remove('show');
+            saveFile('resumeFile', null);
             return;
         }
         
@@ -423,10 +459,13 @@ resumeFileInput.addEventListener('change', (e) => {
         resumeFileName.textContent = `Selected: ${file.name}`;
         resumeFileName.classList.add('show');
         
-        // Save file to localStorage
+        // Save the file itself now, and its (now unknown) document ID with the other fields
+        saveFile('resumeFile', file);
         debouncedSave();
     } else {
         resumeFileName.classList.remove('show');
+        saveFile('resumeFile', null);
+        debouncedSave();
     }
 });
 
@@ -513,9 +552,52 @@ document.getElementById('coverLetterText').addEventListener('input', (e) => {
 // Load saved data when page loads
 window.addEventListener('DOMContentLoaded', loadFormData);
 
+// Save pending edits straight away when the page is hidden, rather than after the debounce
+document.addEventListener('visibilitychange', () => {
+    if (document.visibilityState === 'hidden') {
+        saveFormData();
+    }
+});
+
 // Add event listener for clear button
 document.getElementById('clearSavedData').addEventListener('click', clearSavedData);
 
+// Read Server-Sent Events from a fetch response, calling onEvent(event, data) for each one
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) {
+            break;
+        }
+        buffer += decoder.decode(value, { stream: true });
+        
+        // Events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let eventName = 'message';
+            const dataLines = [];
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event:')) {
+                    eventName = line.slice(6).trim();
+                } else if (line.startsWith('data:')) {
+                    dataLines.push(line.slice(5).trimStart());
+                }
+            });
+            
+            if (dataLines.length > 0) {
+                onEvent(eventName, JSON.parse(dataLines.join('\n')));
+            }
+        }
+    }
+}
+
 // Handle form submission
 const form = document.getElementById('coverLetterForm');
 const resultSection = document.getElementById('result');
@@ -604,25 +686,43 @@ form.addEventListener('submit', async (e) => {
         return;
     }
     
-    // Prepare form data
-    const formData = new FormData();
-    formData.append('jobLink', jobLink);
-    formData.append('companyDescription', companyDescription);
-    formData.append('roleDescription', roleDescription);
-    
-    // Add resume (text or file)
-    if (resumeActiveMode === 'text') {
-        formData.append('resumeText', resumeText);
-    } else {
-        formData.append('resumeFile', resumeFile);
-    }
+    // Prepare form data, sending the IDs of files the server already has instead of the files
+    const buildFormData = (useDocumentIds) => {
+        const formData = new FormData();
+        formData.append('jobLink', jobLink);
+        formData.append('companyDescription', companyDescription);
+        formData.append('roleDescription', roleDescription);
+        
+        // Add resume (text, document ID or file)
+        if (resumeActiveMode === 'text') {
+            formData.append('resumeText', resumeText);
+        } else if (useDocumentIds && documentIds.has(resumeFile)) {
+            formData.append('resumeId', documentIds.get(resumeFile));
+        } else {
+            formData.append('resumeFile', resumeFile);
+        }
+        
+        // Add cover letter (text, document ID or file)
+        if (coverLetterActiveMode === 'text') {
+            formData.append('coverLetterText', coverLetterText);
+        } else if (useDocumentIds && documentIds.has(coverLetterFile)) {
+            formData.append('coverLetterId', documentIds.get(coverLetterFile));
+        } else {
+            formData.append('coverLetterFile', coverLetterFile);
+        }
+        return formData;
+    };
     
-    // Add cover letter (text or file)
-    if (coverLetterActiveMode === 'text') {
-        formData.append('coverLetterText', coverLetterText);
-    } else {
-        formData.append('coverLetterFile', coverLetterFile);
-    }
+    // Remember the IDs the server returns for the files we sent
+    const rememberDocumentIds = (data) => {
+        if (resumeActiveMode === 'file' && data.resume_id) {
+            documentIds.set(resumeFile, data.resume_id);
+        }
+        if (coverLetterActiveMode === 'file' && data.cover_letter_id) {
+            documentIds.set(coverLetterFile, data.cover_letter_id);
+        }
+        debouncedSave();
+    };
     
     const submitBtn = form.querySelector('.submit-btn');
     const originalText = submitBtn.innerHTML;
@@ -631,26 +731,58 @@ form.addEventListener('submit', async (e) => {
         submitBtn.innerHTML = '<span>Processing...</span>';
         submitBtn.disabled = true;
         
-        // Send request to backend
-        const response = await fetch('/process', {
+        // Send request to backend (the letter is streamed back as Server-Sent Events)
+        let response = await fetch('/process/stream', {
             method: 'POST',
-            body: formData
+            body: buildFormData(true)
         });
         
-        const data = await response.json();
+        // A stored document has expired; upload the files again
+        if (response.status === 404) {
+            response = await fetch('/process/stream', {
+                method: 'POST',
+                body: buildFormData(false)
+            });
+        }
+        
+        const contentType = response.headers.get('content-type') || '';
         
-        // Display result
-        if (data.error) {
-            resultContent.innerText = `Error: ${data.error}`;
-        } else if (data.revised_letter) {
-            resultContent.innerText = data.revised_letter;
+        if (contentType.includes('text/event-stream')) {
+            // Show the result area right away and render the letter as it arrives
+            resultContent.innerText = '';
+            resultSection.classList.remove('hidden');
+            resultSection.scrollIntoView({ behavior: 'smooth' });
+            
+            let revisedLetter = '';
+            await readEventStream(response, (event, data) => {
+                if (event === 'chunk') {
+                    revisedLetter += data.text;
+                    resultContent.innerText = revisedLetter;
+                } else if (event === 'done') {
+                    rememberDocumentIds(data);
+                } else if (event === 'error') {
+                    resultContent.innerText = revisedLetter
+                        ? `${revisedLetter}\n\nError: ${data.error}`
+                        : `Error: ${data.error}`;
+                }
+            });
         } else {
-            resultContent.innerText = JSON.stringify(data, null, 2);
+            // Validation and job-detail errors come back as plain JSON
+            const data = await response.json();
+            
+            // Display result
+            if (data.error) {
+                resultContent.innerText = `Error: ${data.error}`;
+            } else if (data.revised_letter) {
+                resultContent.innerText = data.revised_letter;
+            } else {
+                resultContent.innerText = JSON.stringify(data, null, 2);
+            }
+            resultSection.classList.remove('hidden');
+            
+            // Scroll to result
+            resultSection.scrollIntoView({ behavior: 'smooth' });
         }
-        resultSection.classList.remove('hidden');
-        
-        // Scroll to result
-        resultSection.scrollIntoView({ behavior: 'smooth' });
         
         // Reset button
         submitBtn.innerHTML = originalText;
@@ -0,0 +1,102 @@
+import asyncio
+
+from benchmarks.fake_gemini import FakeAsyncCaches, FakeGeminiClient
+from helpers.context_cache_helper import ContextCacheHelper
+from helpers.gemini_helper import GeminiHelper
+
+
+REWRITE_ARGS = {
+    "job_details": "Acme builds rockets and is hiring a backend engineer.",
+    "resume_text": "Five years of Python and FastAPI. " * 50,
+    "existing_letter": "Dear Hiring Manager,\n\nI would like to join your team.",
+}
+
+
+def helper_with_cache(min_tokens=100, caches=None, **cache_options):
+    client = FakeGeminiClient(latency=0.001, caches=caches)
+    context_cache = ContextCacheHelper(
+        client, ttl_seconds=900, min_tokens=min_tokens, **cache_options
+    )
+    sent = []
+    generate_content = client.aio.models.generate_content
+
+    async def recording_generate_content(model, contents, config=None):
+        # The cached context each call referenced, None when the content was sent inline
+        sent.append(config.cached_content)
+        return await generate_content(model=model, contents=contents, config=config)
+
+    client.aio.models.generate_content = recording_generate_content
+    return GeminiHelper(client=client, context_cache=context_cache), sent
+
+
+def rewrite(helper, times):
+    async def run():
+        for _ in range(times):
+            response = await helper.generate_rewrite(**REWRITE_ARGS)
+            assert response.text
+
+    asyncio.run(run())
+
+
+def test_cache_is_created_on_the_second_sighting_and_then_reused():
+    helper, sent = helper_with_cache()
+
+    rewrite(helper, 3)
+
+    assert helper.client.aio.caches.created == 1
+    assert sent == [None, "cachedContents/fake-1", "cachedContents/fake-1"]
+    assert helper.context_cache.creates == 1
+    assert helper.context_cache.hits == 1
+
+
+def test_prompts_below_the_minimum_size_are_not_cached():
+    helper, sent = helper_with_cache(min_tokens=1_000_000)
+
+    rewrite(helper, 3)
+
+    assert helper.client.aio.caches.created == 0
+    assert sent == [None, None, None]
+
+
+def test_expired_cache_falls_back_to_inline_content_and_is_forgotten():
+    helper, sent = helper_with_cache()
+    rewrite(helper, 2)
+    helper.client.aio.caches.expire()
+
+    rewrite(helper, 1)
+
+    # The stale handle is rejected, then the same request goes out inline
+    assert sent[2:] == ["cachedContents/fake-1", None]
+    assert len(helper.context_cache.handles) == 0
+
+    rewrite(helper, 1)
+
+    assert helper.client.aio.caches.created == 2
+    assert sent[4] == "cachedContents/fake-2"
+
+
+def test_workers_share_sightings_and_handles(tmp_path):
+    # Two workers with their own clients on one API key, so Gemini's caches are common
+    shared = {"caches": FakeAsyncCaches(), "db_path": str(tmp_path / "state.db"), "max_entries": 0}
+    first, first_sent = helper_with_cache(**shared)
+    second, second_sent = helper_with_cache(**shared)
+
+    rewrite(first, 1)
+    rewrite(second, 1)
+    rewrite(first, 1)
+
+    # The second sighting happened in the other worker, which created the one cache
+    assert shared["caches"].created == 1
+    assert first_sent == [None, "cachedContents/fake-1"]
+    assert second_sent == ["cachedContents/fake-1"]
+
+    shared["caches"].expire()
+    rewrite(second, 1)
+    rewrite(first, 1)
+
+    # One worker finding the cache gone drops the handle for the other too, which then
+    # creates a new cache without first trying the stale one
+    assert second_sent[1:] == ["cachedContents/fake-1", None]
+    assert first_sent[2:] == ["cachedContents/fake-2"]
+    first.context_cache.close()
+    second.context_cache.close()
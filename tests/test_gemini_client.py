@@ -0,0 +1,45 @@
+from fastapi.testclient import TestClient
+
+import main
+from benchmarks.fake_gemini import FakeGeminiClient
+from helpers.gemini_helper import GeminiHelper
+
+
+def test_requests_share_one_gemini_client(monkeypatch):
+    created = []
+
+    def create_client():
+        created.append(FakeGeminiClient(latency=0.001))
+        return created[-1]
+
+    monkeypatch.setattr(GeminiHelper, "create_client", staticmethod(create_client))
+    helpers = []
+
+    def recording_gemini_helper_for(state):
+        helpers.append(gemini_helper_for(state))
+        return helpers[-1]
+
+    gemini_helper_for = main.gemini_helper_for
+    monkeypatch.setattr(main, "gemini_helper_for", recording_gemini_helper_for)
+
+    with TestClient(main.app) as client:
+        for index in range(5):
+            response = client.post(
+                "/process",
+                data={
+                    "companyDescription": "Acme builds rockets.",
+                    "roleDescription": "Backend engineer working on launch software.",
+                    "resumeText": "Five years of Python and FastAPI.",
+                    # Distinct letters, so identical submissions aren't coalesced into one
+                    "coverLetterText": f"Dear Hiring Manager,\n\nLetter number {index}.",
+                },
+            )
+            assert response.status_code == 200, response.json()
+        shared_client = main.app.state.gemini_client
+
+    assert len(created) == 1
+    assert shared_client is created[0]
+    assert len(helpers) == 5
+    assert all(helper.client is shared_client for helper in helpers)
+    assert shared_client.aio.models.calls >= 5
+    assert shared_client.closed
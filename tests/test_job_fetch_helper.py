@@ -0,0 +1,93 @@
+import asyncio
+
+import httpx
+import pytest
+
+from benchmarks.fake_job_site import FakeJobSite
+from config import Config
+from helpers.job_fetch_helper import JobPageFetcher, JobPageTooLargeError, UnsafeAddressError
+
+
+@pytest.fixture
+def job_site():
+    site = FakeJobSite().start()
+    yield site
+    site.stop()
+
+
+def local_url(site, path, host="127.0.0.1"):
+    return f"http://{host}:{site.server.server_port}/{path}"
+
+
+def fetch_all(urls, **fetcher_options):
+    fetcher_options.setdefault("allow_private_addresses", True)
+
+    async def run():
+        async with JobPageFetcher(proxy=None, **fetcher_options) as fetcher:
+            return fetcher, [await fetcher.fetch(url) for url in urls]
+
+    return asyncio.run(run())
+
+
+def test_page_is_fetched_and_decoded(job_site):
+    fetcher, [body] = fetch_all([local_url(job_site, "greenhouse/17")])
+
+    assert body == job_site.pages["greenhouse"].replace("{posting_id}", "17").encode("utf-8")
+
+
+@pytest.mark.parametrize(
+    "max_bytes",
+    [
+        # Below the gzipped size, so the declared Content-Length is refused up front
+        1000,
+        # Between the gzipped and decoded sizes, so it is the decoded stream that overruns
+        3000,
+    ],
+)
+def test_pages_over_max_bytes_are_refused(job_site, max_bytes):
+    with pytest.raises(JobPageTooLargeError):
+        fetch_all([local_url(job_site, "greenhouse/1")], max_bytes=max_bytes)
+
+
+def test_unchanged_page_is_revalidated_and_reused(job_site):
+    url = local_url(job_site, "greenhouse/1")
+
+    fetcher, [first, second] = fetch_all([url, url])
+
+    assert second == first
+    assert job_site.not_modified == 1
+    assert fetcher.not_modified == 1
+
+
+def test_validators_are_kept_per_requested_url(job_site):
+    # Both links normalise to the same job URL, but only a repeat of the same one is conditional
+    urls = [local_url(job_site, "greenhouse/1/"), local_url(job_site, "greenhouse/1")]
+
+    fetcher, _ = fetch_all(urls)
+
+    assert job_site.not_modified == 0
+    assert len(fetcher.pages) == 2
+
+
+def test_redirects_are_followed_and_revalidated(job_site):
+    url = local_url(job_site, "go/greenhouse/5")
+
+    fetcher, [first, second] = fetch_all([url, url])
+
+    assert first == second == job_site.pages["greenhouse"].replace("{posting_id}", "5").encode()
+    assert job_site.not_modified == 1
+
+
+def test_too_many_redirects_are_refused(job_site):
+    path = "go/" * (Config.JOB_FETCH_MAX_REDIRECTS + 1) + "greenhouse/1"
+
+    with pytest.raises(httpx.TooManyRedirects):
+        fetch_all([local_url(job_site, path)])
+
+
+@pytest.mark.parametrize("host", ["127.0.0.1", "localhost"])
+def test_default_fetcher_refuses_loopback_addresses(job_site, host):
+    with pytest.raises(UnsafeAddressError):
+        fetch_all([local_url(job_site, "greenhouse/1", host)], allow_private_addresses=False)
+
+    assert job_site.requests == 0
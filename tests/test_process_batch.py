@@ -0,0 +1,62 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import main
+from benchmarks.fake_gemini import FakeGeminiClient
+from helpers.document_store_helper import DocumentStoreHelper
+from helpers.gemini_helper import GeminiHelper
+
+
+def blank_pdf():
+    """One empty page: no text to extract, so it is sent to Gemini as a file like a scan"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] >>",
+    ]
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    return pdf
+
+
+def test_batch_stores_the_resume_once(monkeypatch):
+    monkeypatch.setattr(
+        GeminiHelper, "create_client", staticmethod(lambda: FakeGeminiClient(latency=0.001))
+    )
+    stored = []
+    put = DocumentStoreHelper.put
+
+    async def recording_put(self, data, mime_type):
+        stored.append(mime_type)
+        return await put(self, data, mime_type)
+
+    monkeypatch.setattr(DocumentStoreHelper, "put", recording_put)
+    jobs = [
+        {"companyDescription": f"Company {index} builds rockets.", "roleDescription": "Backend"}
+        for index in range(3)
+    ]
+
+    with TestClient(main.app) as client:
+        response = client.post(
+            "/process/batch",
+            data={"jobs": json.dumps(jobs), "coverLetterText": "Dear Hiring Manager,\n\nHello."},
+            files={"resumeFile": ("resume.pdf", blank_pdf())},
+        )
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    assert [line["status"] for line in lines[:-1]] == [200, 200, 200]
+    assert all(line["generation_id"] for line in lines[:-1])
+    # Stored once when the batch read it, not again for each job's generation
+    assert stored == ["application/pdf"]
+    assert lines[-1]["resume_id"]
@@ -0,0 +1,58 @@
+from helpers.prompt_budget_helper import estimate_tokens, fit_rewrite_inputs, trim_document_text
+
+
+LETTER = "\n\n".join(
+    [
+        "Dear Hiring Manager,",
+        "I am applying for the backend engineer role, building Python services with FastAPI.",
+        "Outside work I restore vintage motorcycles and volunteer at the local animal shelter "
+        "on weekends, which has taught me patience and attention to detail. " * 3,
+        "At my last company I moved our Python APIs to FastAPI and cut p95 latency in half.",
+        "Sincerely,\nA Candidate",
+    ]
+)
+JOB_DETAILS = "Backend engineer. You will build Python APIs with FastAPI and PostgreSQL."
+
+
+def test_text_within_budget_is_unchanged():
+    assert trim_document_text(LETTER, estimate_tokens(LETTER)) == LETTER
+
+
+def test_trimmed_letter_keeps_its_paragraph_breaks():
+    trimmed = trim_document_text(LETTER, 90)
+
+    assert estimate_tokens(trimmed) <= 90
+    paragraphs = trimmed.split("\n\n")
+    assert len(paragraphs) > 1
+    assert all(paragraph in LETTER.split("\n\n") for paragraph in paragraphs)
+
+
+def test_paragraphs_closest_to_the_job_are_kept():
+    trimmed = trim_document_text(LETTER, 90, relevant_to=JOB_DETAILS)
+
+    assert trimmed.split("\n\n") == [
+        "Dear Hiring Manager,",
+        "I am applying for the backend engineer role, building Python services with FastAPI.",
+        "At my last company I moved our Python APIs to FastAPI and cut p95 latency in half.",
+        "Sincerely,\nA Candidate",
+    ]
+
+
+def test_single_long_paragraph_is_cut_at_a_line():
+    resume = "\n".join(f"Line {index} of a resume with no blank lines" for index in range(100))
+
+    trimmed = trim_document_text(resume, 50)
+
+    assert estimate_tokens(trimmed) <= 50
+    assert resume.startswith(trimmed.removesuffix(" …"))
+
+
+def test_rewrite_inputs_over_budget_trim_the_letter_by_relevance():
+    inputs = {"job_details": JOB_DETAILS, "resume": "Python, FastAPI", "cover_letter": LETTER}
+
+    fitted = fit_rewrite_inputs(inputs, budget=130)
+
+    assert fitted["job_details"] == JOB_DETAILS
+    assert fitted["resume"] == "Python, FastAPI"
+    assert "motorcycles" not in fitted["cover_letter"]
+    assert fitted["cover_letter"].startswith("Dear Hiring Manager,\n\nI am applying")
@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+
+from benchmarks.fake_gemini import FakeGeminiClient
+from config import Config
+from helpers.gemini_helper import GeminiHelper
+from helpers.retry_helper import (
+    GeminiRequestError,
+    GeminiUnavailableError,
+    LatencyBudget,
+    LatencyBudgetExceededError,
+    LatencyTracker,
+)
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(Config, "GEMINI_RETRY_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(Config, "GEMINI_RETRY_INITIAL_BACKOFF_SECONDS", 0.01)
+    monkeypatch.setattr(Config, "GEMINI_RETRY_MAX_BACKOFF_SECONDS", 0.02)
+    monkeypatch.setattr(Config, "GEMINI_HEDGE_ENABLED", False)
+
+
+def generate(client):
+    return lambda: client.aio.models.generate_content(model=Config.GEMINI_MODEL, contents=[])
+
+
+@pytest.mark.parametrize("code", [429, 503])
+def test_transient_errors_are_retried(code):
+    client = FakeGeminiClient(latency=0.001)
+    client.faults.fail_next(2, code=code)
+
+    response = asyncio.run(GeminiHelper(client=client).call_model(generate(client), "Test"))
+
+    assert response.text
+    assert client.aio.models.calls == 3
+
+
+@pytest.mark.parametrize("code", [429, 503])
+def test_exhausted_retries_tell_the_client_when_to_retry(code):
+    from main import error_response
+
+    client = FakeGeminiClient(latency=0.001)
+    client.faults.fail_next(3, code=code)
+
+    with pytest.raises(GeminiUnavailableError) as raised:
+        asyncio.run(GeminiHelper(client=client).call_model(generate(client), "Test"))
+
+    assert client.aio.models.calls == 3
+    assert raised.value.retry_after == Config.GEMINI_RETRY_AFTER_SECONDS
+    response = error_response(raised.value)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(Config.GEMINI_RETRY_AFTER_SECONDS)
+
+
+def test_client_errors_are_not_retried():
+    client = FakeGeminiClient(latency=0.001)
+    client.faults.fail_next(1, code=400)
+
+    with pytest.raises(GeminiRequestError):
+        asyncio.run(GeminiHelper(client=client).call_model(generate(client), "Test"))
+
+    assert client.aio.models.calls == 1
+
+
+def test_slow_call_runs_out_of_budget():
+    client = FakeGeminiClient(latency=5.0)
+
+    with pytest.raises(LatencyBudgetExceededError):
+        asyncio.run(
+            GeminiHelper(client=client).call_model(generate(client), "Test", LatencyBudget(0.1))
+        )
+
+
+def test_retry_that_would_overrun_the_budget_is_not_attempted(monkeypatch):
+    monkeypatch.setattr(Config, "GEMINI_RETRY_INITIAL_BACKOFF_SECONDS", 10)
+    monkeypatch.setattr(Config, "GEMINI_RETRY_MAX_BACKOFF_SECONDS", 10)
+    monkeypatch.setattr("helpers.retry_helper.random.uniform", lambda low, high: high)
+    client = FakeGeminiClient(latency=0.001)
+    client.faults.fail_next(1, code=503)
+
+    with pytest.raises(GeminiUnavailableError):
+        asyncio.run(
+            GeminiHelper(client=client).call_model(generate(client), "Test", LatencyBudget(1))
+        )
+
+    assert client.aio.models.calls == 1
+
+
+def test_hedged_request_wins_and_cancels_the_original(monkeypatch):
+    monkeypatch.setattr(Config, "GEMINI_HEDGE_ENABLED", True)
+    tracker = LatencyTracker()
+    for _ in range(Config.GEMINI_HEDGE_MIN_SAMPLES):
+        tracker.record(0.02)
+    client = FakeGeminiClient(latency=0.001)
+    client.faults.slow_latency = 5.0
+    client.faults.slow_next(1)
+
+    async def run():
+        response = await GeminiHelper(client=client).call_model(
+            generate(client), "Test", LatencyBudget(2), tracker
+        )
+        # Let the cancelled original see its CancelledError
+        await asyncio.sleep(0)
+        return response
+
+    response = asyncio.run(run())
+
+    assert response.text
+    assert client.aio.models.calls == 2
+    assert client.aio.models.cancelled == 1
+
+
+def test_budget_running_out_before_the_hedge_cancels_the_call(monkeypatch):
+    monkeypatch.setattr(Config, "GEMINI_HEDGE_ENABLED", True)
+    tracker = LatencyTracker()
+    for _ in range(Config.GEMINI_HEDGE_MIN_SAMPLES):
+        tracker.record(1.0)
+    client = FakeGeminiClient(latency=5.0)
+
+    async def run():
+        with pytest.raises(LatencyBudgetExceededError):
+            await GeminiHelper(client=client).call_model(
+                generate(client), "Test", LatencyBudget(0.1), tracker
+            )
+        await asyncio.sleep(0)
+        # Checked before asyncio.run cancels whatever is left over
+        assert client.aio.models.cancelled == 1
+
+    asyncio.run(run())
+
+    assert client.aio.models.calls == 1
@@ -0,0 +1,46 @@
+import asyncio
+
+from helpers.metrics_helper import MetricsRegistry
+from helpers.shared_metrics_helper import SharedMetricsHelper
+
+
+def worker_registry():
+    registry = MetricsRegistry()
+    registry.counter("test_requests_total", "Requests", ["route"])
+    registry.histogram("test_seconds", "Latency", ["route"], buckets=(0.1, 1))
+    registry.gauge("test_in_flight", "In flight")
+    return registry
+
+
+def test_workers_report_each_others_totals(tmp_path):
+    db_path = str(tmp_path / "state.db")
+    first, second = worker_registry(), worker_registry()
+    first.metrics["test_requests_total"].inc(route="/process")
+    first.metrics["test_seconds"].observe(0.05, route="/process")
+    first.metrics["test_in_flight"].set(3)
+    second.metrics["test_requests_total"].inc(2, route="/process")
+    second.metrics["test_requests_total"].inc(route="/refine")
+    second.metrics["test_seconds"].observe(0.5, route="/process")
+    second.metrics["test_in_flight"].set(7)
+
+    async def scrape_first():
+        first_worker = SharedMetricsHelper(db_path, 60, 3600, registry=first)
+        second_worker = SharedMetricsHelper(db_path, 60, 3600, registry=second)
+        await first_worker.start()
+        await second_worker.start()
+        # A counter that moves after the last publish still shows in its own worker's scrape
+        first.metrics["test_requests_total"].inc(route="/process")
+        await second_worker.stop()
+        body = await first_worker.render()
+        await first_worker.stop()
+        return body
+
+    lines = asyncio.run(scrape_first()).splitlines()
+
+    assert 'test_requests_total{route="/process"} 4' in lines
+    assert 'test_requests_total{route="/refine"} 1' in lines
+    assert 'test_seconds_bucket{route="/process",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{route="/process",le="1"} 2' in lines
+    assert 'test_seconds_count{route="/process"} 2' in lines
+    # Gauges are the answering worker's own
+    assert "test_in_flight 3" in lines